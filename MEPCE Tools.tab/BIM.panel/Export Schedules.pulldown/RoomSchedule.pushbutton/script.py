@@ -1,8 +1,8 @@
 # -*- coding: utf-8 -*-
 __title__   = "Room Schedule"
 #__highlight__ = "new"
-__doc__     = """Version = 1.0
-Date    = 2025.06.17
+__doc__     = """Version = 1.1
+Date    = 2026.10.18
 _________________________________________________________________
 Description:
 Export a room schedule with associated zoning data.
@@ -14,6 +14,8 @@ How-to:
 -> Done! Schedule has been exported to your Desktop
 _________________________________________________________________
 Last update:
+- [2026.10.18] - 1.1 Room data is read once and written a row at a time (constant memory),
+                     with number formats for areas and airflows
 - [2025.06.17] - 1.0 RELEASE
 _________________________________________________________________
 Author: Simeon Neese"""
@@ -28,7 +30,6 @@ from pyrevit import revit, DB, forms, script
 # libraries
 import os
 import sys
-import xlsxwriter
 from datetime import datetime
 
 # revit
@@ -51,11 +52,17 @@ app    = __revit__.Application                  #type: Application
 uidoc  = __revit__.ActiveUIDocument             #type: UIDocument
 doc    = __revit__.ActiveUIDocument.Document    #type: Document
 
+NUMBER_FORMATS = {"Area (ft^2)": {"num_format": "#,##0"},                  # Excel number format of each column
+                  "Supply Airflow (CFM)": {"num_format": "#,##0"},
+                  "Ventilation (CFM)": {"num_format": "#,##0"},
+                  "Supply / Area (CFM/ft^2)": {"num_format": "0.00"}}
+
 # ╔═╗╦ ╦╔╗╔╔═╗╔╦╗╦╔═╗╔╗╔╔═╗
 # ╠╣ ║ ║║║║║   ║ ║║ ║║║║╚═╗
 # ╚  ╚═╝╝╚╝╚═╝ ╩ ╩╚═╝╝╚╝╚═╝
 #==================================================
 from Snippets._filledregions import get_rooms, get_room_data
+from Snippets._export import ReportWriter
 
 # ╔╦╗╔═╗╦╔╗╔
 # ║║║╠═╣║║║║
@@ -98,8 +105,8 @@ if not rooms:
 # .___/ /
 # \____/
 # Get room data
-roomdata = get_room_data(rooms)[0]
-paramsnames = get_room_data(rooms)[1]
+roomdata, paramsnames = get_room_data(rooms)
+columns = [param for param in paramsnames if param != "Room Number" and param != "Room Name"]
 
 #    ___
 #   /   |
@@ -107,28 +114,7 @@ paramsnames = get_room_data(rooms)[1]
 # / /_| |
 # \___  |
 #     |_/
-# Format lists for excel
-dataexport = []
-for param in paramsnames:
-    if param == "Room Number" or param == "Room Name":
-        continue
-    else:
-        paramvals = []
-        paramvals.append(param)
-        for room in roomdata:
-            paramvals.append(room[param])
-        dataexport.append(paramvals)
-export = dataexport
-
-#  _____
-# |  ___|
-# |___ \
-#     \ \
-# /\__/ /
-# \____/
-# Create Excel Workbook
-worksheetName = "Room Schedule"
-
+# Get export path
 try:
     desktop_path = os.path.join(os.path.expanduser("~"),"Desktop")
 except:
@@ -138,26 +124,25 @@ except:
 
 file_name = "{} - Room Schedule.xlsx".format(date)
 output_file = os.path.join(desktop_path,file_name)
+
+#  _____
+# |  ___|
+# |___ \
+#     \ \
+# /\__/ /
+# \____/
+# Write rooms to Excel one row at a time
 try:
-    workbook = xlsxwriter.Workbook(output_file, {'strings_to_numbers':False})
+    report = ReportWriter(output_file, columns, sheet_name="Room Schedule", formats=NUMBER_FORMATS)
 except:
     alert("Could not open workbook! Possible causes:\n- Duplicate Room Schedule workbook exists on Desktop and is open")
     print "Could not open workbook! Possible causes:\n- Duplicate Room Schedule workbook exists on Desktop and is open"
     sys.exit()
-worksheet = workbook.add_worksheet(worksheetName)
-
-row = 0
-col = 0
-
-for item in export:
-    for it in item:
-        worksheet.write(row,col,it)
-        row += 1
-    col += 1
-    row = 0
 
 try:
-    workbook.close()
+    for room in roomdata:
+        report.write(room)
+    report.close()
 except:
     alert("Could not export data! Possible causes:\n- Duplicate Room Schedule workbook exists on Desktop and is open")
     print "Could not export data! Possible causes:\n- Duplicate Room Schedule workbook exists on Desktop and is open"
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 __title__ = "Circuit Lighting"
-__doc__ = """Version = 1.1
-Date    = 2025.06.09
+__doc__ = """Version = 1.2
+Date    = 2026.10.18
 _________________________________________________________________
 Description:
 This button will circuit lights based on filled regions.
@@ -11,6 +11,9 @@ How-to:
 -> Click button
 _________________________________________________________________
 Last update:
+- [2026.10.18] - 1.2 Lights are checked against 2D region outlines instead of
+                     extruded region faces, one group per filled region.
+                     Lights are grouped in one pass per view (grid over region boxes).
 - [2025.06.09] - 1.1 Fixed bug which caused elements to be
                      fetched incorrectly due to variable names.
                      Error messages now print in addition to
@@ -58,7 +61,8 @@ app   = __revit__.Application               #type: Application
 # ╚  ╚═╝╝╚╝╚═╝ ╩ ╩╚═╝╝╚╝╚═╝
 #==================================================
 from Snippets._filledregions import get_filled_regions
-from Snippets._filledregions import get_faces
+from Snippets._filledregions import get_region_polygon
+from Snippets._polygons import group_points
 
 # ╔╦╗╔═╗╦╔╗╔
 # ║║║╠═╣║║║║
@@ -80,11 +84,11 @@ allviews = list(FilteredElementCollector(doc).OfClass(View))
 #   / /
 # ./ /___
 # \_____/
-# Get faces from filled regions
+# Get outlines from filled regions
 dic = get_filled_regions(allviews,'lighting')
 regions = dic["filledregions"]  # List of regions organized by view like [[],[],[],...,[]]
 filtviews = dic["filtviews"]    # List of lighting views
-faces = get_faces(regions)      # List of list of faces. Organized by view like [[],[],[],...,[]]
+polygons = [[get_region_polygon(region) for region in view] for view in regions]    # 2D outlines. Organized by view like [[],[],[],...,[]]
 
 #  _____
 # |____ |
@@ -99,14 +103,15 @@ allids = []     # All light fixture element Ids grouped by view
 
 for i in range(len(filtviews)):
     viewpoints = [] # Sublist which will be appended to allpoints - is a list of light locations for the specific view
-    viewlights = list(FilteredElementCollector(doc,filtviews[i].Id).OfCategory(BuiltInCategory.OST_LightingFixtures)) # Get lights in current view
+    viewlights = [] # Lights with a location, in the same order as viewpoints
 
-    for light in viewlights:
+    for light in FilteredElementCollector(doc,filtviews[i].Id).OfCategory(BuiltInCategory.OST_LightingFixtures):   # Get lights in current view
         location = light.Location
         if type(location) is NoneType:
             continue
         else:
             viewpoints.append(location.Point)
+            viewlights.append(light)
     allpoints.append(viewpoints)
     alllights.append(viewlights)
 
@@ -116,20 +121,16 @@ for i in range(len(filtviews)):
 # / /_| |
 # \___  |
 #     |_/
-# Project light locations onto faces (only do for ones in the same view)
+# Check which region outline each light is inside (only do for ones in the same view)
 circuitgroups = []
-for i in range(len(faces)):
+for i in range(len(polygons)):
     viewpoints = allpoints[i]   # All points in associated view
     viewlights = alllights[i]   # All lights in associated view
 
-    for face in faces[i]:
-        lightgroup = []         # List of lights inside this face
-        for k in range(len(viewpoints)):
-            if face.Project(viewpoints[k]):
-                lightgroup.append(viewlights[k])
-            else:
-                continue
-        circuitgroups.append(lightgroup)    # Will group lights by associated face
+    groups = group_points(polygons[i], [(point.X, point.Y) for point in viewpoints])    # Light indices inside each region
+    for group in groups:
+        lightgroup = [viewlights[k] for k in group]     # List of lights inside this region
+        circuitgroups.append(lightgroup)    # Will group lights by associated region
 
 #  _____
 # |  ___|
@@ -1,12 +1,14 @@
 # -*- coding: utf-8 -*-
 __title__ = "Clash Detection"
 __highlight__ = "updated"
-__doc__ = """Version = 1.3
-Date    = 2025.07.28
+__doc__ = """Version = 1.4
+Date    = 2026.10.18
 _________________________________________________________________
 Description:
 This button will detect if selected element categories
-are clashing and will draw detail lines around clashing geometry.
+are clashing and will draw an outline around clashing geometry.
+Clearance mode finds elements closer than a set distance
+and draws a box around the closest points.
 Orange - Clashing with duct
 Magenta - Clashing with pipe
 Red - Clashing with anything else
@@ -14,12 +16,32 @@ _________________________________________________________________
 How-to:
 → Click button
 → Select 'Yes' or 'No' to only check on active view
+→ If not, select 'Yes' to pick plan views to draw clashes in
+→ Select 'Hard Clash' or 'Clearance' (enter min distance in inches)
+→ Select a clash report format and file, or 'No'
 → Select main categories to check
 → Select system types to filter, or select none
 → Select categories to check against
 → Select system types to filter, or select none
+→ Shift+Click to export the selected elements to a snapshot file
+  for the headless clash engine (Snippets._clashengine) instead
 _________________________________________________________________
 Last update:
+- [2026.10.18] - Bounding box checks use a spatial grid, only overlapping pairs are checked.
+Solid geometry of unchanged elements is reused between runs in the same Revit session.
+Re-runs only re-check pairs where an element changed (results are cached per model and view).
+Straight pipe, duct and conduit are pre-checked with their centerline and size before the solid check.
+Added clearance mode.
+Shift+Click exports a clash snapshot which can be checked outside of Revit
+(one level at a time or all levels in parallel).
+Clashes are drawn as one outline each (no duplicate lines), which is much faster.
+Clashes are grouped in the report (same system or element, within 3 ft).
+Clash report export to CSV, JSON lines or Excel (written as clashes are found).
+Progress bars for each stage (can be cancelled, keeps partial results),
+stage times are printed and saved to a performance log.
+Whole model checks can draw into many plan views at once (by level and crop box).
+Pipe size filter reads each fitting once and checks the largest end (reducers and tees).
+Structure from every loaded link is checked, in model coordinates.
 - [2025.07.28] - Added pipe diameter filter, fixed bug when selecting multiple categories to check
 - [2025.07.22] - Added Conduit Category
 - [2025.07.01] - Added new colors for clash boxes!
@@ -45,7 +67,7 @@ from Autodesk.Revit.DB.Mechanical import MechanicalSystemType, DuctSystemType
 from types import NoneType
 
 # pyRevit
-from pyrevit import revit, forms
+from pyrevit import revit, forms, script
 
 # .NET Imports (You often need List import)
 import clr
@@ -66,12 +88,22 @@ doc   = __revit__.ActiveUIDocument.Document #type: Document
 uidoc = __revit__.ActiveUIDocument          #type: UIDocument
 app   = __revit__.Application               #type: Application
 
+CLUSTER_DISTANCE = 3.0      # Clashes closer than this (ft) on the same system or element are reported as one group
+
 # ╔═╗╦ ╦╔╗╔╔═╗╔╦╗╦╔═╗╔╗╔╔═╗
 # ╠╣ ║ ║║║║║   ║ ║║ ║║║║╚═╗
 # ╚  ╚═╝╝╚╝╚═╝ ╩ ╩╚═╝╝╚╝╚═╝
 #==================================================
-from Snippets._selection import get_elements_of_categories
-from Snippets._geometry import get_solid_geometry, bounding_boxes_intersect, flatten_solids, project_point_to_plane
+from Snippets._selection import get_elements_of_categories, ConnectorSizeIndex
+from Snippets._geometry import get_cached_solid_geometry, get_element_version, get_transformed_box
+from Snippets._clash import get_element_key, get_clash_proxy, get_clash_cache_path, load_clash_cache, save_clash_cache, find_clashes
+from Snippets._clash import get_clash_record, get_snapshot_levels, export_clash_snapshot, get_solid_points, get_clash_outline, draw_clash_outlines
+from Snippets._clash import get_system_name, get_clash_row, CLASH_REPORT_COLUMNS, get_solid_bbox, get_view_box, get_view_plane
+from Snippets._export import ReportWriter, REPORT_FORMATS
+from Snippets._progress import RunTimer, StageProgress
+from Snippets._clashengine import cluster_clashes, get_group_report
+from Snippets._spatial import BoundingBoxStore, box_center, box_overlap, boxes_overlap
+from Snippets._proximity import find_clearances
 
 def select_types_form(selected_categories=[]):
     """Open form to select duct and pipe system types."""
@@ -127,28 +159,16 @@ def get_category_color(category):
         color = Color(red=255,blue=0,green=9)
     return color
 
-def filter_pipe_size(pipes,catobj,mindiam):
+def filter_pipe_size(pipes,mindiam,sizes):
     """
     Filter a list of pipes or pipe fittings based on minimum diameter.
+    Fittings are kept if any connection is at least mindiam (reducers and tees use their largest end).
     Inputs:
-    1 - pipes : a list of pipe elements
-    2 - catobj : the built in category for the list of elements (all should be the same category)
-    3 - mindiam : an integer or float for the minimum diameter
+    1 - pipes : a list of pipe or pipe fitting elements
+    2 - mindiam : an integer or float for the minimum diameter (in)
+    3 - sizes : ConnectorSizeIndex shared by the run, so each element's connectors are only read once
     """
-    filtpipes = []
-    for pipe in pipes:
-        if catobj == BuiltInCategory.OST_PipeCurves:
-            if pipe.Diameter * 12 >= mindiam:
-                filtpipes.append(pipe)
-        elif catobj == BuiltInCategory.OST_PipeFitting:
-            connectors = pipe.MEPModel.ConnectorManager.Connectors
-            conndiam = 0
-            for conn in connectors:
-                if conn.ConnectorType == ConnectorType.End:
-                    conndiam = conn.Radius * 24
-            if conndiam >= mindiam:
-                filtpipes.append(pipe)
-    return filtpipes
+    return sizes.filter(pipes, mindiam / 12.0)
 
 def req_pipe_size():
     """Request a minimum pipe diameter"""
@@ -168,6 +188,17 @@ def req_pipe_size():
         alert("Did not enter a diameter!",sub_msg='Using default min diam of 0"',warn_icon=False)
     return mindiam
 
+def req_clearance():
+    """Request a minimum clearance distance (returned in feet)"""
+    components = [Label('Min Clearance (inches):'), TextBox('clearance'), Separator(), Button('Apply')]
+    form = FlexForm('Clearance Check', components)
+    form.show()
+    try:
+        clearance = float(form.values['clearance'])
+    except:
+        alert("Did not enter a clearance!", sub_msg='Exiting script.', warn_icon=False, exitscript=True)
+    return clearance / 12
+
 
 # ╔╦╗╔═╗╦╔╗╔
 # ║║║╠═╣║║║║
@@ -230,6 +261,28 @@ for dct in ductsystemtypes:
 # Ask user if they would like to filter elements by active view
 sviewfilt = forms.alert(msg="Filter elements by Active View?",options=["Yes","No"],warn_icon=False)
 
+# Ask user which views to draw clashes in (the active view when filtering by it, or any plan views)
+draw_views = []
+if sviewfilt == 'Yes':
+    draw_views = [doc.ActiveView]
+elif forms.alert(msg="Draw clashes in plan views?",options=["Yes","No"],warn_icon=False) == 'Yes':
+    draw_views = forms.select_views(title='Select Plan Views to Draw Clashes In',
+                                    filterfunc=lambda view: isinstance(view, ViewPlan)) or []
+
+# Ask user for hard clashes or clearance
+smode = forms.alert(msg="Check for hard clashes or clearance?",options=["Hard Clash","Clearance"],warn_icon=False)
+clearance = 0
+if smode == 'Clearance':
+    clearance = req_clearance()
+
+# Ask user if they would like to export a clash report
+sexport = forms.alert(msg="Export a clash report?",options=["No"] + sorted(REPORT_FORMATS.keys()),warn_icon=False)
+sexport = REPORT_FORMATS.get(sexport)
+if sexport:
+    export_path = forms.save_file(file_ext=sexport, default_name='Clash Report')
+    if not export_path:
+        sexport = None
+
 # Ask user to select a category to check
 availcategories = ['Ducts','Pipes','Conduit']
 scategories = forms.SelectFromList.show(
@@ -329,6 +382,7 @@ else:
 
 
 # Get filtered elements to check
+pipe_sizes = ConnectorSizeIndex()   # Connector sizes read once, shared by both element sets
 elements1 = []
 for obj in categoryobjs:
     selel = get_elements_of_categories(
@@ -339,13 +393,13 @@ for obj in categoryobjs:
     )
     filtels = []
     if "Pipe" in str(obj) and mindiam1:
-        filtels = filter_pipe_size(selel,obj,mindiam1)
+        filtels = filter_pipe_size(selel,mindiam1,pipe_sizes)
     else:
         filtels = selel
     for el in filtels:
         elements1.append(el)
 
-# Get filtered elements to check against
+# Get filtered elements to check against, as (element, link instance, link transform)
 elements2=[]
 if categoryobjs2:
     for obj in categoryobjs2:
@@ -357,23 +411,23 @@ if categoryobjs2:
         )
         filtels = []
         if "Pipe" in str(obj) and mindiam2:
-            filtels = filter_pipe_size(selels, obj, mindiam2)
+            filtels = filter_pipe_size(selels, mindiam2, pipe_sizes)
         else:
             filtels = selels
         for el in filtels:
-            elements2.append(el)
+            elements2.append((el, None, None))
 
-# Get structural elements to check against
-structuralelements = []
+# Get structural elements to check against (from every loaded link, once per link instance)
 if 'Structural' in scategories2:
     selels = get_elements_of_categories(
         categories=structural_categories,
         #view=selected_view,
         linked=True,
-        readout=False
+        readout=False,
+        tagged=True
     )
-    for el in selels:
-        elements2.append(el)
+    for el, link, transform in selels:
+        elements2.append((el, link, transform))
 
 #  _____
 # |  ___|
@@ -382,31 +436,72 @@ if 'Structural' in scategories2:
 # /\__/ /
 # \____/
 # Get geometry for elements
-solids1 = {}
-bounding1 = {}
-ids_elements1 = {}
-for el in elements1:
-    solids = get_solid_geometry(el)
-    flat_solids = [s for s in solids if isinstance(s, Solid) and s.Volume > 0]
-    bounding = el.get_BoundingBox(None)
-    if flat_solids:
-        solids1[el.Id] = flat_solids
-        bounding1[el.Id] = bounding
-        ids_elements1[el.Id] = el
-element_ids1 = list(solids1.keys())
-
-solids2 = {}
-bounding2 = {}
-ids_elements2 = {}
-for el in elements2:
-    solids = get_solid_geometry(el)
-    flat_solids = [s for s in solids if isinstance(s, Solid) and s.Volume > 0]
-    bounding = el.get_BoundingBox(None)
-    if flat_solids:
-        solids2[el.Id] = flat_solids
-        bounding2[el.Id] = bounding
-        ids_elements2[el.Id] = el
-element_ids2 = list(solids2.keys())
+timer = RunTimer("Clash Detection")
+# Everything is keyed by element key (see get_element_key), linked elements include their link instance
+link_transforms = {}
+with StageProgress(timer, "Geometry", len(elements1) + len(elements2), "elements") as stage:
+    versions = {}
+    proxies1 = {}
+    proxies2 = {}
+    solids1 = {}
+    bounding1 = BoundingBoxStore()
+    ids_elements1 = {}
+    for el in stage.iterate(elements1):
+        key = get_element_key(el)
+        if smode == 'Clearance':                                                # Clearance only needs the bounding box
+            flat_solids = []
+            if not bounding1.add(key, el.get_BoundingBox(None)):
+                continue
+        else:
+            solids = get_cached_solid_geometry(el)
+            flat_solids = [s for s in solids if isinstance(s, Solid) and s.Volume > 0]
+            if not flat_solids:
+                continue
+            bounding1.add(key, el.get_BoundingBox(None))
+        solids1[key] = flat_solids
+        ids_elements1[key] = el
+        versions[key] = get_element_version(el)
+        proxies1[key] = get_clash_proxy(el, bounding1.get_box(key))
+    element_ids1 = list(solids1.keys())
+
+    solids2 = {}
+    bounding2 = BoundingBoxStore()
+    ids_elements2 = {}
+    for el, link, transform in stage.iterate(elements2):
+        key = get_element_key(el, link)                                         # Unique per link instance, transform moves it into model coordinates
+        if smode == 'Clearance':                                                # Clearance only needs the bounding box
+            flat_solids = []
+            if not bounding2.add(key, get_transformed_box(el.get_BoundingBox(None), transform)):
+                continue
+        else:
+            solids = get_cached_solid_geometry(el, transform)
+            flat_solids = [s for s in solids if isinstance(s, Solid) and s.Volume > 0]
+            if not flat_solids:
+                continue
+            bounding2.add(key, get_transformed_box(el.get_BoundingBox(None), transform))
+        solids2[key] = flat_solids
+        ids_elements2[key] = el
+        link_transforms[key] = transform
+        versions[key] = get_element_version(el, transform)
+        proxies2[key] = get_clash_proxy(el, bounding2.get_box(key))
+    element_ids2 = list(solids2.keys())
+
+# Shift+Click: export a snapshot for the headless clash engine instead of checking
+if __shiftclick__:
+    snapshot_path = forms.save_file(file_ext='json', default_name='ClashSnapshot')
+    if snapshot_path:
+        records = {}
+        for element_ids, ids_elements, bounding in [(element_ids1, ids_elements1, bounding1),
+                                                    (element_ids2, ids_elements2, bounding2)]:
+            for key in element_ids:
+                if key in records:
+                    continue
+                el = ids_elements[key]
+                solids = get_cached_solid_geometry(el, link_transforms.get(key))
+                solids = [s for s in solids if isinstance(s, Solid) and s.Volume > 0]
+                records[key] = get_clash_record(el, bounding.get_box(key), solids, key=key)
+        export_clash_snapshot(snapshot_path, [records[key] for key in sorted(records)], get_snapshot_levels(doc))
+    script.exit()
 
 #   ____
 #  / ___|
@@ -415,44 +510,75 @@ element_ids2 = list(solids2.keys())
 # | \_/ |
 # \_____/
 # Check for clashes and get clash geometry
-intersection_results = {}
-clash_geometry = {}
-for id1 in element_ids1:
-    id1_intersections = []
-    id1_clashes = []
-    for id2 in element_ids2:
-        if id1 == id2:
-            continue
-        bb1 = bounding1[id1]
-        bb2 = bounding2[id2]
-        bbintersect = bounding_boxes_intersect(bb1,bb2)                      # First, check if bounding boxes intersect
-        if bbintersect is True:
-            solid1 = solids1[id1]
-            solid1 = flatten_solids(solid1)
-            solid2 = solids2[id2]
-            solid2 = flatten_solids(solid2)
-            for s1 in solid1:
-                for s2 in solid2:
-                    if not isinstance(s1, Solid) or not isinstance(s2, Solid):
-                        print 'Skipping non-solid: {}, {}'.format(type(solid1),type(solid2))
-                        continue
-                    try:                                                     # If they clash, check if solids intersect
-                        result = BooleanOperationsUtils.ExecuteBooleanOperation(s1,s2,BooleanOperationsType.Intersect)
-                        if result.Volume > 0:
-                            id1_intersections.append(id2)
-                            id1_clashes.append(result)
-                            break
-                    except:
-                        continue
-    if id1_intersections:
-        intersection_results[id1] = id1_intersections
-        clash_geometry[id1] = id1_clashes
+# Broad phase - only keep pairs with intersecting bounding boxes (grown by the clearance)
+# If a stage is cancelled, the pairs found so far are still checked, reported and drawn (marked as partial results)
+candidate_pairs = []
+if not timer.cancelled:
+    with StageProgress(timer, "Broad Phase", len(bounding1), "elements") as stage:
+        # Pairs with the same key are one model element in both sets, linked keys never match a model key
+        candidate_pairs = bounding1.overlapping_pairs(bounding2, padding=clearance, progress=stage.update)
+if timer.cancelled:
+    print 'CANCELLED: only the {} pairs found before cancelling are checked, results are partial'.format(len(candidate_pairs))
+
+# Each clash is added to the group list and streamed to the report as soon as it is found
+system_names = {}
+clash_list = []
+report = None
+if sexport:
+    report = ReportWriter(export_path, CLASH_REPORT_COLUMNS, sheet_name="Clashes",
+                          formats={"Volume (ft³)": {"num_format": "0.000"}})
+
+def on_clash(id1, id2, volume=None, bbox=None, point=None, distance=None):
+    """Record a clash for grouping and write its report row"""
+    if point is None:
+        point = box_center(bbox or box_overlap(bounding1.get_box(id1), bounding2.get_box(id2)))
+    if id1 not in system_names:
+        system_names[id1] = get_system_name(ids_elements1[id1])
+    clash_list.append({"id1": id1, "id2": id2, "point": point, "system": system_names[id1]})
+    if report:
+        report.write(get_clash_row(ids_elements1[id1], ids_elements2[id2], point, volume, distance, id1, id2))
+
+if smode == 'Clearance':
+    # Narrow phase - distance between centerlines / boxes, no solid operations
+    with StageProgress(timer, "Narrow Phase", len(candidate_pairs), "pairs") as stage:
+        clashes = find_clearances(stage.iterate(candidate_pairs), proxies1, proxies2, clearance)
+    clash_points = clashes["points"]
+    for id1 in element_ids1:
+        for id2, distance, points in zip(clashes["intersection_results"].get(id1, []), clashes["distances"].get(id1, []),
+                                         clash_points.get(id1, [])):
+            midpoint = tuple((points[0][axis] + points[1][axis]) / 2 for axis in range(3))
+            on_clash(id1, id2, point=midpoint, distance=distance)
+else:
+    # Narrow phase - check if solids intersect (skipping pairs which did not clash last run and have not changed)
+    cache_path = get_clash_cache_path(selected_view)
+    with StageProgress(timer, "Narrow Phase", len(candidate_pairs), "pairs") as stage:
+        clashes = find_clashes(stage.iterate(candidate_pairs), solids1, solids2, None, None, versions,
+                               load_clash_cache(cache_path), proxies1=proxies1, proxies2=proxies2,
+                               keep_geometry=bool(draw_views), on_clash=on_clash)
+    save_clash_cache(cache_path, clashes["cache"])
+    clash_geometry = clashes["clash_geometry"]
+intersection_results = clashes["intersection_results"]
 results_keys = list(intersection_results.keys())
+if report:
+    report.close()
 
 print 'Elements Selected to Check: {}'.format(len(element_ids1))
 print 'Elements to Check Against: {}'.format(len(element_ids2))
-print 'Number of Checks: {}'.format(len(element_ids1)*len(element_ids2))
-print 'Intersecting: {}'.format(len(results_keys))
+print 'Number of Checks: {}'.format(len(candidate_pairs))
+if smode == 'Clearance':
+    print 'Closer Than {}": {}'.format(clearance * 12, len(results_keys))
+else:
+    print 'Unchanged Since Last Run: {}'.format(clashes["reused"])
+    print 'Decided Without Solid Check: {}'.format(clashes["analytic"])
+    print 'Intersecting: {}'.format(len(results_keys))
+if report:
+    print 'Clash Report: {} rows saved to {}{}'.format(report.count, export_path,
+                                                       ' (cancelled, partial results)' if timer.cancelled else '')
+
+# Group clashes which are one issue (eg: one pipe run through one beam) for the report
+clash_groups = cluster_clashes(clash_list, CLUSTER_DISTANCE)
+for line in get_group_report(clash_groups, clash_list):
+    print line
 
 #  ______
 # |___  /
@@ -460,55 +586,52 @@ print 'Intersecting: {}'.format(len(results_keys))
 #   / /
 # ./ /
 # \_/
-# Get planar projection of clash geometry
-plane = active_view.SketchPlane.GetPlane()
-origin = plane.Origin
-normal = plane.Normal
-if sviewfilt == 'Yes':
-    with Transaction(doc, "Create Detail Curve") as t:
-        t.Start()
+# Get an outline of each clash on each view's plane and draw them all in one transaction
+# (the active view gets every clash, other plan views only clashes inside their level and crop box)
+if draw_views:
+    category_colors = {}
+    view_boxes = [None if sviewfilt == 'Yes' else get_view_box(view) for view in draw_views]
+    view_outlines = [[] for view in draw_views]
+    with StageProgress(timer, "Outlines", len(clash_list), "clashes") as stage:
         for id1 in results_keys:
             intersections = intersection_results[id1]
-            clashes = clash_geometry[id1]
-            for i in range(len(clashes)):
-                solid = clashes[i]
+            for i in range(len(intersections)):
+                if stage.update(stage.done):
+                    break
+                stage.done += 1
                 id2 = intersections[i]
-                element2 = ids_elements2[id2]
-                category = element2.Category
-                edges = []
-                for face in solid.Faces:
-                    for loop in face.GetEdgesAsCurveLoops():
-                        for curve in loop:
-                            edges.append(curve)
-
-                projected_curves = []
-                for e in edges:
-                    start = e.GetEndPoint(0)
-                    end = e.GetEndPoint(1)
-
-                    projected_start = project_point_to_plane(start, origin, normal)
-                    projected_end = project_point_to_plane(end, origin, normal)
-
-                    try:
-                        projected_line = Line.CreateBound(projected_start,projected_end)
-                        projected_curves.append(projected_line)
-                    except:
-                        continue
-                for curve in projected_curves:
-                    try:
-                        detail_line = doc.Create.NewDetailCurve(active_view,curve)
-                        _id = detail_line.Id
-                        ogs = OverrideGraphicSettings()
-                        color = get_category_color(category)
-                        ogs.SetProjectionLineColor(color)
-                        doc.ActiveView.SetElementOverrides(_id,ogs)
-                    except:
-                        continue
+                category = ids_elements2[id2].Category
+                if category.Name not in category_colors:
+                    category_colors[category.Name] = get_category_color(category)
+                if smode == 'Clearance':
+                    point1, point2 = clash_points[id1][i]
+                    points = [XYZ(*point1), XYZ(*point2)]
+                    padding = max(clearance, 1.0 / 12)
+                    center = tuple((point1[axis] + point2[axis]) / 2 for axis in range(3))
+                else:
+                    points = get_solid_points(clash_geometry[id1][i])
+                    padding = 0.0
+                    center = box_center(get_solid_bbox(clash_geometry[id1][i]))
+                for view, view_box, outlines in zip(draw_views, view_boxes, view_outlines):
+                    if view_box is None or boxes_overlap(view_box, center + center):
+                        outlines.append((get_clash_outline(points, view, padding=padding), category_colors[category.Name]))
+
+    timer.start("Draw")
+    curve_count = 0
+    with Transaction(doc, "Create Detail Curve") as t:
+        t.Start()
+        for view, outlines in zip(draw_views, view_outlines):
+            if outlines:
+                if get_view_plane(view) is None:
+                    print 'Skipped drawing in {} (no work plane or level)'.format(view.Name)
+                    continue
+                curve_count += draw_clash_outlines(view, outlines)
         t.Commit()
-else:
-    alert(
-        msg='Cannot draw clash geometry.',
-        title='Clash Geometry',
-        sub_msg='"Filter by Active View" must be enabled to draw clash geometry',
-        warn_icon=False
-    )
\ No newline at end of file
+    timer.stop(curve_count)
+    print 'Detail Curves Drawn: {} (in {} views)'.format(curve_count, len(draw_views))
+
+# Stage times
+for line in timer.get_report():
+    print line
+timer.write_log({"model": doc.Title, "mode": smode, "elements1": len(element_ids1), "elements2": len(element_ids2),
+                 "candidates": len(candidate_pairs), "clashes": len(clash_list)})
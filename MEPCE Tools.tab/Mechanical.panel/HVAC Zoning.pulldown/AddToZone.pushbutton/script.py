@@ -1,8 +1,8 @@
 # -*- coding: utf-8 -*-
 __title__   = "Add Regions To Zones"
 #__highlight__ = "new"
-__doc__     = """Version = 1.0
-Date    = 2025.07.28
+__doc__     = """Version = 1.1
+Date    = 2026.10.18
 _________________________________________________________________
 Description:
 Adds selected filled regions to a zone
@@ -15,6 +15,7 @@ How-to:
 -> Done!
 _________________________________________________________________
 Last update:
+- [2026.10.18] - 1.1 Filled regions and zones come from the session snapshot (only changed regions are read again)
 - [2025.07.28] - 1.0 RELEASE
 _________________________________________________________________
 Author: Simeon Neese"""
@@ -52,6 +53,7 @@ doc    = __revit__.ActiveUIDocument.Document    #type: Document
 #==================================================
 from Snippets._selection import select_multiple
 from Snippets._math import get_lowest_available, update_zone_colors
+from Snippets._filledregions import get_zoning_records, get_record_elements
 
 # ╔╦╗╔═╗╦╔╗╔
 # ║║║╠═╣║║║║
@@ -95,12 +97,14 @@ t = Transaction(doc,"Add Regions to Zone")
 
 while True:
     # Get pre-existing zone numbers with same prefix
-    filledregions = FilteredElementCollector(doc, active_view.Id).OfCategory(
-        BuiltInCategory.OST_DetailComponents).OfClass(FilledRegion).ToElements()
+    # (filled regions in the active view from the session snapshot, only changed regions are read again)
+    region_pairs = get_record_elements([record for record in get_zoning_records()
+                                        if record["view"] == active_view.Id.IntegerValue])
+    filledregions = [region for record, region in region_pairs]
+    regionzones = dict((region.Id.IntegerValue, record["params"]["MEPCE HVAC Zone"]) for record, region in region_pairs)
 
     existingzonenums = []
-    for region in filledregions:
-        regionzone = region.LookupParameter("MEPCE HVAC Zone").AsString()
+    for regionzone in regionzones.values():
         if regionzone and prefix in regionzone:
             zoneparts = regionzone.split('-')
             zonenum = int(zoneparts[-1])
@@ -128,6 +132,12 @@ while True:
         break
     ZONEPARAMS = [region.LookupParameter("MEPCE HVAC Zone").Set(zone) for region in regions]
 
+    # The snapshot is only updated after the transaction, use the new zones for the selected regions
+    for region in regions:
+        if region.Id.IntegerValue not in regionzones:
+            filledregions.append(region)
+        regionzones[region.Id.IntegerValue] = zone
+
     #  _____
     # |____ |
     #     / /
@@ -135,7 +145,7 @@ while True:
     # .___/ /
     # \____/
     # Update zone colors
-    update_zone_colors(active_view,filledregions)
+    update_zone_colors(active_view,filledregions,[regionzones[region.Id.IntegerValue] for region in filledregions])
 
     t.Commit()
 
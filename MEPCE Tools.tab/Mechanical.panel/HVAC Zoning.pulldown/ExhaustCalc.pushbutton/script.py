@@ -1,8 +1,8 @@
 # -*- coding: utf-8 -*-
 __title__   = "Calculate Exhaust"
 __highlight__ = "new"
-__doc__     = """Version = 1.0
-Date    = 2025.08.12
+__doc__     = """Version = 1.1
+Date    = 2026.10.18
 _________________________________________________________________
 Description:
 Calculate exhaust rates for restrooms, janitor closets, and other spaces which require exhaust.
@@ -16,6 +16,11 @@ How-to:
 -> Done!
 _________________________________________________________________
 Last update:
+- [2026.10.18] - 1.1 Fixture bounding boxes are read once per fixture
+                     Fixtures and ceilings from every loaded link are used (moved into model coordinates)
+                     Filled regions come from the session snapshot (only changed regions are read again)
+                     Fixtures are checked against 2D region outlines instead of extruded region faces, in one pass per level
+                     Region parameters are read and set through a ParameterReader (names resolved once)
 - [2025.08.12] - 1.0 RELEASE
 _________________________________________________________________
 Author: Simeon Neese"""
@@ -49,17 +54,20 @@ doc    = __revit__.ActiveUIDocument.Document    #type: Document
 # ╠╣ ║ ║║║║║   ║ ║║ ║║║║╚═╗
 # ╚  ╚═╝╝╚╝╚═╝ ╩ ╩╚═╝╝╚╝╚═╝
 #==================================================
-from Snippets._selection import get_elements_of_categories,select_multiple
-from Snippets._filledregions import get_rooms,get_faces,get_filled_region_corners
-from Snippets._geometry import get_point_average,get_solid_geometry,flatten_solids
+from Snippets._selection import get_elements_of_categories,select_multiple,get_linked_key
+from Snippets._filledregions import get_zoning_records,get_record_elements,get_record_polygon,get_filled_region_corners
+from Snippets._geometry import get_solid_geometry,flatten_solids,get_transformed_box
+from Snippets._spatial import BoundingBoxStore
+from Snippets._polygons import group_points
+from Snippets._parameters import ParameterReader
 
 
 def draw_flattened_bounding_boxes(bboxes):
     """
-    Draws flattened 2D red boxes in the active view from a list of BoundingBoxXYZ.
+    Draws flattened 2D red boxes in the active view from a list of box tuples.
 
     Args:
-        bboxes (list[BoundingBoxXYZ]): List of bounding boxes to flatten and draw.
+        bboxes (list[tuple]): List of (minx, miny, minz, maxx, maxy, maxz) boxes to flatten and draw.
     """
     if not bboxes:
         return
@@ -74,8 +82,8 @@ def draw_flattened_bounding_boxes(bboxes):
         if not bbox:
             continue
 
-        min_pt = bbox.Min
-        max_pt = bbox.Max
+        min_pt = XYZ(bbox[0], bbox[1], bbox[2])
+        max_pt = XYZ(bbox[3], bbox[4], bbox[5])
 
         # Flatten to a single Z plane (active view's origin Z or min_pt.Z)
         z = getattr(active_view, "Origin", XYZ(0, 0, min_pt.Z)).Z
@@ -101,13 +109,6 @@ def draw_flattened_bounding_boxes(bboxes):
 
     t.Commit()
 
-def get_link_instance_from_link_doc(doc, link_doc):
-    """Return the RevitLinkInstance for a given LinkDocument."""
-    for link_instance in FilteredElementCollector(doc).OfClass(RevitLinkInstance):
-        if link_instance.GetLinkDocument() and link_instance.GetLinkDocument().Equals(link_doc):
-            return link_instance
-    return None
-
 # ╔╦╗╔═╗╦╔╗╔
 # ║║║╠═╣║║║║
 # ╩ ╩╩ ╩╩╝╚╝
@@ -121,6 +122,14 @@ update = alert("Which would you like to calculate for?",options=['Restroom / Cus
 if not update:
     alert("Nothing chosen. Exiting script.",exitscript=True)
 
+# Filled regions to update (from the session snapshot, only changed regions are read again)
+# Regions deleted since the snapshot was read are skipped
+region_pairs = get_record_elements([record for record in get_zoning_records()
+                                    if record["params"]["MEPCE Room Number"] is not None and record["params"]["MEPCE Update Region"] == 1])
+region_records = [record for record, region in region_pairs]
+roomregions = [region for record, region in region_pairs]
+reader = ParameterReader(["MEPCE Room Number", "MEPCE Room Name", "Area", "MEPCE Room Exhaust", "MEPCE Ceiling Height"])
+
 #  __
 # /  |
 # `| |
@@ -132,17 +141,21 @@ if update == 'Restroom / Custodian Fixture Exhaust' or update == 'Both':
     plumbingfix = get_elements_of_categories(
         categories=[BuiltInCategory.OST_PlumbingFixtures],
         linked=True,
-        readout=debugmode)
+        readout=debugmode,
+        tagged=True)
 
-    exfix = []
-    for fix in plumbingfix:
+    exfix = []                                                              # Fixture keys, once per link instance
+    fixtureelements = {}
+    fixturebounds = BoundingBoxStore()                                      # Fixture boxes in model coordinates, read once
+    for fix, link, transform in plumbingfix:
         family = fix.LookupParameter("Family").AsValueString()
-        if "Toilet" in family and not "Stall" in family and not "Tissue" in family:
-            exfix.append(fix)
-        elif "Urinal" in family:
-            exfix.append(fix)
-        elif "Mop Sink" in family:
-            exfix.append(fix)
+        toilet = "Toilet" in family and not "Stall" in family and not "Tissue" in family
+        if not (toilet or "Urinal" in family or "Mop Sink" in family):
+            continue
+        key = get_linked_key(fix, link)
+        exfix.append(key)
+        fixtureelements[key] = fix
+        fixturebounds.add(key, get_transformed_box(fix.get_BoundingBox(None), transform))
 
     components1 =   [Label('CFM / Fixture'),   TextBox('inpexhaust'),
                      Separator(),              Button('Continue')]
@@ -162,29 +175,30 @@ if update == 'Restroom / Custodian Fixture Exhaust' or update == 'Both':
     # Group filled regions and fixtures by level
     active_view = doc.ActiveView
 
-    roomregions = get_rooms()
-    roomregions = [room for room in roomregions if room.LookupParameter("MEPCE Update Region").AsInteger() == 1]
     levels = FilteredElementCollector(doc).OfClass(Level).ToElements()
 
     levelnames = [level.Name for level in levels]
     levelregions = {}
+    levelpolygons = {}
     levelfixtures = {}
     levelbounding = {}
 
     for level in levelnames:
         if not level in levelregions:
             levelregions[level] = []
+            levelpolygons[level] = []
         if not level in levelfixtures:
             levelfixtures[level] = []
         if not level in levelbounding:
             levelbounding[level] = []
-        for room in roomregions:
-            if doc.GetElement(room.OwnerViewId).GenLevel.Name == level:
+        for room, record in zip(roomregions, region_records):
+            if record["level"] == level:
                 levelregions[level].append(room)
-        for fixture in exfix:
-            if fixture.LookupParameter("Level").AsValueString() == level:
-                levelfixtures[level].append(fixture)
-                levelbounding[level].append(fixture.get_BoundingBox(None))
+                levelpolygons[level].append(get_record_polygon(record))
+        for key in exfix:
+            if fixtureelements[key].LookupParameter("Level").AsValueString() == level:
+                levelfixtures[level].append(key)
+                levelbounding[level].append(fixturebounds.get_box(key))
 
 
     #  _____
@@ -201,26 +215,22 @@ if update == 'Restroom / Custodian Fixture Exhaust' or update == 'Both':
         regions = levelregions[level]
         if not regions:
             continue
-        faces = get_faces([regions])[0]
+        polygons = levelpolygons[level]
         fixtures = levelfixtures[level]
-        locations = [fixture.Location.Point for fixture in fixtures]
-        if not locations:
+        if not fixtures:
             continue
+        centers = [fixturebounds.center(key) for key in fixtures]
+        groups = group_points(polygons, centers)        # Fixture indices inside each region
         for r_idx,region in enumerate(regions):
             fixinregion = []
-            for f_idx,fixture in enumerate(fixtures):
-                bounding = fixture.get_BoundingBox(None)
-                MIN = bounding.Min
-                MAX = bounding.Max
-                AVG = get_point_average(MIN,MAX)
-                if faces[r_idx].Project(AVG):
-                    fixinregion.append(fixture)
-                    bounding = fixture.get_BoundingBox(None)
-                    levelbounding[level].append(bounding)
+            for f_idx in groups[r_idx]:
+                key = fixtures[f_idx]
+                fixinregion.append(fixtureelements[key])
+                levelbounding[level].append(fixturebounds.get_box(key))
             fixexhaust = len(fixinregion)*inpexhaust/60
             if len(fixinregion) > 0:
                 regionexhaust[region] = fixexhaust
-                print "\nRoom: {}".format(region.LookupParameter("MEPCE Room Number").AsString()+" "+region.LookupParameter("MEPCE Room Name").AsString())
+                print "\nRoom: {}".format(reader.read(region, "MEPCE Room Number")+" "+reader.read(region, "MEPCE Room Name"))
                 print "Fixtures: {}\nExhaust: {} CFM".format(len(fixinregion),int(fixexhaust*60))
 
     if debugmode is True:
@@ -257,8 +267,8 @@ if update == 'Air Change Exhaust' or update == 'Both':
         alert("No exhaust calculation method selected. Exiting script.",exitscript=True)
 
     regionsd = {}
-    for region in roomregions:
-        name = region.LookupParameter("MEPCE Room Number").AsString()+" "+region.LookupParameter("MEPCE Room Name").AsString()
+    for record,region in region_pairs:
+        name = record["params"]["MEPCE Room Number"]+" "+record["params"]["MEPCE Room Name"]
         regionsd[name] = region
     r_names = regionsd.keys()
 
@@ -294,14 +304,11 @@ if update == 'Air Change Exhaust' or update == 'Both':
     ceilings = get_elements_of_categories(
         categories=[BuiltInCategory.OST_Ceilings],
         linked=True,
-        readout=debugmode)
-
-    linkdoc = [ceiling.Document for ceiling in ceilings][0]
-    linkinstance = get_link_instance_from_link_doc(doc,linkdoc)
-    transform = linkinstance.GetTransform()
+        readout=debugmode,
+        tagged=True)
 
     levelceilings = {}
-    for ceiling in ceilings:
+    for ceiling, link, transform in ceilings:
         levelname = ceiling.LookupParameter("Level").AsValueString()
         ceilingsolid = get_solid_geometry(ceiling,transform)
         if not ceilingsolid:
@@ -326,9 +333,10 @@ if update == 'Air Change Exhaust' or update == 'Both':
     # | \_/ |
     # \_____/
     # Calculate exhaust CFM for selected rooms
-    for region in selectedregions:
-        roomname = region.LookupParameter("MEPCE Room Number").AsString()+" "+region.LookupParameter("MEPCE Room Name").AsString()
-        area = region.LookupParameter("Area").AsDouble()
+    regionvalues = reader.read_columns(selectedregions)
+    for r_idx,region in enumerate(selectedregions):
+        roomname = regionvalues["MEPCE Room Number"][r_idx]+" "+regionvalues["MEPCE Room Name"][r_idx]
+        area = regionvalues["Area"][r_idx]
         level = doc.GetElement(region.OwnerViewId).GenLevel.Name
         if method == "CFM/sf (Area)":
             regionexhaust[region] = area*float(exhaustrate)/60
@@ -364,7 +372,7 @@ if update == 'Air Change Exhaust' or update == 'Both':
 t = Transaction(doc,"Update Exhaust Parameter")
 t.Start()
 for region in regionexhaust:
-    region.LookupParameter("MEPCE Room Exhaust").Set(regionexhaust[region])
+    reader.get(region, "MEPCE Room Exhaust").Set(regionexhaust[region])
     if region in ceilingheights:
-        region.LookupParameter("MEPCE Ceiling Height").Set(ceilingheights[region])
+        reader.get(region, "MEPCE Ceiling Height").Set(ceilingheights[region])
 t.Commit()
\ No newline at end of file
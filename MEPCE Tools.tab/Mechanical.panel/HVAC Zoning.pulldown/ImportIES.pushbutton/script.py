@@ -1,8 +1,8 @@
 # -*- coding: utf-8 -*-
 __title__   = "Import IES Data"
 #__highlight__ = "new"
-__doc__     = """Version = 1.0
-Date    = 2025.07.28
+__doc__     = """Version = 1.1
+Date    = 2026.10.18
 _________________________________________________________________
 Description:
 Import IES data and update filled region parameters.
@@ -14,6 +14,8 @@ How-to:
 -> Done!
 _________________________________________________________________
 Last update:
+- [2026.10.18] - 1.1 Filled regions come from the session snapshot (only changed regions are read again)
+                     Region parameters are set through a ParameterReader (names resolved once)
 - [2025.07.28] - 1.0 RELEASE
 _________________________________________________________________
 Author: Simeon Neese"""
@@ -49,7 +51,8 @@ doc    = __revit__.ActiveUIDocument.Document    #type: Document
 # ╠╣ ║ ║║║║║   ║ ║║ ║║║║╚═╗
 # ╚  ╚═╝╝╚╝╚═╝ ╩ ╩╚═╝╝╚╝╚═╝
 #==================================================
-
+from Snippets._filledregions import get_zoning_records, get_record_elements
+from Snippets._parameters import ParameterReader
 
 # ╔╦╗╔═╗╦╔╗╔
 # ║║║╠═╣║║║║
@@ -152,15 +155,15 @@ for x_idx, key in enumerate(keys):
 # \____/
 # Get all filled regions in the project
 
-regions = FilteredElementCollector(doc).OfCategory(
-        BuiltInCategory.OST_DetailComponents).OfClass(FilledRegion).ToElements()
+# (from the session snapshot, only changed regions are read again, deleted regions are skipped)
 regiondic = {}
-for region in regions:
-        roomnumber = region.LookupParameter("MEPCE Room Number")
-        if roomnumber.AsString() != "None":
-            roomnumber = roomnumber.AsString()
+for record, region in get_record_elements(get_zoning_records()):
+        roomnumber = record["params"]["MEPCE Room Number"]
+        if roomnumber != "None":
             regiondic[roomnumber] = region
 
+reader = ParameterReader(["MEPCE Room Airflow", "MEPCE Room Ventilation"])
+
 t = Transaction(doc,"Import IES Data")
 t.Start()
 for key in keys:
@@ -173,6 +176,6 @@ for key in keys:
     roomairflow = region_data[key]['supply'] / 60
     roomventilation = region_data[key]['outsideair'] / 60
 
-    setroomairflow = keyregion.LookupParameter("MEPCE Room Airflow").Set(float(roomairflow))
-    setroomventilation = keyregion.LookupParameter("MEPCE Room Ventilation").Set(float(roomventilation))
+    setroomairflow = reader.get(keyregion, "MEPCE Room Airflow").Set(float(roomairflow))
+    setroomventilation = reader.get(keyregion, "MEPCE Room Ventilation").Set(float(roomventilation))
 t.Commit()
\ No newline at end of file
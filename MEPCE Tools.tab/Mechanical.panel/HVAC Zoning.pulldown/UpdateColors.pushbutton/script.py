@@ -1,13 +1,14 @@
 # -*- coding: utf-8 -*-
 __title__   = "Update Zone Colors"
 #__highlight__ = "new"
-__doc__     = """Version = 1.0
-Date    = 2025.07.28
+__doc__     = """Version = 1.1
+Date    = 2026.10.18
 _________________________________________________________________
 Description:
 Updates zone colors. Run after manually making changes to zoning.
 _________________________________________________________________
 Last update:
+- [2026.10.18] - 1.1 Filled regions and zones come from the session snapshot (only changed regions are read again)
 - [2025.07.28] - 1.0 RELEASE
 _________________________________________________________________
 Author: Simeon Neese"""
@@ -45,6 +46,7 @@ doc    = __revit__.ActiveUIDocument.Document    #type: Document
 #==================================================
 from Snippets._selection import select_multiple
 from Snippets._math import get_lowest_available, update_zone_colors
+from Snippets._filledregions import get_zoning_records, get_record_elements
 
 # ╔╦╗╔═╗╦╔╗╔
 # ║║║╠═╣║║║║
@@ -52,9 +54,12 @@ from Snippets._math import get_lowest_available, update_zone_colors
 #==================================================
 
 active_view = doc.ActiveView
-filledregions = FilteredElementCollector(doc, active_view.Id).OfCategory(
-        BuiltInCategory.OST_DetailComponents).OfClass(FilledRegion).ToElements()
+# Filled regions in the active view (from the session snapshot, only changed regions are read again)
+region_pairs = get_record_elements([record for record in get_zoning_records()
+                                    if record["view"] == active_view.Id.IntegerValue])
+filledregions = [region for record, region in region_pairs]
+zones = [record["params"]["MEPCE HVAC Zone"] for record, region in region_pairs]
 t = Transaction(doc,"Update Zone Colors")
 t.Start()
-update_zone_colors(active_view,filledregions)
+update_zone_colors(active_view,filledregions,zones)
 t.Commit()
\ No newline at end of file
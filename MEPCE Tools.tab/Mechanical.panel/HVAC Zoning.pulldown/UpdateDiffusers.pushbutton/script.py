@@ -1,8 +1,8 @@
 # -*- coding: utf-8 -*-
 __title__   = "Update Diffuser CFM"
 __highlight__ = "new"
-__doc__     = """Version = 1.1
-Date    = 2025.08.14
+__doc__     = """Version = 1.2
+Date    = 2026.10.18
 _________________________________________________________________
 Description:
 Update airflow for all diffusers in active view. Requires zone setup with filled regions and IES data imported using HVAC Zoning buttons.
@@ -16,6 +16,11 @@ How-to:
 -> Done!
 _________________________________________________________________
 Last update:
+- [2026.10.18] - 1.2 Filled regions come from the session snapshot (only changed regions are read again)
+                     Terminals are checked against 2D region outlines instead of extruded region faces,
+                     grouped by region in one pass per system
+                     Region values are read from the zoning snapshot records, terminal parameters are
+                     set through a ParameterReader (names resolved once)
 - [2025.08.14] - 1.1 Added rounding
 - [2025.08.07] - 1.0 RELEASE
 _________________________________________________________________
@@ -50,7 +55,9 @@ doc    = __revit__.ActiveUIDocument.Document    #type: Document
 # ╠╣ ║ ║║║║║   ║ ║║ ║║║║╚═╗
 # ╚  ╚═╝╝╚╝╚═╝ ╩ ╩╚═╝╝╚╝╚═╝
 #==================================================
-from Snippets._filledregions import get_faces
+from Snippets._filledregions import get_zoning_records, get_record_elements, get_record_polygon
+from Snippets._polygons import group_points
+from Snippets._parameters import ParameterReader
 
 # ╔╦╗╔═╗╦╔╗╔
 # ║║║╠═╣║║║║
@@ -125,43 +132,38 @@ rounding = float(user_inputs['rounding'])/60
 # .___/ /
 # \____/
 # Get Filled Regions On Level With Room Airflow Parameter
-allregions = FilteredElementCollector(doc).OfClass(FilledRegion).ToElements()
-regions = []
-for region in allregions:
-    if type(doc.GetElement(region.OwnerViewId).GenLevel) is NoneType:
-        continue
-    else:
-        regions.append(region)
-
-regions = [region for region in regions if doc.GetElement(region.OwnerViewId).GenLevel.Name == view_level.Name]
-faces = get_faces([regions])[0]
+# (regions deleted since the snapshot was read are skipped)
+region_pairs = get_record_elements(get_zoning_records(level=view_level.Name))
+region_records = [record for record, region in region_pairs]
+polygons = [get_record_polygon(record) for record in region_records]
+termreader = ParameterReader(["Air Terminal Air Flow", "Comments"])
+
+# Terminals inside each region, by system
+systemgroups = {}
+for system in selsystems:
+    systerminals = sortedterminals[system]
+    groups = group_points(polygons, [(term.Location.Point.X, term.Location.Point.Y) for term in systerminals])
+    systemgroups[system] = [[systerminals[k] for k in group] for group in groups]
 
 t = Transaction(doc,"Update Diffuser CFM's")
 t.Start()
-for idx_f,face in enumerate(faces):
+for idx_f,polygon in enumerate(polygons):
     roomgroups = {}
-    room = regions[idx_f]
-    supplyair = room.LookupParameter("MEPCE Room Airflow").AsDouble()
-    exhaustair = room.LookupParameter("MEPCE Room Exhaust").AsDouble()
-    ventair = room.LookupParameter("MEPCE Room Ventilation").AsDouble()
-    update = room.LookupParameter("MEPCE Update Region").AsInteger()
-    number = room.LookupParameter("MEPCE Room Number").AsString()
+    params = region_records[idx_f]["params"]
+    supplyair = params["MEPCE Room Airflow"]
+    exhaustair = params["MEPCE Room Exhaust"]
+    ventair = params["MEPCE Room Ventilation"]
+    update = params["MEPCE Update Region"]
+    number = params["MEPCE Room Number"]
     if not number:
         continue
     if update == 0:
         continue
     if DEBUGMODE is True:
-        print "\nRoom: {} {}".format(number, room.LookupParameter("MEPCE Room Name").AsString())
+        print "\nRoom: {} {}".format(number, params["MEPCE Room Name"])
         print "Supply: {} CFM\nVentilation: {} CFM\nExhaust: {} CFM".format(supplyair, ventair, exhaustair)
     for system in selsystems:
-        roomgroup = []
-        systerminals = sortedterminals[system]
-        for term in systerminals:
-            location = term.Location.Point
-            if face.Project(location):
-                roomgroup.append(term)
-            else:
-                continue
+        roomgroup = systemgroups[system][idx_f]
         termcount = len(roomgroup)
         if DEBUGMODE is True:
             print "{} Terminals: {}".format(system,termcount)
@@ -169,15 +171,15 @@ for idx_f,face in enumerate(faces):
             continue
         if system == "Supply Air" :
             for term in roomgroup:
-                term.LookupParameter("Air Terminal Air Flow").Set(math.ceil(supplyair/termcount/rounding)*rounding)
+                termreader.get(term, "Air Terminal Air Flow").Set(math.ceil(supplyair/termcount/rounding)*rounding)
         if system == "Return Air":
             for term in roomgroup:
-                term.LookupParameter("Air Terminal Air Flow").Set(math.ceil(supplyair/termcount/rounding)*rounding)
-                term.LookupParameter("Comments").Set("-")
+                termreader.get(term, "Air Terminal Air Flow").Set(math.ceil(supplyair/termcount/rounding)*rounding)
+                termreader.get(term, "Comments").Set("-")
         if system == "Exhaust Air" :
             for term in roomgroup:
-                term.LookupParameter("Air Terminal Air Flow").Set(math.ceil(exhaustair/termcount/rounding)*rounding)
+                termreader.get(term, "Air Terminal Air Flow").Set(math.ceil(exhaustair/termcount/rounding)*rounding)
         if system == "Outside Air" :
             for term in roomgroup:
-                term.LookupParameter("Air Terminal Air Flow").Set(math.ceil(ventair/termcount/rounding)*rounding)
+                termreader.get(term, "Air Terminal Air Flow").Set(math.ceil(ventair/termcount/rounding)*rounding)
 t.Commit()
\ No newline at end of file
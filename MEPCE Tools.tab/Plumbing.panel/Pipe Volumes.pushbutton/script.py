@@ -1,13 +1,15 @@
 # -*- coding: utf-8 -*-
 __title__ = "Pipe Volumes"
 #__highlight__ = "new"
-__doc__ = """Version = 1.0
-Date    = 2025.07.22
+__doc__ = """Version = 1.1
+Date    = 2026.10.18
 _________________________________________________________________
 Description:
 Calculates the total pipe volume for each piping system in the project, then exports the results as an excel workbook on the user's desktop.
 _________________________________________________________________
 Last update:
+- [2026.10.18] - 1.1 Pipes are read one at a time (only system, id and length are kept) and
+                     system type names are read once, so large models use much less memory
 - [2025.07.22] - 1.0 RELEASE
 _________________________________________________________________
 Author: Michael Opperman
@@ -33,7 +35,7 @@ from pyrevit.forms import alert
 #  ╚╝ ╩ ╩╩╚═╩╩ ╩╚═╝╩═╝╚═╝╚═╝ VARIABLES
 #==================================================
 from Autodesk.Revit.UI import UIDocument
-from Snippets._selection import get_elements_of_categories
+from Snippets._selection import iter_elements_of_categories, get_system_type_names, get_system_type_id
 
 doc   = __revit__.ActiveUIDocument.Document
 uidoc = __revit__.ActiveUIDocument
@@ -60,33 +62,27 @@ def get_base_system_name(name):
         return "Unassigned"
     return name.split()[0] if " " in name else name
 
-# Collect all pipe elements in the project
-pipe_elements = get_elements_of_categories(
-    categories=[BuiltInCategory.OST_PipeCurves]
-)
+# Read all pipe elements in the project one at a time
+system_type_names = get_system_type_names(doc)
 
-if not pipe_elements:
-    alert("No pipe elements found in project. Exiting script.", exitscript=True)
-
-# Group volume and elements by base system type
+# Group volume and pipe details by base system type
 volume_by_base_system = {}
-elements_by_base_system = {}
+details_by_base_system = {}
 
-for pipe in pipe_elements:
-    try:
-        sys_name = pipe.MEPSystem.LookupParameter("Type").AsValueString()
-        if not sys_name:
-            sys_name = mep.Name
-    except:
-        sys_name = "Unassigned"
+for pipe in iter_elements_of_categories([BuiltInCategory.OST_PipeCurves]):
+    sys_name = system_type_names.get(get_system_type_id(pipe)) or "Unassigned"
 
     vol = get_pipe_volume(pipe)
 
     volume_by_base_system[sys_name] = volume_by_base_system.get(sys_name, 0.0) + vol
 
-    if sys_name not in elements_by_base_system:
-        elements_by_base_system[sys_name] = []
-    elements_by_base_system[sys_name].append(pipe)
+    if sys_name not in details_by_base_system:
+        details_by_base_system[sys_name] = []
+    length = pipe.get_Parameter(BuiltInParameter.CURVE_ELEM_LENGTH)
+    details_by_base_system[sys_name].append((pipe.Id.IntegerValue, length.AsDouble() if length else 0))
+
+if not volume_by_base_system:
+    alert("No pipe elements found in project. Exiting script.", exitscript=True)
 
 # Excel export path
 export_dir = os.path.expanduser("~\\Desktop\\")
@@ -116,11 +112,8 @@ details_sheet.write("B1", "Pipe ID")
 details_sheet.write("C1", "Length (ft)")
 
 row = 2
-for system, elems in sorted(elements_by_base_system.items()):
-    for el in elems:
-        el_id = el.Id.IntegerValue
-        length_param = el.LookupParameter("Length")
-        length = length_param.AsDouble() if length_param else 0
+for system, details in sorted(details_by_base_system.items()):
+    for el_id, length in details:
         length_ft = round(length, 2)
 
         details_sheet.write("A{}".format(row), system)
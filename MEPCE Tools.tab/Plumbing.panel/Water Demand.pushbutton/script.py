@@ -1,8 +1,8 @@
 # -*- coding: utf-8 -*-
 __title__ = "Water Demand"
 #__highlight__ = "new"
-__doc__ = """Version = 1.0
-Date    = 2025.07.24
+__doc__ = """Version = 1.1
+Date    = 2026.10.18
 _________________________________________________________________
 Description:
 Counts plumbing fixtures and exports to Waste and Water Demand Calc excel workbook.
@@ -15,6 +15,7 @@ How-to:
 -> Done!
 _________________________________________________________________
 Last update:
+- [2026.10.18] - 1.1 Fixtures are counted as they are read, type comments are read once per type
 - [2025.07.24] - 1.0 RELEASE
 _________________________________________________________________
 Author: Michael Opperman"""
@@ -54,7 +55,7 @@ app   = __revit__.Application
 # ╠╣ ║ ║║║║║   ║ ║║ ║║║║╚═╗
 # ╚  ╚═╝╝╚╝╚═╝ ╩ ╩╚═╝╝╚╝╚═╝
 #==================================================
-from Snippets._selection import get_elements_of_categories
+from Snippets._selection import iter_elements_of_categories
 
 
 def is_workbook_open(filepath):
@@ -101,15 +102,34 @@ if selection_mode == "Manual Selection":
     except:
         alert("No elements selected or selection canceled.", exitscript=True)
 else:
-    # Full project plumbing fixture collection
-    plumbing_fixtures = get_elements_of_categories(
-        categories=[BuiltInCategory.OST_PlumbingFixtures],
-        systemtypes=None,
-        view=None,
-        readout=False
+    # Full project plumbing fixture collection (read one at a time)
+    plumbing_fixtures = iter_elements_of_categories(
+        categories=[BuiltInCategory.OST_PlumbingFixtures]
     )
 
-if not plumbing_fixtures:
+# Build quantity dictionary from Revit plumbing fixtures
+fixture_counts = defaultdict(int)
+type_comments = {}                  # Fixture type id: type comment
+
+for fixture in plumbing_fixtures:
+    try:
+        type_id = fixture.GetTypeId().IntegerValue
+        if type_id not in type_comments:
+            symbol = fixture.Symbol
+            if symbol is None:
+                type_comments[type_id] = None
+            else:
+                type_comments_param = symbol.LookupParameter("Type Comments")
+                type_comments[type_id] = type_comments_param.AsString() if type_comments_param and type_comments_param.HasValue else "None"
+        if type_comments[type_id] is None:
+            continue
+
+        fixture_counts[type_comments[type_id]] += 1
+    except Exception as e:
+        print("Error processing fixture ID {}: {}".format(fixture.Id, str(e)))
+        continue
+
+if not fixture_counts:
     alert("No plumbing fixtures found in project. Exiting script.", exitscript=True)
     
 #print("Fixture Counts:", dict(fixture_counts))
@@ -144,23 +164,6 @@ start_row = 7
 col_tag = 20     # Column T
 col_qty = 21     # Column U
 
-# Build quantity dictionary from Revit plumbing fixtures
-fixture_counts = defaultdict(int)
-
-for fixture in plumbing_fixtures:
-    try:
-        symbol = fixture.Symbol
-        if symbol is None:
-            continue
-
-        type_comments_param = symbol.LookupParameter("Type Comments")
-        type_comment = type_comments_param.AsString() if type_comments_param and type_comments_param.HasValue else "None"
-
-        fixture_counts[type_comment] += 1
-    except Exception as e:
-        print("Error processing fixture ID {}: {}".format(fixture.Id, str(e)))
-        continue
-
 # Write to Excel starting at T7 and U7
 current_row = start_row
 for tag, qty in sorted(fixture_counts.items()):
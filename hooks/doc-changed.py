@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+#⬇️ Imports
+from Snippets._cache import get_change_tracker
+
+#--------------------------------------------------
+#📦 Variables
+args = __eventargs__   # Autodesk.Revit.DB.Events.DocumentChangedEventArgs
+
+#--------------------------------------------------
+#🎯 MAIN
+# Record changed element ids for session caches (eg: the zoning filled region snapshot)
+document = args.GetDocument()
+key = document.PathName or document.Title
+tracker = get_change_tracker()
+if tracker.is_tracking(key):
+    ids = []
+    for element_ids in [args.GetAddedElementIds(), args.GetModifiedElementIds(), args.GetDeletedElementIds()]:
+        ids.extend(element_id.IntegerValue for element_id in element_ids)
+    tracker.add(key, ids)
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+#⬇️ Imports
+from Snippets._cache import forget_document
+
+#--------------------------------------------------
+#📦 Variables
+args = __eventargs__   # Autodesk.Revit.DB.Events.DocumentClosingEventArgs
+
+#--------------------------------------------------
+#🎯 MAIN
+# Drop the session caches of a closing document (eg: the zoning filled region snapshot)
+document = args.Document
+forget_document(document.PathName or document.Title)
@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+#⬇️ Imports
+from Snippets._cache import forget_document
+
+#--------------------------------------------------
+#📦 Variables
+args = __eventargs__   # Autodesk.Revit.DB.Events.DocumentOpenedEventArgs
+
+#--------------------------------------------------
+#🎯 MAIN
+# A reopened model (or a new local copy with the same path) may not match the session caches, read it again
+document = args.Document
+if document is not None:
+    forget_document(document.PathName or document.Title)
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+# Caches which can live for the whole Revit session. Pure python except for get_session_cache,
+# which keeps objects on the .NET AppDomain when running inside Revit.
+
+# ╦╔╦╗╔═╗╔═╗╦═╗╔╦╗╔═╗
+# ║║║║╠═╝║ ║╠╦╝ ║ ╚═╗
+# ╩╩ ╩╩  ╚═╝╩╚═ ╩ ╚═╝ IMPORTS
+#==================================================
+from collections import OrderedDict
+
+# ╦  ╦╔═╗╦═╗╦╔═╗╔╗ ╦  ╔═╗╔═╗
+# ╚╗╔╝╠═╣╠╦╝║╠═╣╠╩╗║  ║╣ ╚═╗
+#  ╚╝ ╩ ╩╩╚═╩╩ ╩╚═╝╩═╝╚═╝╚═╝ VARIABLES
+#==================================================
+SESSION_PREFIX = "MEPCE_TOOLS_"
+_session_fallback = {}      # Used when the AppDomain is not available (outside Revit)
+MAX_TRACKED_CHANGES = 5000  # More changed elements than this between runs and caches are rebuilt instead
+DOCUMENT_CACHES = ["ZoningSnapshot", "ViewDisciplines", "LinkDocuments"]    # Session caches keyed by document
+
+#  _    _        _         _      _              _   _     ______  _   _   _____               _
+# | |  | |      (_)       | |    | |            | | | |    | ___ \| | | | /  __ \             | |
+# | |  | |  ___  _   __ _ | |__  | |_   ___   __| | | |    | |_/ /| | | | | /  \/  __ _   ___ | |__    ___
+# | |/\| | / _ \| | / _` || '_ \ | __| / _ \ / _` | | |    |    / | | | | | |     / _` | / __|| '_ \  / _ \
+# \  /\  /|  __/| || (_| || | | || |_ |  __/| (_| | | |____| |\ \ | |_| | | \__/\| (_| || (__ | | | ||  __/
+#  \/  \/  \___||_| \__, ||_| |_| \__| \___| \__,_| \_____/\_| \_| \___/   \____/ \__,_| \___||_| |_| \___|
+#                    __/ |
+#                   |___/
+# Least recently used cache which evicts by total weight instead of item count
+class WeightedLRUCache(object):
+    """Least recently used cache with a weight per item (eg: number of solid faces).
+    When the total weight goes over max_weight the oldest items are removed until it fits again.
+
+    eg:
+    cache = WeightedLRUCache(1000)
+    cache.put("a", value, weight=10)
+    cache.get("a")      # value, or None if it was evicted"""
+
+    def __init__(self, max_weight):
+        self.max_weight = max_weight
+        self.total_weight = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()     # key: (value, weight)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key, default=None):
+        """Get a value and mark it as recently used"""
+        item = self._items.pop(key, None)
+        if item is None:
+            self.misses += 1
+            return default
+        self._items[key] = item
+        self.hits += 1
+        return item[0]
+
+    def put(self, key, value, weight=1):
+        """Add or replace a value. Items heavier than max_weight are not stored."""
+        self.remove(key)
+        if weight > self.max_weight:
+            return
+        self._items[key] = (value, weight)
+        self.total_weight += weight
+        while self.total_weight > self.max_weight and self._items:
+            oldkey, olditem = self._items.popitem(last=False)
+            self.total_weight -= olditem[1]
+
+    def remove(self, key):
+        """Remove a key if it exists"""
+        item = self._items.pop(key, None)
+        if item is not None:
+            self.total_weight -= item[1]
+
+    def clear(self):
+        """Remove everything and reset the hit/miss counters"""
+        self._items.clear()
+        self.total_weight = 0
+        self.hits = 0
+        self.misses = 0
+
+#  _____  _                                  _____                     _
+# /  __ \| |                                |_   _|                   | |
+# | /  \/| |__    __ _  _ __    __ _   ___    | |   _ __   __ _   ___ | | __  ___  _ __
+# | |    | '_ \  / _` || '_ \  / _` | / _ \   | |  | '__| / _` | / __|| |/ / / _ \| '__|
+# | \__/\| | | || (_| || | | || (_| ||  __/   | |  | |   | (_| || (__ |   < |  __/| |
+#  \____/|_| |_| \__,_||_| |_| \__, | \___|   \_/  |_|    \__,_| \___||_|\_\ \___||_|
+#                               __/ |
+#                              |___/
+# Changed element ids per document, so session caches only re-read what was edited
+class ChangeTracker(object):
+    """Collects ids (integers) of added, modified and deleted elements per document between button runs.
+    Filled by the doc-changed hook, only for documents a cache has asked about with pop().
+    Each cache pops its own changes by name. If more than max_changes elements change, everything is treated as changed.
+
+    eg:
+    changed = get_change_tracker().pop(key, "ZoningSnapshot")     # None: read everything, otherwise a set of ids"""
+
+    def __init__(self, max_changes=MAX_TRACKED_CHANGES):
+        self.max_changes = max_changes
+        self.changes = {}       # Document key: {cache name: set of ids, or None when everything changed}
+
+    def is_tracking(self, key):
+        """Check if changes are being collected for a document (by a cache that does not already need everything)"""
+        return any(changed is not None for changed in self.changes.get(key, {}).values())
+
+    def add(self, key, ids):
+        """Record changed element ids for a document"""
+        caches = self.changes.get(key, {})
+        for name, changed in caches.items():
+            if changed is None:
+                continue
+            changed.update(ids)
+            if len(changed) > self.max_changes:
+                caches[name] = None
+
+    def forget(self, key):
+        """Stop collecting changes for a document (eg: when it is closed)"""
+        self.changes.pop(key, None)
+
+    def pop(self, key, name):
+        """Get the ids changed since this cache's last pop and start collecting again.
+        Returns None the first time a cache asks about a document or if too many elements changed."""
+        caches = self.changes.setdefault(key, {})
+        changed = caches.get(name)
+        caches[name] = set()
+        return changed
+
+#  _____        _     _____                  _                 _____               _
+# |  __ \      | |   /  ___|                (_)               /  __ \             | |
+# | |  \/  ___ | |_  \ `--.   ___  ___  ___  _   ___   _ __   | /  \/  __ _   ___ | |__    ___
+# | | __  / _ \| __|  `--. \ / _ \/ __|/ __|| | / _ \ | '_ \  | |     / _` | / __|| '_ \  / _ \
+# | |_\ \|  __/| |_  /\__/ /|  __/\__ \\__ \| || (_) || | | | | \__/\| (_| || (__ | | | ||  __/
+#  \____/ \___| \__| \____/  \___||___/|___/|_| \___/ |_| |_|  \____/ \__,_| \___||_| |_| \___|
+# Get (or create) an object shared by every button run in this Revit session
+def get_session_cache(name, factory):
+    """Get an object that lives for the whole Revit session, creating it with factory() on first use.
+    pyRevit runs each button in a fresh engine, so module level variables do not survive between runs.
+    Objects are kept on the AppDomain instead, which lasts until Revit is closed.
+
+    eg:
+    cache = get_session_cache("SolidGeometry", lambda: WeightedLRUCache(100000))"""
+    key = SESSION_PREFIX + name
+    try:
+        from System import AppDomain
+        domain = AppDomain.CurrentDomain
+    except ImportError:
+        domain = None
+
+    if domain is None:
+        if key not in _session_fallback:
+            _session_fallback[key] = factory()
+        return _session_fallback[key]
+
+    obj = domain.GetData(key)
+    if obj is None:
+        obj = factory()
+        domain.SetData(key, obj)
+    return obj
+
+def get_change_tracker():
+    """Get the ChangeTracker shared by the doc-changed hook and every button in this Revit session"""
+    return get_session_cache("ChangeTracker", ChangeTracker)
+
+# ______                            _    ______                                              _
+# |  ___|                          | |   |  _  \                                            | |
+# | |_     ___   _ __   __ _   ___ | |_  | | | |  ___    ___  _   _  _ __ ___    ___  _ __  | |_
+# |  _|   / _ \ | '__| / _` | / _ \| __| | | | | / _ \  / __|| | | || '_ ` _ \  / _ \| '_ \ | __|
+# | |    | (_) || |   | (_| ||  __/| |_  | |/ / | (_) || (__ | |_| || | | | | ||  __/| | | || |_
+# \_|     \___/ |_|    \__, | \___| \__| |___/   \___/  \___| \__,_||_| |_| |_| \___||_| |_| \__|
+#                       __/ |
+#                      |___/
+# Drop the session caches of one document
+def forget_document(key):
+    """Drop every session cache entry and tracked change for a document (key is PathName or Title).
+    Called by the doc-opened and doc-closing hooks, so a reopened model or new local copy is read again."""
+    for name in DOCUMENT_CACHES:
+        get_session_cache(name, dict).pop(key, None)
+    get_change_tracker().forget(key)
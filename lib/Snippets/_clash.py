@@ -0,0 +1,479 @@
+# -*- coding: utf-8 -*-
+
+# ╦╔╦╗╔═╗╔═╗╦═╗╔╦╗╔═╗
+# ║║║║╠═╝║ ║╠╦╝ ║ ╚═╗
+# ╩╩ ╩╩  ╚═╝╩╚═ ╩ ╚═╝ IMPORTS
+#==================================================
+from Autodesk.Revit.DB import *
+
+from types import NoneType
+
+from pyrevit import script
+from pyrevit.forms import alert
+
+import os
+import json
+from math import sqrt
+
+from Snippets._proximity import prefilter_pair
+from Snippets._clashengine import (save_snapshot, format_element_key, get_changed_keys, get_kept_elements, get_valid_pairs,
+                                   get_saved_pairs, can_reuse_pair)
+from Snippets._polygons import convex_hull, bounding_rectangle, polygon_segments, unique_segments
+
+# ╦  ╦╔═╗╦═╗╦╔═╗╔╗ ╦  ╔═╗╔═╗
+# ╚╗╔╝╠═╣╠╦╝║╠═╣╠╩╗║  ║╣ ╚═╗
+#  ╚╝ ╩ ╩╩╚═╩╩ ╩╚═╝╩═╝╚═╝╚═╝ VARIABLES
+#==================================================
+doc   = __revit__.ActiveUIDocument.Document #type: Document
+uidoc = __revit__.ActiveUIDocument          #type: UIDocument
+app   = __revit__.Application               #type: Application
+
+CLASH_CACHE_VERSION = 3     # Bump when the cache file layout changes so old files are ignored
+
+#  _____        _     _____  _                                _     _   __
+# |  __ \      | |   |  ___|| |                              | |   | | / /
+# | |  \/  ___ | |_  | |__  | |  ___  _ __ ___    ___  _ __  | |_  | |/ /   ___  _   _
+# | | __  / _ \| __| |  __| | | / _ \| '_ ` _ \  / _ \| '_ \ | __| |    \  / _ \| | | |
+# | |_\ \|  __/| |_  | |___ | ||  __/| | | | | ||  __/| | | || |_  | |\  \|  __/| |_| |
+#  \____/ \___| \__| \____/ |_| \___||_| |_| |_| \___||_| |_| \__| \_| \_/ \___| \__, |
+#                                                                                 __/ |
+#                                                                                |___/
+# Get a key for an element which is unique across the model and its links
+def get_element_key(element, link=None):
+    """Get a string key for an element which is unique across the host model, linked models and each link instance
+    - link : the RevitLinkInstance a linked element was collected through (see format_element_key)"""
+    return format_element_key(element.Document.Title, element.Id.IntegerValue, link.Id.IntegerValue if link else None)
+
+#  _____  _              _       _____               _
+# /  __ \| |            | |     /  __ \             | |
+# | /  \/| |  __ _  ___ | |__   | /  \/  __ _   ___ | |__    ___
+# | |    | | / _` |/ __|| '_ \  | |     / _` | / __|| '_ \  / _ \
+# | \__/\| || (_| |\__ \| | | | | \__/\| (_| || (__ | | | ||  __/
+#  \____/|_| \__,_||___/|_| |_|  \____/ \__,_| \___||_| |_| \___|
+# Read and write last run's pair results for a model and view
+def get_clash_cache_path(view=None):
+    """Get the clash cache file for the active model and view (or the whole model if view is empty)"""
+    if view:
+        file_id = "ClashCache_{}".format(view.Id.IntegerValue)
+    else:
+        file_id = "ClashCache_Model"
+    return script.get_document_data_file(file_id, "json")
+
+def load_clash_cache(path):
+    """Load a clash cache file. Returns an empty cache if the file does not exist or can not be read.
+    Cache layout:
+    - "elements" : {element key: element version}
+    - "pairs" : {"key1|key2": {"clash": bool, "volumes": [result volumes], "bbox": [minx, miny, minz, maxx, maxy, maxz] or None}}
+      (volumes and bbox are empty when the pair was decided without a solid check)"""
+    empty = {"version": CLASH_CACHE_VERSION, "elements": {}, "pairs": {}}
+    if not path or not os.path.exists(path):
+        return empty
+    try:
+        with open(path, "r") as f:
+            cache = json.load(f)
+    except:
+        return empty
+    if cache.get("version") != CLASH_CACHE_VERSION:
+        return empty
+    return cache
+
+def save_clash_cache(path, cache):
+    """Write a clash cache file. Failing to write the cache does not stop the clash check."""
+    try:
+        with open(path, "w") as f:
+            json.dump(cache, f)
+    except Exception as e:
+        print "Could not save clash cache: {}".format(e)
+
+#  _____         _  _      _  ______                           _  _                ______
+# /  ___|       | |(_)    | | | ___ \                         | |(_)               | ___ \
+# \ `--.   ___  | | _   __| | | |_/ /  ___   _   _  _ __    __| | _  _ __    __ _  | |_/ /  ___  __  __
+#  `--. \ / _ \ | || | / _` | | ___ \ / _ \ | | | || '_ \  / _` || || '_ \  / _` | | ___ \ / _ \ \ \/ /
+# /\__/ /| (_) || || || (_| | | |_/ /| (_) || |_| || | | || (_| || || | | || (_| | | |_/ /| (_) | >  <
+# \____/  \___/ |_||_| \__,_| \____/  \___/  \__,_||_| |_| \__,_||_||_| |_| \__, | \____/  \___/ /_/\_\
+#                                                                            __/ |
+#                                                                           |___/
+# Get a model coordinate bounding box tuple for a solid
+def get_solid_bbox(solid):
+    """Get (minx, miny, minz, maxx, maxy, maxz) for a solid in model coordinates"""
+    bounding = solid.GetBoundingBox()
+    MIN = bounding.Transform.OfPoint(bounding.Min)
+    MAX = bounding.Transform.OfPoint(bounding.Max)
+    return (min(MIN.X, MAX.X), min(MIN.Y, MAX.Y), min(MIN.Z, MAX.Z),
+            max(MIN.X, MAX.X), max(MIN.Y, MAX.Y), max(MIN.Z, MAX.Z))
+
+#  _____        _     _____  _              _      ______
+# |  __ \      | |   /  __ \| |            | |     | ___ \
+# | |  \/  ___ | |_  | /  \/| |  __ _  ___ | |__   | |_/ / _ __   ___  __  __ _   _
+# | | __  / _ \| __| | |    | | / _` |/ __|| '_ \  |  __/ | '__| / _ \ \ \/ /| | | |
+# | |_\ \|  __/| |_  | \__/\| || (_| |\__ \| | | | | |    | |   | (_) | >  < | |_| |
+#  \____/ \___| \__|  \____/|_| \__,_||___/|_| |_| \_|    |_|    \___/ /_/\_\ \__, |
+#                                                                              __/ |
+#                                                                             |___/
+# Get a simple shape for an element to run cheap clash checks with
+def get_clash_proxy(element, box):
+    """Get a proxy for prefilter_pair (see Snippets._proximity).
+    Straight pipes, ducts and conduits become a centerline segment with radius, anything else is its bounding box.
+    - box : the element's bounding box tuple"""
+    proxy = {"type": "box", "box": box} if box else None
+    if not isinstance(element, MEPCurve):
+        return proxy
+    location = element.Location
+    if not isinstance(location, LocationCurve) or not isinstance(location.Curve, Line):
+        return proxy
+
+    outer = inner = None
+    for bip in [BuiltInParameter.RBS_PIPE_OUTER_DIAMETER, BuiltInParameter.RBS_CONDUIT_OUTER_DIAM_PARAM,
+                BuiltInParameter.RBS_CURVE_DIAMETER_PARAM]:
+        param = element.get_Parameter(bip)
+        if param and param.HasValue and param.AsDouble() > 0:
+            outer = inner = param.AsDouble() / 2
+            break
+    if outer is None:                                                       # Rectangular / oval duct
+        width = element.get_Parameter(BuiltInParameter.RBS_CURVE_WIDTH_PARAM)
+        height = element.get_Parameter(BuiltInParameter.RBS_CURVE_HEIGHT_PARAM)
+        if width and height and width.HasValue and height.HasValue:
+            w = width.AsDouble()
+            h = height.AsDouble()
+            outer = sqrt(w * w + h * h) / 2
+            inner = min(w, h) / 2
+    if not outer:
+        return proxy
+
+    start = location.Curve.GetEndPoint(0)
+    end = location.Curve.GetEndPoint(1)
+    return {"type": "segment", "start": (start.X, start.Y, start.Z), "end": (end.X, end.Y, end.Z),
+            "outer": outer, "inner": inner, "box": box}
+
+#  _____         _                                 _     _____         _  _      _
+# |_   _|       | |                               | |   /  ___|       | |(_)    | |
+#   | |   _ __  | |_   ___  _ __  ___   ___   ___ | |_  \ `--.   ___  | | _   __| | ___
+#   | |  | '_ \ | __| / _ \| '__|/ __| / _ \ / __|| __|  `--. \ / _ \ | || | / _` |/ __|
+#  _| |_ | | | || |_ |  __/| |   \__ \|  __/| (__ | |_  /\__/ /| (_) || || || (_| |\__ \
+#  \___/ |_| |_| \__| \___||_|   |___/ \___| \___| \__| \____/  \___/ |_||_| \__,_||___/
+# Get the clash solids between two elements' solids
+def intersect_solids(solids1, solids2):
+    """Get intersection solids between two lists of solids.
+    For each solid in solids1, the first solid in solids2 it intersects with is kept."""
+    results = []
+    for s1 in solids1:
+        for s2 in solids2:
+            if not isinstance(s1, Solid) or not isinstance(s2, Solid):
+                print 'Skipping non-solid: {}, {}'.format(type(s1),type(s2))
+                continue
+            try:
+                result = BooleanOperationsUtils.ExecuteBooleanOperation(s1,s2,BooleanOperationsType.Intersect)
+                if result.Volume > 0:
+                    results.append(result)
+                    break
+            except:
+                continue
+    return results
+
+# ______  _             _   _____  _              _
+# |  ___|(_)           | | /  __ \| |            | |
+# | |_    _  _ __    __| | | /  \/| |  __ _  ___ | |__    ___  ___
+# |  _|  | || '_ \  / _` | | |    | | / _` |/ __|| '_ \  / _ \/ __|
+# | |    | || | | || (_| | | \__/\| || (_| |\__ \| | | ||  __/\__ \
+# \_|    |_||_| |_| \__,_|  \____/|_| \__,_||___/|_| |_| \___||___/
+# Narrow phase: check candidate pairs for clashes, reusing results from the last run where nothing changed
+def find_clashes(candidate_pairs, solids1, solids2, keys1, keys2, versions, cache=None,
+                 proxies1=None, proxies2=None, keep_geometry=True, on_clash=None):
+    """Check candidate pairs for clashing solids.
+
+    - candidate_pairs : (id1, id2) pairs from the broad phase (any iterable, eg: a progress bar iterator)
+    - solids1, solids2 : {id: [solids]} for each element set
+    - keys1, keys2 : {id: element key} for each element set (see get_element_key). None if the ids are the keys
+    - versions : {element key: element version} for every element in this run (see get_element_version,
+      linked elements include their link instance transform so moving a link checks its pairs again)
+    - cache : last run's cache from load_clash_cache. Pairs where neither element changed and which did not
+      clash last time are skipped. Pairs which did clash are checked again so their clash geometry is available.
+      Elements of this run's documents which are not in versions, and their pairs, are not saved again
+    - proxies1, proxies2 : {id: proxy} from get_clash_proxy. Pairs that prefilter_pair can decide skip the solid check
+    - keep_geometry : if False, clash solids are not kept (clash_geometry entries are None) and pairs decided as
+      clashing by the prefilter do not run the solid check either. Use when clash geometry will not be drawn
+    - on_clash : called as on_clash(id1, id2, volume, bbox) for each clash as it is found, eg: to write a report row.
+      volume and bbox are None for clashes decided by the prefilter
+
+    Returns a dictionary with:
+    - "intersection_results" : {id1: [id2, ...]}
+    - "clash_geometry" : {id1: [clash solid, ...]} matching intersection_results
+    - "cache" : updated cache to save for the next run
+    - "reused" : number of pairs skipped using the cache
+    - "analytic" : number of pairs decided by the prefilter without a solid check"""
+    if cache is None:
+        cache = {"version": CLASH_CACHE_VERSION, "elements": {}, "pairs": {}}
+    old_elements = cache["elements"]
+    old_pairs = cache["pairs"]
+
+    changed = get_changed_keys(old_elements, versions)
+
+    # Keep old pairs which are still valid. Elements of this run's documents which were not collected are dropped
+    new_elements = get_kept_elements(old_elements, versions)
+    new_pairs = get_valid_pairs(old_pairs, changed, new_elements)
+    run_pairs = set()
+
+    intersection_results = {}
+    clash_geometry = {}
+    reused = 0
+    analytic = 0
+    for id1, id2 in candidate_pairs:
+        key1 = keys1[id1] if keys1 is not None else id1
+        key2 = keys2[id2] if keys2 is not None else id2
+        pair_key = key1 + "|" + key2
+        run_pairs.add(pair_key)
+        if can_reuse_pair(old_pairs, key1, key2, changed):
+            reused += 1
+            continue
+
+        verdict = None
+        if proxies1 and proxies2:
+            verdict = prefilter_pair(proxies1.get(id1), proxies2.get(id2))
+        if verdict is False or (verdict is True and not keep_geometry):
+            analytic += 1
+            if verdict:
+                if id1 not in intersection_results:
+                    intersection_results[id1] = []
+                    clash_geometry[id1] = []
+                intersection_results[id1].append(id2)
+                clash_geometry[id1].append(None)
+                if on_clash:
+                    on_clash(id1, id2, None, None)
+            new_pairs[pair_key] = {"clash": verdict, "volumes": [], "bbox": None}
+            continue
+
+        results = intersect_solids(solids1[id1], solids2[id2])
+        bbox = None
+        if results:
+            boxes = [get_solid_bbox(result) for result in results]
+            bbox = [min(b[i] for b in boxes) for i in range(3)] + [max(b[i] for b in boxes) for i in range(3, 6)]
+            if id1 not in intersection_results:
+                intersection_results[id1] = []
+                clash_geometry[id1] = []
+            for result, box in zip(results, boxes):
+                intersection_results[id1].append(id2)
+                clash_geometry[id1].append(result if keep_geometry else None)
+                if on_clash:
+                    on_clash(id1, id2, result.Volume, box)
+        new_pairs[pair_key] = {"clash": bool(results), "volumes": [result.Volume for result in results], "bbox": bbox}
+
+    # Drop pairs which no longer overlap and cap the file size
+    new_pairs = get_saved_pairs(new_pairs, run_pairs, versions)
+    newcache = {"version": CLASH_CACHE_VERSION, "elements": new_elements, "pairs": new_pairs}
+    return {"intersection_results": intersection_results, "clash_geometry": clash_geometry,
+            "cache": newcache, "reused": reused, "analytic": analytic}
+
+#  _____  _              _       _____         _    _  _
+# /  __ \| |            | |     |  _  |       | |  | |(_)
+# | /  \/| |  __ _  ___ | |__   | | | | _   _ | |_ | | _  _ __    ___  ___
+# | |    | | / _` |/ __|| '_ \  | | | || | | || __|| || || '_ \  / _ \/ __|
+# | \__/\| || (_| |\__ \| | | | \ \_/ /| |_| || |_ | || || | | ||  __/\__ \
+#  \____/|_| \__,_||___/|_| |_|  \___/  \__,_| \__||_||_||_| |_| \___||___/
+# Draw one outline per clash with as few detail curves as possible
+def get_solid_points(solid):
+    """Get the tessellated points of a solid's edges"""
+    points = []
+    for edge in solid.Edges:
+        points.extend(edge.Tessellate())
+    return points
+
+def get_clash_outline(points, view, padding=0.0, hull=True):
+    """Get a clash outline as a polygon of (u, v) points in the view's right / up directions.
+    - points : XYZ points of the clash
+    - padding : grow the outline by this distance (always a rectangle when padding is used)
+    - hull : convex hull around the points if True, rectangle if False"""
+    right = view.RightDirection
+    up = view.UpDirection
+    uvs = [(point.DotProduct(right), point.DotProduct(up)) for point in points]
+    if hull and not padding:
+        outline = convex_hull(uvs)
+        if len(outline) >= 3:
+            return outline
+    return bounding_rectangle(uvs, padding)
+
+def get_view_box(view):
+    """Get the part of the model a plan view shows as a box tuple, for sorting clashes into views.
+    Z is from the view's level to the next level up (unbounded above the top level),
+    X and Y are from the crop box if it is active (unbounded otherwise)."""
+    inf = float("inf")
+    box = [-inf, -inf, -inf, inf, inf, inf]
+    level = view.GenLevel
+    if level:
+        box[2] = level.ProjectElevation
+        elevations = sorted(lvl.ProjectElevation for lvl in FilteredElementCollector(view.Document).OfClass(Level))
+        above = [elevation for elevation in elevations if elevation > level.ProjectElevation]
+        if above:
+            box[5] = above[0]
+    if view.CropBoxActive:
+        crop = view.CropBox
+        corners = [crop.Transform.OfPoint(XYZ(x, y, crop.Min.Z)) for x in (crop.Min.X, crop.Max.X)
+                   for y in (crop.Min.Y, crop.Max.Y)]
+        box[0] = min(corner.X for corner in corners)
+        box[1] = min(corner.Y for corner in corners)
+        box[3] = max(corner.X for corner in corners)
+        box[4] = max(corner.Y for corner in corners)
+    return tuple(box)
+
+def get_view_plane(view):
+    """Get the plane to draw detail curves on: the view's sketch plane, or a plane at its level if it has none
+    (plan views only get a sketch plane once a work plane is set). Returns None if the view has neither."""
+    if view.SketchPlane is not None:
+        return view.SketchPlane.GetPlane()
+    if view.GenLevel is not None:
+        return Plane.CreateByNormalAndOrigin(view.ViewDirection, XYZ(0, 0, view.GenLevel.ProjectElevation))
+    return None
+
+def draw_clash_outlines(view, outlines):
+    """Draw clash outlines as detail curves on the view's sketch plane. Must be run inside a transaction.
+    Overlapping edges are only drawn once, curves are created in one batch per color
+    and every curve of a color shares one OverrideGraphicSettings.
+    - outlines : list of (polygon from get_clash_outline, Color)
+    Returns the number of detail curves created (0 for views without a sketch plane or level, which are skipped)."""
+    plane = get_view_plane(view)
+    if plane is None:
+        return 0
+    right = view.RightDirection
+    up = view.UpDirection
+    depth = plane.Normal.Multiply(plane.Origin.DotProduct(plane.Normal))
+    min_length = view.Document.Application.ShortCurveTolerance
+
+    segments = []
+    colors = {}
+    for polygon, color in outlines:
+        color_key = (color.Red, color.Green, color.Blue)
+        colors[color_key] = color
+        segments.extend((start, end, color_key) for start, end in polygon_segments(polygon))
+    keep = set(unique_segments([(start, end) for start, end, color_key in segments], min_length))
+
+    by_color = {}
+    for start, end, color_key in segments:
+        if (start, end) not in keep:
+            continue
+        keep.discard((start, end))
+        if color_key not in by_color:
+            by_color[color_key] = CurveArray()
+        line = Line.CreateBound(right.Multiply(start[0]).Add(up.Multiply(start[1])).Add(depth),
+                                right.Multiply(end[0]).Add(up.Multiply(end[1])).Add(depth))
+        by_color[color_key].Append(line)
+
+    count = 0
+    for color_key in sorted(by_color):
+        ogs = OverrideGraphicSettings()
+        ogs.SetProjectionLineColor(colors[color_key])
+        for detail_curve in view.Document.Create.NewDetailCurveArray(view, by_color[color_key]):
+            view.SetElementOverrides(detail_curve.Id, ogs)
+            count += 1
+    return count
+
+#  _____  _              _       _____                            _             _
+# /  __ \| |            | |     /  ___|                          | |           | |
+# | /  \/| |  __ _  ___ | |__   \ `--.  _ __    __ _  _ __   ___ | |__    ___  | |_
+# | |    | | / _` |/ __|| '_ \   `--. \| '_ \  / _` || '_ \ / __|| '_ \  / _ \ | __|
+# | \__/\| || (_| |\__ \| | | | /\__/ /| | | || (_| || |_) |\__ \| | | || (_) || |_
+#  \____/|_| \__,_||___/|_| |_| \____/ |_| |_| \__,_|| .__/ |___/|_| |_| \___/  \__|
+#                                                    | |
+#                                                    |_|
+# Export elements to a plain data snapshot for the headless clash engine (Snippets._clashengine)
+def get_solid_mesh(solids):
+    """Triangulate solids into {"vertices": [[x,y,z], ...], "triangles": [[i,j,k], ...]}, sharing vertices"""
+    vertices = []
+    triangles = []
+    index = {}
+    for solid in solids:
+        for face in solid.Faces:
+            mesh = face.Triangulate()
+            if mesh is None:
+                continue
+            for i in range(mesh.NumTriangles):
+                triangle = mesh.get_Triangle(i)
+                corners = []
+                for j in range(3):
+                    point = triangle.get_Vertex(j)
+                    key = (round(point.X, 6), round(point.Y, 6), round(point.Z, 6))
+                    if key not in index:
+                        index[key] = len(vertices)
+                        vertices.append(list(key))
+                    corners.append(index[key])
+                triangles.append(corners)
+    return {"vertices": vertices, "triangles": triangles}
+
+def get_system_type_name(element):
+    """Get the piping or duct system type name of an element, or None"""
+    for bip in [BuiltInParameter.RBS_PIPING_SYSTEM_TYPE_PARAM, BuiltInParameter.RBS_DUCT_SYSTEM_TYPE_PARAM]:
+        param = element.get_Parameter(bip)
+        if param and param.HasValue:
+            return param.AsValueString()
+    return None
+
+def get_system_name(element):
+    """Get the MEP system name of an element, or None"""
+    param = element.get_Parameter(BuiltInParameter.RBS_SYSTEM_NAME_PARAM)
+    if param and param.HasValue and param.AsString():
+        return param.AsString()
+    return None
+
+def get_clash_record(element, box, solids=None, key=None):
+    """Get a snapshot record for an element (see Snippets._clashengine for the layout).
+    - box : the element's bounding box tuple
+    - solids : the element's solids, to include a mesh
+    - key : the element key, default is get_element_key(element) (pass it for linked elements)"""
+    proxy = get_clash_proxy(element, box)
+    segment = None
+    diameter = None
+    if proxy and proxy["type"] == "segment":
+        segment = {"start": list(proxy["start"]), "end": list(proxy["end"]),
+                   "outer": proxy["outer"], "inner": proxy["inner"]}
+        if proxy["outer"] == proxy["inner"]:
+            diameter = proxy["outer"] * 2
+    return {"id": key or get_element_key(element), "category": element.Category.Name if element.Category else None,
+            "system_type": get_system_type_name(element), "system": get_system_name(element), "diameter": diameter, "bbox": list(box), "segment": segment,
+            "mesh": get_solid_mesh(solids) if solids else None}
+
+def get_snapshot_levels(document=doc):
+    """Get the document's levels as [{"name", "elevation"}] for partitioning snapshot clash jobs by level"""
+    levels = FilteredElementCollector(document).OfClass(Level).ToElements()
+    return [{"name": level.Name, "elevation": level.ProjectElevation} for level in levels]
+
+def export_clash_snapshot(path, records, levels=None):
+    """Write snapshot records from get_clash_record (and levels from get_snapshot_levels) to a json file"""
+    try:
+        save_snapshot(path, records, levels)
+        print "Saved clash snapshot: {}".format(path)
+    except Exception as e:
+        print "Could not save clash snapshot: {}".format(e)
+
+#  _____  _              _      ______                            _
+# /  __ \| |            | |     | ___ \                          | |
+# | /  \/| |  __ _  ___ | |__   | |_/ /  ___  _ __    ___   _ __ | |_
+# | |    | | / _` |/ __|| '_ \  |    /  / _ \| '_ \  / _ \ | '__|| __|
+# | \__/\| || (_| |\__ \| | | | | |\ \ |  __/| |_) || (_) || |   | |_
+#  \____/|_| \__,_||___/|_| |_| \_| \_| \___|| .__/  \___/ |_|    \__|
+#                                            | |
+#                                            |_|
+# Rows for the streamed clash report (see Snippets._export.ReportWriter)
+CLASH_REPORT_COLUMNS = ["Element 1", "Element 2", "Category 1", "Category 2", "System Type 1", "System Type 2",
+                        "X", "Y", "Z", "Volume (ft³)", "Distance (in)", "Level"]
+
+def get_level_name(element):
+    """Get the name of an element's level (reference level for MEP curves), or None"""
+    level_id = element.LevelId
+    if (level_id is None or level_id == ElementId.InvalidElementId) and isinstance(element, MEPCurve):
+        level_id = element.ReferenceLevel.Id if element.ReferenceLevel else None
+    if level_id is None or level_id == ElementId.InvalidElementId:
+        return None
+    level = element.Document.GetElement(level_id)
+    return level.Name if level else None
+
+def get_clash_row(element1, element2, point, volume=None, distance=None, key1=None, key2=None):
+    """Get a clash report row (in CLASH_REPORT_COLUMNS order).
+    - point : (x, y, z) clash centroid
+    - volume : overlap volume (ft³), distance : clearance distance (ft)
+    - key1, key2 : element keys, default is get_element_key (pass them for linked elements)"""
+    category1 = element1.Category.Name if element1.Category else None
+    category2 = element2.Category.Name if element2.Category else None
+    return [key1 or get_element_key(element1), key2 or get_element_key(element2), category1, category2,
+            get_system_type_name(element1), get_system_type_name(element2),
+            round(point[0], 4), round(point[1], 4), round(point[2], 4),
+            round(volume, 6) if volume is not None else None,
+            round(distance * 12, 3) if distance is not None else None,
+            get_level_name(element1)]
@@ -0,0 +1,721 @@
+# -*- coding: utf-8 -*-
+# Headless clash engine. Finds clashing pairs from a plain data snapshot of elements (see export_clash_snapshot in
+# Snippets._clash). No Revit imports so it can be run, tested and benchmarked outside of Revit, eg:
+#   PYTHONPATH=lib python -m Snippets._clashengine snapshot.json --set1 Pipes --set2 "Structural Framing" --workers 16
+#
+# Snapshot layout (json):
+# {"version": 1, "elements": [record, ...], "levels": [{"name": level name, "elevation": ft}, ...]}
+# record = {"id": element key (see format_element_key), "category": category name, "system_type": system type name or None,
+#           "system": MEP system name or None, "diameter": outer diameter (ft) or None,
+#           "bbox": [minx, miny, minz, maxx, maxy, maxz],
+#           "segment": {"start": [x,y,z], "end": [x,y,z], "outer": radius, "inner": radius} or None,
+#           "mesh": {"vertices": [[x,y,z], ...], "triangles": [[i,j,k], ...]} or None}
+
+# ╦╔╦╗╔═╗╔═╗╦═╗╔╦╗╔═╗
+# ║║║║╠═╝║ ║╠╦╝ ║ ╚═╗
+# ╩╩ ╩╩  ╚═╝╩╚═ ╩ ╚═╝ IMPORTS
+#==================================================
+import sys
+import json
+import time
+
+from Snippets._spatial import BoundingBoxStore, box_center, box_overlap, build_grid, get_cell_size, query_grid
+from Snippets._proximity import (EPSILON, TOLERANCE, closest_points_segments, prefilter_pair, proxy_distance,
+                                 _sub, _dot)
+
+# ╦  ╦╔═╗╦═╗╦╔═╗╔╗ ╦  ╔═╗╔═╗
+# ╚╗╔╝╠═╣╠╦╝║╠═╣╠╩╗║  ║╣ ╚═╗
+#  ╚╝ ╩ ╩╩╚═╩╩ ╩╚═╝╩═╝╚═╝╚═╝ VARIABLES
+#==================================================
+SNAPSHOT_VERSION = 1
+RAY_DIRECTION = (1.0, 0.0014142135623731, 0.0017320508075689)    # Skewed so rays do not run along mesh edges
+MAX_CACHED_PAIRS = 200000   # Pair cache size above which pairs from earlier runs are dropped (see get_saved_pairs)
+
+def _cross(a, b):
+    return (a[1] * b[2] - a[2] * b[1], a[2] * b[0] - a[0] * b[2], a[0] * b[1] - a[1] * b[0])
+
+#  _____                            _             _
+# /  ___|                          | |           | |
+# \ `--.  _ __    __ _  _ __   ___ | |__    ___  | |_
+#  `--. \| '_ \  / _` || '_ \ / __|| '_ \  / _ \ | __|
+# /\__/ /| | | || (_| || |_) |\__ \| | | || (_) || |_
+# \____/ |_| |_| \__,_|| .__/ |___/|_| |_| \___/  \__|
+#                      | |
+#                      |_|
+# Read, write and filter element snapshots
+def load_snapshot(path):
+    """Load a snapshot file. Returns {"elements": [record, ...], "levels": [{"name", "elevation"}, ...]}"""
+    with open(path, "r") as f:
+        snapshot = json.load(f)
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        raise ValueError("Unsupported snapshot version: {}".format(snapshot.get("version")))
+    snapshot.setdefault("levels", [])
+    return snapshot
+
+def save_snapshot(path, records, levels=None):
+    """Write element records (and optionally the model's levels as {"name", "elevation"}) to a snapshot file"""
+    with open(path, "w") as f:
+        json.dump({"version": SNAPSHOT_VERSION, "elements": records, "levels": levels or []}, f)
+
+def select_records(records, categories=None, system_types=None, min_diameter=0.0):
+    """Filter records by category names, system type names and minimum diameter (ft).
+    Records without a diameter are kept by the diameter filter."""
+    selected = []
+    for record in records:
+        if categories and record["category"] not in categories:
+            continue
+        if system_types and record.get("system_type") not in system_types:
+            continue
+        diameter = record.get("diameter")
+        if min_diameter and diameter is not None and diameter < min_diameter:
+            continue
+        selected.append(record)
+    return selected
+
+def get_record_proxy(record):
+    """Get a prefilter_pair / proxy_distance proxy for a record"""
+    box = tuple(record["bbox"])
+    segment = record.get("segment")
+    if segment:
+        return {"type": "segment", "start": tuple(segment["start"]), "end": tuple(segment["end"]),
+                "outer": segment["outer"], "inner": segment["inner"], "box": box}
+    return {"type": "box", "box": box}
+
+#  _____  _                                _     _   __
+# |  ___|| |                              | |   | | / /
+# | |__  | |  ___  _ __ ___    ___  _ __  | |_  | |/ /   ___  _   _
+# |  __| | | / _ \| '_ ` _ \  / _ \| '_ \ | __| |    \  / _ \| | | |
+# | |___ | ||  __/| | | | | ||  __/| | | || |_  | |\  \|  __/| |_| |
+# \____/ |_| \___||_| |_| |_| \___||_| |_| \__| \_| \_/ \___| \__, |
+#                                                              __/ |
+#                                                             |___/
+# Key for an element which is unique across the model, its links and each placement of a link
+def format_element_key(title, element_id, link_id=None):
+    """Get an element key from its document title and id (integers).
+    Linked elements also include the link instance id, so the same element in two placements of a link, or
+    elements with the same id in the model and a link, get different keys:
+    "Model:123" for model elements, "Structure:456:123" for element 123 of link instance 456"""
+    if link_id is None:
+        return "{}:{}".format(title, element_id)
+    return "{}:{}:{}".format(title, link_id, element_id)
+
+#  _____        _                       _
+# |_   _|      (_)                     | |
+#   | |   _ __  _   __ _  _ __    __ _ | |  ___  ___
+#   | |  | '__|| | / _` || '_ \  / _` || | / _ \/ __|
+#   | |  | |   | || (_| || | | || (_| || ||  __/\__ \
+#   \_/  |_|   |_| \__,_||_| |_| \__, ||_| \___||___/
+#                                 __/ |
+#                                |___/
+# Triangle tests used by the mesh narrow phase
+def segment_crosses_triangle(p, q, a, b, c):
+    """Check if segment p-q passes through the inside of triangle a-b-c (Moller-Trumbore).
+    Segments only touching an edge or lying in the triangle's plane do not count."""
+    d = _sub(q, p)
+    e1 = _sub(b, a)
+    e2 = _sub(c, a)
+    h = _cross(d, e2)
+    det = _dot(e1, h)
+    if abs(det) <= EPSILON:
+        return False
+    inv = 1.0 / det
+    s = _sub(p, a)
+    u = _dot(s, h) * inv
+    if u <= EPSILON or u >= 1.0 - EPSILON:
+        return False
+    k = _cross(s, e1)
+    v = _dot(d, k) * inv
+    if v <= EPSILON or u + v >= 1.0 - EPSILON:
+        return False
+    t = _dot(e2, k) * inv
+    return EPSILON < t < 1.0 - EPSILON
+
+def triangles_cross(tri1, tri2):
+    """Check if two triangles cut through each other (an edge of one crosses the other)"""
+    for a, b in [(0, 1), (1, 2), (2, 0)]:
+        if segment_crosses_triangle(tri1[a], tri1[b], tri2[0], tri2[1], tri2[2]):
+            return True
+        if segment_crosses_triangle(tri2[a], tri2[b], tri1[0], tri1[1], tri1[2]):
+            return True
+    return False
+
+def closest_point_triangle(p, a, b, c):
+    """Get the point on triangle a-b-c closest to p (Ericson, Real-Time Collision Detection 5.1.5)"""
+    ab = _sub(b, a)
+    ac = _sub(c, a)
+    ap = _sub(p, a)
+    d1 = _dot(ab, ap)
+    d2 = _dot(ac, ap)
+    if d1 <= 0.0 and d2 <= 0.0:
+        return a
+    bp = _sub(p, b)
+    d3 = _dot(ab, bp)
+    d4 = _dot(ac, bp)
+    if d3 >= 0.0 and d4 <= d3:
+        return b
+    vc = d1 * d4 - d3 * d2
+    if vc <= 0.0 and d1 >= 0.0 and d3 <= 0.0:
+        v = d1 / (d1 - d3)
+        return (a[0] + ab[0] * v, a[1] + ab[1] * v, a[2] + ab[2] * v)
+    cp = _sub(p, c)
+    d5 = _dot(ab, cp)
+    d6 = _dot(ac, cp)
+    if d6 >= 0.0 and d5 <= d6:
+        return c
+    vb = d5 * d2 - d1 * d6
+    if vb <= 0.0 and d2 >= 0.0 and d6 <= 0.0:
+        w = d2 / (d2 - d6)
+        return (a[0] + ac[0] * w, a[1] + ac[1] * w, a[2] + ac[2] * w)
+    va = d3 * d6 - d5 * d4
+    if va <= 0.0 and (d4 - d3) >= 0.0 and (d5 - d6) >= 0.0:
+        w = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+        return (b[0] + (c[0] - b[0]) * w, b[1] + (c[1] - b[1]) * w, b[2] + (c[2] - b[2]) * w)
+    denom = 1.0 / (va + vb + vc)
+    v = vb * denom
+    w = vc * denom
+    return (a[0] + ab[0] * v + ac[0] * w, a[1] + ab[1] * v + ac[1] * w, a[2] + ab[2] * v + ac[2] * w)
+
+def segment_triangle_distance(p, q, a, b, c):
+    """Distance between segment p-q and triangle a-b-c"""
+    if segment_crosses_triangle(p, q, a, b, c):
+        return 0.0
+    distances = []
+    for point in (p, q):
+        diff = _sub(point, closest_point_triangle(point, a, b, c))
+        distances.append(_dot(diff, diff) ** 0.5)
+    for start, end in [(a, b), (b, c), (c, a)]:
+        distances.append(closest_points_segments(p, q, start, end)[4])
+    return min(distances)
+
+# ___  ___            _
+# |  \/  |           | |
+# | .  . |  ___  ___ | |__
+# | |\/| | / _ \/ __|| '_ \
+# | |  | ||  __/\__ \| | | |
+# \_|  |_/ \___||___/|_| |_|
+# Meshes with a triangle grid, for the mesh narrow phase
+class ClashMesh(object):
+    """Triangle mesh from a snapshot record with a grid of triangle bounding boxes for overlap queries"""
+
+    def __init__(self, mesh):
+        vertices = [tuple(vertex) for vertex in mesh["vertices"]]
+        self.triangles = [(vertices[i], vertices[j], vertices[k]) for i, j, k in mesh["triangles"]]
+        self.boxes = []
+        for tri in self.triangles:
+            self.boxes.append(tuple(min(point[axis] for point in tri) for axis in range(3)) +
+                              tuple(max(point[axis] for point in tri) for axis in range(3)))
+        self.grid = build_grid(self.boxes, get_cell_size(self.boxes)) if self.boxes else None
+
+    def query(self, box, padding=0.0):
+        """Get the indices of triangles whose boxes overlap box, in order"""
+        if self.grid is None:
+            return []
+        return sorted(query_grid(self.grid, box, padding))
+
+    def contains(self, point):
+        """Check if a point is inside the (closed) mesh by counting crossings of a ray"""
+        far = tuple(point[axis] + RAY_DIRECTION[axis] * 1.0e6 for axis in range(3))
+        crossings = 0
+        for tri in self.triangles:
+            if segment_crosses_triangle(point, far, tri[0], tri[1], tri[2]):
+                crossings += 1
+        return crossings % 2 == 1
+
+def meshes_clash(mesh1, mesh2):
+    """Check if two closed meshes overlap: a pair of triangles cut through each other, or one is inside the other"""
+    for tri1, box1 in zip(mesh1.triangles, mesh1.boxes):
+        for index in mesh2.query(box1):
+            if triangles_cross(tri1, mesh2.triangles[index]):
+                return True
+    if mesh1.triangles and mesh2.contains(mesh1.triangles[0][0]):
+        return True
+    if mesh2.triangles and mesh1.contains(mesh2.triangles[0][0]):
+        return True
+    return False
+
+def segment_mesh_clash(proxy, mesh, tolerance=TOLERANCE):
+    """Check if a segment proxy overlaps a closed mesh, using the proxy's outer radius.
+    Exact for round profiles. Rectangular and oval profiles (inner < outer) are checked as the cylinder around them,
+    so a mesh near the corners (between the inner and outer radius) is reported as a clash even if it misses the duct.
+    _check_chunk only uses this when the segment's element has no mesh, otherwise meshes_clash checks it exactly."""
+    p = proxy["start"]
+    q = proxy["end"]
+    radius = proxy["outer"] - tolerance
+    box = tuple(min(p[axis], q[axis]) for axis in range(3)) + tuple(max(p[axis], q[axis]) for axis in range(3))
+    for index in mesh.query(box, radius):
+        tri = mesh.triangles[index]
+        if segment_triangle_distance(p, q, tri[0], tri[1], tri[2]) < radius:
+            return True
+    return mesh.contains(p)
+
+#  _____  _                  _     ______         _
+# /  __ \| |                | |    | ___ \       (_)
+# | /  \/| |__    ___   ___ | | __ | |_/ /  __ _  _  _ __  ___
+# | |    | '_ \  / _ \ / __|| |/ / |  __/  / _` || || '__|/ __|
+# | \__/\| | | ||  __/| (__ |   <  | |    | (_| || || |   \__ \
+#  \____/|_| |_| \___| \___||_|\_\ \_|     \__,_||_||_|   |___/
+# Narrow phase for a chunk of candidate pairs. Runs in worker processes, or in process for the serial path
+_worker_state = {}
+
+def _init_worker(proxies1, proxies2, meshes, clearance):
+    """Set the data shared by every chunk (once per worker process)"""
+    _worker_state.clear()
+    _worker_state.update({"proxies1": proxies1, "proxies2": proxies2, "meshes": meshes,
+                          "clearance": clearance, "clash_meshes": {}})
+
+def _get_mesh(key):
+    clash_meshes = _worker_state["clash_meshes"]
+    if key not in clash_meshes:
+        mesh = _worker_state["meshes"].get(key)
+        clash_meshes[key] = ClashMesh(mesh) if mesh else None
+    return clash_meshes[key]
+
+def _check_chunk(candidate_pairs):
+    """Check a list of (id1, id2) pairs. Returns ([(id1, id2, distance), ...], analytic count, mesh count)"""
+    proxies1 = _worker_state["proxies1"]
+    proxies2 = _worker_state["proxies2"]
+    clearance = _worker_state["clearance"]
+    pairs = []
+    analytic = 0
+    mesh_checks = 0
+    for id1, id2 in candidate_pairs:
+        proxy1 = proxies1[id1]
+        proxy2 = proxies2[id2]
+        if clearance > 0:
+            distance = proxy_distance(proxy1, proxy2)[0]
+            if distance < clearance:
+                pairs.append((id1, id2, distance))
+            continue
+
+        clash = prefilter_pair(proxy1, proxy2)
+        if clash is not None:
+            analytic += 1
+        else:
+            mesh1 = _get_mesh(id1)
+            mesh2 = _get_mesh(id2)
+            if mesh1 and mesh2:
+                mesh_checks += 1
+                clash = meshes_clash(mesh1, mesh2)
+            elif proxy1["type"] == "segment" and mesh2:                # No mesh for the segment, see segment_mesh_clash
+                mesh_checks += 1
+                clash = segment_mesh_clash(proxy1, mesh2)
+            elif proxy2["type"] == "segment" and mesh1:
+                mesh_checks += 1
+                clash = segment_mesh_clash(proxy2, mesh1)
+            elif proxy1["type"] == "segment" and proxy2["type"] == "segment":
+                distance = closest_points_segments(proxy1["start"], proxy1["end"], proxy2["start"], proxy2["end"])[4]
+                clash = distance < proxy1["outer"] + proxy2["outer"] - TOLERANCE    # Outer radius, conservative for rectangular ducts
+            else:
+                clash = proxy_distance(proxy1, proxy2)[0] <= 0.0
+        if clash:
+            pairs.append((id1, id2, 0.0))
+    return pairs, analytic, mesh_checks
+
+def get_worker_count(workers=None):
+    """Get the number of worker processes to use. None uses every core.
+    Returns 1 (serial) where multiprocessing is not available, eg: IronPython inside Revit."""
+    if sys.platform == "cli":
+        return 1
+    try:
+        import multiprocessing
+        cores = multiprocessing.cpu_count()
+    except (ImportError, NotImplementedError):
+        return 1
+    if workers is None:
+        workers = cores
+    return max(1, int(workers))
+
+def split_chunks(items, count):
+    """Split a list into count contiguous chunks (in order)"""
+    size = max(1, -(-len(items) // max(1, count)))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+# ______  _             _   _____  _              _      ______         _
+# |  ___|(_)           | | /  __ \| |            | |     | ___ \       (_)
+# | |_    _  _ __    __| | | /  \/| |  __ _  ___ | |__   | |_/ /  __ _  _  _ __  ___
+# |  _|  | || '_ \  / _` | | |    | | / _` |/ __|| '_ \  |  __/  / _` || || '__|/ __|
+# | |    | || | | || (_| | | \__/\| || (_| |\__ \| | | | | |    | (_| || || |   \__ \
+# \_|    |_||_| |_| \__,_|  \____/|_| \__,_||___/|_| |_| \_|     \__,_||_||_|   |___/
+# Run a clash check between two sets of records
+def find_clash_pairs(records1, records2, clearance=0.0, workers=1, chunks_per_worker=8):
+    """Find clashing pairs between two lists of snapshot records. Same order on every run for the same input,
+    whatever the number of workers.
+
+    Hard clashes (clearance 0): bounding box broad phase, then prefilter_pair, then the narrowest check available:
+    mesh vs mesh, segment vs mesh, segment vs segment (capsules), or bounding boxes touching.
+    Clearance: pairs closer than clearance by proxy_distance.
+
+    - workers : number of processes for the narrow phase (None for every core). 1 runs in this process
+    - chunks_per_worker : candidate pairs are split into workers * chunks_per_worker chunks to balance the load
+
+    Returns a dictionary with:
+    - "pairs" : [(id1, id2, distance), ...] (distance is 0.0 for hard clashes)
+    - "stats" : {"candidates", "analytic", "mesh", "workers", "seconds"}"""
+    start = time.time()
+    bounding1 = BoundingBoxStore()
+    bounding2 = BoundingBoxStore()
+    proxies1 = {}
+    proxies2 = {}
+    meshes = {}
+    for records, bounding, proxies in [(records1, bounding1, proxies1), (records2, bounding2, proxies2)]:
+        for record in records:
+            if bounding.add(record["id"], tuple(record["bbox"])):
+                proxies[record["id"]] = get_record_proxy(record)
+                if clearance <= 0 and record.get("mesh"):
+                    meshes[record["id"]] = record["mesh"]
+
+    candidate_pairs = bounding1.overlapping_pairs(bounding2, padding=clearance)
+    workers = min(get_worker_count(workers), max(1, len(candidate_pairs)))
+    initargs = (proxies1, proxies2, meshes, clearance)
+
+    if workers == 1:
+        _init_worker(*initargs)
+        results = [_check_chunk(candidate_pairs)]
+    else:
+        import multiprocessing
+        pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=initargs)
+        try:
+            results = pool.map(_check_chunk, split_chunks(candidate_pairs, workers * chunks_per_worker))
+        finally:
+            pool.close()
+            pool.join()
+
+    pairs = []
+    stats = {"candidates": len(candidate_pairs), "analytic": 0, "mesh": 0, "workers": workers}
+    for chunk_pairs, analytic, mesh_checks in results:
+        pairs.extend(chunk_pairs)
+        stats["analytic"] += analytic
+        stats["mesh"] += mesh_checks
+    stats["seconds"] = time.time() - start
+    return {"pairs": pairs, "stats": stats}
+
+#  _                         _  ______               _    _  _    _
+# | |                       | | | ___ \             | |  (_)| |  (_)
+# | |      ___ __   __  ___ | | | |_/ /  __ _  _ __ | |_  _ | |_  _   ___   _ __   ___
+# | |     / _ \\ \ / / / _ \| | |  __/  / _` || '__|| __|| || __|| | / _ \ | '_ \ / __|
+# | |____|  __/ \ V / |  __/| | | |    | (_| || |   | |_ | || |_ | || (_) || | | |\__ \
+# \_____/ \___|  \_/   \___||_| \_|     \__,_||_|    \__||_| \__||_| \___/ |_| |_||___/
+# Split a clash check into independent jobs by level
+def get_level_bands(levels, margin=1.0):
+    """Get elevation bands from levels, one per level from its elevation to the next level's elevation.
+    The lowest band reaches down and the highest band up without limit. Every band is grown by margin (ft)
+    above and below so risers and sloped runs crossing a level line are checked in both bands.
+    - levels : list of {"name", "elevation"}
+    Returns a list of {"name", "low", "high"} sorted by elevation."""
+    ordered = sorted(levels, key=lambda level: level["elevation"])
+    bands = []
+    for i, level in enumerate(ordered):
+        low = level["elevation"] - margin if i > 0 else float("-inf")
+        high = ordered[i + 1]["elevation"] + margin if i + 1 < len(ordered) else float("inf")
+        bands.append({"name": level["name"], "low": low, "high": high})
+    return bands or [{"name": "All", "low": float("-inf"), "high": float("inf")}]
+
+def partition_records(records, bands):
+    """Split records into one list per band. Records spanning more than one band are put in each of them."""
+    partitions = [[] for band in bands]
+    for record in records:
+        zmin = record["bbox"][2]
+        zmax = record["bbox"][5]
+        for i, band in enumerate(bands):
+            if zmax >= band["low"] and zmin <= band["high"]:
+                partitions[i].append(record)
+    return partitions
+
+def _run_partition(job):
+    """Run one partition job: (name, records1, records2, clearance, workers)"""
+    name, records1, records2, clearance, workers = job
+    results = find_clash_pairs(records1, records2, clearance=clearance, workers=workers)
+    results["stats"]["name"] = name
+    results["stats"]["elements"] = len(records1) + len(records2)
+    return results
+
+def find_partitioned_clash_pairs(records1, records2, levels, margin=1.0, clearance=0.0, workers=1,
+                                 by_partition=False, only=None, on_partition=None):
+    """Run find_clash_pairs once per level band (see get_level_bands) and join the results.
+    Pairs found in more than one band are only kept once. Same order on every run for the same input.
+
+    - workers : worker processes (None for every core)
+    - by_partition : if True the workers run whole partitions at the same time, otherwise each partition
+      is run in turn with its pairs split over the workers
+    - only : list of level names to run, or None for every level
+    - on_partition : called with each partition's stats ({"name", "elements", "candidates", ..., "seconds"})
+      when it finishes, eg: to print progress
+
+    Returns a dictionary with:
+    - "pairs" : [(id1, id2, distance), ...]
+    - "partitions" : [stats, ...] for each partition that was run"""
+    bands = get_level_bands(levels, margin)
+    parts1 = partition_records(records1, bands)
+    parts2 = partition_records(records2, bands)
+    jobs = []
+    for band, part1, part2 in zip(bands, parts1, parts2):
+        if only and band["name"] not in only:
+            continue
+        if part1 and part2:
+            jobs.append((band["name"], part1, part2, clearance, 1 if by_partition else workers))
+
+    workers = min(get_worker_count(workers), max(1, len(jobs))) if by_partition else 1
+    if workers > 1:
+        import multiprocessing
+        pool = multiprocessing.Pool(workers)
+        try:
+            results = []
+            for result in pool.imap(_run_partition, jobs):
+                results.append(result)
+                if on_partition:
+                    on_partition(result["stats"])
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = []
+        for job in jobs:
+            results.append(_run_partition(job))
+            if on_partition:
+                on_partition(results[-1]["stats"])
+
+    pairs = []
+    seen = set()
+    for result in results:
+        for pair in result["pairs"]:
+            if (pair[0], pair[1]) not in seen:
+                seen.add((pair[0], pair[1]))
+                pairs.append(pair)
+    return {"pairs": pairs, "partitions": [result["stats"] for result in results]}
+
+# ______         _         _____               _
+# | ___ \       (_)       /  __ \             | |
+# | |_/ /  __ _  _  _ __  | /  \/  __ _   ___ | |__    ___
+# |  __/  / _` || || '__| | |     / _` | / __|| '_ \  / _ \
+# | |    | (_| || || |    | \__/\| (_| || (__ | | | ||  __/
+# \_|     \__,_||_||_|     \____/ \__,_| \___||_| |_| \___|
+# Decide which of last run's pair results can be reused (see find_clashes in Snippets._clash)
+def get_changed_keys(cached_versions, versions):
+    """Get the element keys whose version is not the one saved last run (new, edited or moved elements).
+    - cached_versions : {element key: version} from last run's cache
+    - versions : {element key: version} for this run"""
+    return set(key for key, version in versions.items() if cached_versions.get(key) != version)
+
+def get_key_document(key):
+    """Get the document title of an element key (see format_element_key)"""
+    return key.split(":", 1)[0]
+
+def get_kept_elements(cached_versions, versions):
+    """Get the {element key: version} to save: this run's versions and cached elements of documents not in this run.
+    Cached elements of this run's documents which are missing from versions (deleted or no longer collected) are dropped"""
+    documents = set(get_key_document(key) for key in versions)
+    kept = dict((key, version) for key, version in cached_versions.items() if get_key_document(key) not in documents)
+    kept.update(versions)
+    return kept
+
+def get_valid_pairs(cached_pairs, changed, elements=None):
+    """Get last run's {"key1|key2": result} for pairs where neither element changed, to keep in the next cache.
+    - elements : {element key: version} kept for the next cache (see get_kept_elements), pairs of other elements are dropped"""
+    valid = {}
+    for pair_key, pair in cached_pairs.items():
+        key1, key2 = pair_key.split("|")
+        if key1 in changed or key2 in changed:
+            continue
+        if elements is not None and (key1 not in elements or key2 not in elements):
+            continue
+        valid[pair_key] = pair
+    return valid
+
+def get_saved_pairs(pairs, run_pairs, versions, max_pairs=MAX_CACHED_PAIRS):
+    """Get the pairs to save for the next run.
+    - pairs : {"key1|key2": result} valid and new pairs
+    - run_pairs : set of "key1|key2" candidate pairs of this run
+    - versions : {element key: version} for every element in this run
+    Pairs of two elements from this run which were not candidates no longer overlap and are dropped.
+    If more than max_pairs are left, only this run's pairs are kept."""
+    saved = {}
+    for pair_key, pair in pairs.items():
+        key1, key2 = pair_key.split("|")
+        if pair_key in run_pairs or key1 not in versions or key2 not in versions:
+            saved[pair_key] = pair
+    if len(saved) > max_pairs:
+        saved = dict((pair_key, pair) for pair_key, pair in saved.items() if pair_key in run_pairs)
+    return saved
+
+def can_reuse_pair(cached_pairs, key1, key2, changed):
+    """Check if a pair can be skipped: it was checked last run, did not clash, and neither element changed.
+    Pairs which clashed are checked again so their clash geometry is available."""
+    cached = cached_pairs.get(key1 + "|" + key2)
+    return cached is not None and not cached["clash"] and key1 not in changed and key2 not in changed
+
+#  _   _         _                ______  _             _
+# | | | |       (_)               |  ___|(_)           | |
+# | | | | _ __   _   ___   _ __   | |_    _  _ __    __| |
+# | | | || '_ \ | | / _ \ | '_ \  |  _|  | || '_ \  / _` |
+# | |_| || | | || || (_) || | | | | |    | || | | || (_| |
+#  \___/ |_| |_||_| \___/ |_| |_| \_|    |_||_| |_| \__,_|
+# Disjoint sets for grouping clashes
+class UnionFind(object):
+    """Disjoint sets over the integers 0..count-1 (path halving, union by size)"""
+
+    def __init__(self, count):
+        self.parent = list(range(count))
+        self.size = [1] * count
+
+    def find(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, i, j):
+        root_i = self.find(i)
+        root_j = self.find(j)
+        if root_i == root_j:
+            return
+        if self.size[root_i] < self.size[root_j]:
+            root_i, root_j = root_j, root_i
+        self.parent[root_j] = root_i
+        self.size[root_i] += self.size[root_j]
+
+#  _____  _              _                 _____  _              _
+# /  __ \| |            | |               /  __ \| |            | |
+# | /  \/| | _   _  ___ | |_   ___  _ __  | /  \/| |  __ _  ___ | |__    ___  ___
+# | |    | || | | |/ __|| __| / _ \| '__| | |    | | / _` |/ __|| '_ \  / _ \/ __|
+# | \__/\| || |_| |\__ \| |_ |  __/| |    | \__/\| || (_| |\__ \| | | ||  __/\__ \
+#  \____/|_| \__,_||___/ \__| \___||_|     \____/|_| \__,_||___/|_| |_| \___||___/
+# Group clash pairs that are the same coordination issue
+def cluster_clashes(clashes, distance=3.0):
+    """Group clashes whose centroids are within distance of each other and which share either the element
+    checked against (eg: one beam) or the MEP system of the checked element (eg: one pipe run).
+
+    - clashes : list of {"id1", "id2", "point": (x, y, z) clash centroid, "system": system of id1 or None}.
+      Clashes without a system only group through id1 / id2
+    - distance : max distance between clash centroids in a group (ft)
+
+    Returns a list of groups, in order of their first clash:
+    {"clashes": [indices into clashes], "ids1": [...], "ids2": [...], "systems": [...],
+     "point": average centroid, "bbox": (minx, miny, minz, maxx, maxy, maxz) of the centroids}"""
+    count = len(clashes)
+    sets = UnionFind(count)
+
+    # Same element pairs first (eg: two solids of one clash)
+    firsts = {}
+    for i, clash in enumerate(clashes):
+        key = (clash["id1"], clash["id2"])
+        if key in firsts:
+            sets.union(firsts[key], i)
+        else:
+            firsts[key] = i
+
+    # Grid hash on centroids: only clashes in neighbouring cells can be within distance
+    cell_size = max(float(distance), 1e-6)
+    cells = {}
+    for i, clash in enumerate(clashes):
+        point = clash["point"]
+        cell = tuple(int(point[axis] // cell_size) for axis in range(3))
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for dz in (-1, 0, 1):
+                    for j in cells.get((cell[0] + dx, cell[1] + dy, cell[2] + dz), []):
+                        other = clashes[j]
+                        related = (other["id2"] == clash["id2"] or other["id1"] == clash["id1"] or
+                                   (clash.get("system") and other.get("system") == clash["system"]))
+                        if not related:
+                            continue
+                        diff = _sub(point, other["point"])
+                        if _dot(diff, diff) <= distance * distance:
+                            sets.union(i, j)
+        cells.setdefault(cell, []).append(i)
+
+    groups = []
+    index = {}
+    for i, clash in enumerate(clashes):
+        root = sets.find(i)
+        if root not in index:
+            index[root] = len(groups)
+            groups.append({"clashes": [], "ids1": [], "ids2": [], "systems": []})
+        group = groups[index[root]]
+        group["clashes"].append(i)
+        for field, value in [("ids1", clash["id1"]), ("ids2", clash["id2"]), ("systems", clash.get("system"))]:
+            if value is not None and value not in group[field]:
+                group[field].append(value)
+
+    for group in groups:
+        points = [clashes[i]["point"] for i in group["clashes"]]
+        group["point"] = tuple(sum(point[axis] for point in points) / len(points) for axis in range(3))
+        group["bbox"] = (tuple(min(point[axis] for point in points) for axis in range(3)) +
+                         tuple(max(point[axis] for point in points) for axis in range(3)))
+    return groups
+
+def get_pair_clashes(pairs, records):
+    """Get cluster_clashes input for find_clash_pairs results. The centroid is the middle of the overlap of the
+    two bounding boxes (or the middle between them for clearance pairs)."""
+    by_id = dict((record["id"], record) for record in records)
+    clashes = []
+    for id1, id2, distance in pairs:
+        point = box_center(box_overlap(by_id[id1]["bbox"], by_id[id2]["bbox"]))
+        clashes.append({"id1": id1, "id2": id2, "point": point, "system": by_id[id1].get("system")})
+    return clashes
+
+def get_group_report(groups, clashes):
+    """Get report lines for clash groups from cluster_clashes, largest groups first"""
+    lines = ["Clash Groups: {} (from {} clashes)".format(len(groups), len(clashes))]
+    ordered = sorted(range(len(groups)), key=lambda i: (-len(groups[i]["clashes"]), i))
+    for number, i in enumerate(ordered):
+        group = groups[i]
+        lines.append("Group {}: {} clashes, {} elements x {} elements, systems: {}, at ({:.2f}, {:.2f}, {:.2f})".format(
+            number + 1, len(group["clashes"]), len(group["ids1"]), len(group["ids2"]),
+            ", ".join(str(system) for system in group["systems"]) or "-", *group["point"]))
+    return lines
+
+# ___  ___        _
+# |  \/  |       (_)
+# | .  . |  __ _  _  _ __
+# | |\/| | / _` || || '_ \
+# | |  | || (_| || || | | |
+# \_|  |_/ \__,_||_||_| |_|
+# Command line entry for running snapshots outside of Revit
+def main(argv=None):
+    """Run a clash check on a snapshot file and print the clashing pairs"""
+    import argparse
+    parser = argparse.ArgumentParser(description="Run a clash check on an exported snapshot")
+    parser.add_argument("snapshot")
+    parser.add_argument("--set1", nargs="*", help="categories to check")
+    parser.add_argument("--set2", nargs="*", help="categories to check against")
+    parser.add_argument("--clearance", type=float, default=0.0, help="minimum clearance (inches)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: every core)")
+    parser.add_argument("--group", type=float, default=None, help="group clashes within this distance (ft)")
+    parser.add_argument("--by-level", action="store_true", help="run each level as a separate job")
+    parser.add_argument("--parallel-levels", action="store_true", help="run levels at the same time")
+    parser.add_argument("--level", nargs="*", help="only run these levels")
+    parser.add_argument("--margin", type=float, default=1.0, help="level band overlap (ft)")
+    args = parser.parse_args(argv)
+
+    snapshot = load_snapshot(args.snapshot)
+    records = snapshot["elements"]
+    records1 = select_records(records, args.set1)
+    records2 = select_records(records, args.set2)
+    start = time.time()
+    if args.by_level or args.parallel_levels or args.level:
+        def on_partition(stats):
+            print("Level {name}: {elements} elements, {candidates} candidates, {seconds:.3f} s".format(**stats))
+        results = find_partitioned_clash_pairs(records1, records2, snapshot["levels"], margin=args.margin,
+                                               clearance=args.clearance / 12, workers=args.workers,
+                                               by_partition=args.parallel_levels, only=args.level,
+                                               on_partition=on_partition)
+        results["stats"] = {"candidates": sum(stats["candidates"] for stats in results["partitions"]),
+                            "analytic": sum(stats["analytic"] for stats in results["partitions"]),
+                            "mesh": sum(stats["mesh"] for stats in results["partitions"]),
+                            "workers": args.workers or get_worker_count(None),
+                            "seconds": time.time() - start}
+    else:
+        results = find_clash_pairs(records1, records2, clearance=args.clearance / 12, workers=args.workers)
+    if args.group is not None:
+        clashes = get_pair_clashes(results["pairs"], records)
+        for line in get_group_report(cluster_clashes(clashes, args.group), clashes):
+            print(line)
+        return
+    for id1, id2, distance in results["pairs"]:
+        print("{}\t{}\t{:.4f}".format(id1, id2, distance))
+    print("Candidates: {candidates}  Analytic: {analytic}  Mesh: {mesh}  Workers: {workers}  Seconds: {seconds:.3f}".format(
+        **results["stats"]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# Write report rows to a file one at a time (csv, json lines or excel) so large reports do not need to be kept
+# in memory. No Revit imports. xlsxwriter is only needed for .xlsx files.
+
+# ╦╔╦╗╔═╗╔═╗╦═╗╔╦╗╔═╗
+# ║║║║╠═╝║ ║╠╦╝ ║ ╚═╗
+# ╩╩ ╩╩  ╚═╝╩╚═ ╩ ╚═╝ IMPORTS
+#==================================================
+import os
+import sys
+import csv
+import json
+from collections import OrderedDict
+
+# ╦  ╦╔═╗╦═╗╦╔═╗╔╗ ╦  ╔═╗╔═╗
+# ╚╗╔╝╠═╣╠╦╝║╠═╣╠╩╗║  ║╣ ╚═╗
+#  ╚╝ ╩ ╩╩╚═╩╩ ╩╚═╝╩═╝╚═╝╚═╝ VARIABLES
+#==================================================
+REPORT_FORMATS = {"CSV": "csv", "JSON Lines": "jsonl", "Excel": "xlsx"}     # Form option: file extension
+
+# ______                            _     _    _        _  _
+# | ___ \                          | |   | |  | |      (_)| |
+# | |_/ /  ___  _ __    ___   _ __ | |_  | |  | | _ __  _ | |_   ___  _ __
+# |    /  / _ \| '_ \  / _ \ | '__|| __| | |/\| || '__|| || __| / _ \| '__|
+# | |\ \ |  __/| |_) || (_) || |   | |_  \  /\  /| |   | || |_ |  __/| |
+# \_| \_| \___|| .__/  \___/ |_|    \__|  \/  \/ |_|   |_| \__| \___||_|
+#              | |
+#              |_|
+# Stream rows to a csv, json lines or excel file
+class ReportWriter(object):
+    """Write rows to a report file as they are made. The format comes from the file extension:
+    .csv, .jsonl or .xlsx (xlsxwriter in constant_memory mode, so only the current row is kept in memory).
+    Excel rows are written with one call per group of neighbouring columns sharing a format.
+
+    eg:
+    with ReportWriter(path, ["Id", "Volume"]) as report:
+        report.write([123, 0.5])
+        report.write({"Id": 124, "Volume": 0.2})"""
+
+    def __init__(self, path, columns, sheet_name="Report", formats=None):
+        """- formats : optional {column: xlsxwriter format properties} for excel, eg: {"Volume": {"num_format": "0.00"}}"""
+        self.path = path
+        self.columns = list(columns)
+        self.extension = os.path.splitext(path)[1].lower().lstrip(".")
+        self.count = 0
+        self._file = None
+        self._writer = None
+        self._workbook = None
+        self._worksheet = None
+        self._runs = []         # (first column, end column, format) of neighbouring columns sharing a format
+
+        if self.extension == "xlsx":
+            import xlsxwriter
+            self._workbook = xlsxwriter.Workbook(path, {"constant_memory": True, "strings_to_numbers": False})
+            self._worksheet = self._workbook.add_worksheet(sheet_name)
+            self._worksheet.write_row(0, 0, self.columns, self._workbook.add_format({"bold": True}))
+            added = {}
+            for col, column in enumerate(self.columns):
+                properties = (formats or {}).get(column)
+                key = tuple(sorted(properties.items())) if properties else None
+                if key is not None and key not in added:
+                    added[key] = self._workbook.add_format(properties)
+                cell_format = added.get(key)
+                if self._runs and self._runs[-1][2] is cell_format:
+                    self._runs[-1][1] = col + 1
+                else:
+                    self._runs.append([col, col + 1, cell_format])
+        elif self.extension == "csv":
+            if sys.version_info[0] < 3:
+                self._file = open(path, "wb")
+            else:
+                self._file = open(path, "w", newline="")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow([self._csv_value(column) for column in self.columns])
+        elif self.extension == "jsonl":
+            self._file = open(path, "w")
+        else:
+            raise ValueError("Unsupported report format: {}".format(path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, row):
+        """Write one row, either a list in column order or a {column: value} dictionary"""
+        if isinstance(row, dict):
+            values = [row.get(column) for column in self.columns]
+        else:
+            values = list(row)
+        self.count += 1
+        if self._worksheet is not None:
+            for start, end, cell_format in self._runs:
+                self._worksheet.write_row(self.count, start, values[start:end], cell_format)
+        elif self._writer is not None:
+            self._writer.writerow([self._csv_value(value) for value in values])
+        else:
+            self._file.write(json.dumps(OrderedDict(zip(self.columns, values))) + "\n")
+
+    def _csv_value(self, value):
+        """Python 2 csv only writes bytes, so text is written as utf-8"""
+        if value is None:
+            return ""
+        if sys.version_info[0] < 3 and isinstance(value, unicode):
+            return value.encode("utf-8")
+        return value
+
+    def close(self):
+        """Finish the file. Safe to call more than once."""
+        if self._workbook is not None:
+            self._workbook.close()
+            self._workbook = None
+            self._worksheet = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -10,6 +10,12 @@ from types import NoneType
 
 from pyrevit.forms import alert
 
+from Snippets._cache import get_session_cache, get_change_tracker
+from Snippets._polygons import flatten_loop, PolygonRegion
+from Snippets._parameters import ParameterReader
+
+import math
+
 # ╦  ╦╔═╗╦═╗╦╔═╗╔╗ ╦  ╔═╗╔═╗
 # ╚╗╔╝╠═╣╠╦╝║╠═╣╠╩╗║  ║╣ ╚═╗
 #  ╚╝ ╩ ╩╩╚═╩╩ ╩╚═╝╩═╝╚═╝╚═╝ VARIABLES
@@ -18,6 +24,9 @@ doc   = __revit__.ActiveUIDocument.Document #type: Document
 uidoc = __revit__.ActiveUIDocument          #type: UIDocument
 app   = __revit__.Application               #type: Application
 
+ZONING_PARAMS = ["MEPCE Room Number", "MEPCE Room Name", "MEPCE HVAC Zone", "MEPCE Room Airflow", "MEPCE Room Ventilation",
+                 "MEPCE Room Exhaust", "MEPCE Update Region", "MEPCE Ceiling Height", "Area"]    # Read into the zoning snapshot
+
 #  _____        _    ______  _  _  _            _  ______               _
 # |  __ \      | |   |  ___|(_)| || |          | | | ___ \             (_)
 # | |  \/  ___ | |_  | |_    _ | || |  ___   __| | | |_/ /  ___   __ _  _   ___   _ __   ___
@@ -29,25 +38,21 @@ app   = __revit__.Application               #type: Application
 # This function will get a list of all filled regions, which can optionally be filtered by view discipline
 
 def get_filled_regions(allviews, filter_discipline=""):
+    """Get filled regions, optionally only from views whose DISCIPLINE contains filter_discipline.
+    Returns {"filtviews": views, "filledregions": regions}. With a discipline, filledregions is a list of regions
+    per view (same order as filtviews), otherwise it is a flat list of every filled region.
+    Regions are collected once and grouped by owner view, view disciplines come from get_view_disciplines."""
     # Filter views by input filter
+    disciplines = get_view_disciplines()
     filtviews = []
     for view in allviews:
-        if view.IsTemplate:
-            continue
-        disciplineparam = view.LookupParameter("DISCIPLINE")
-        if type(disciplineparam) is NoneType:
-            continue
-        else:
-            discipline = disciplineparam.AsString()
+        discipline = disciplines.get(view.Id.IntegerValue)
         if type(discipline) is NoneType:
             continue
         elif str(filter_discipline).lower() not in discipline.lower():
             continue
         else:
-            try:
-                filtviews.append(view)
-            except:
-                continue
+            filtviews.append(view)
 
     #print("Number of Views: "+str(len(filtviews)))
     #print("View filter: "+str(filter_discipline))
@@ -56,14 +61,17 @@ def get_filled_regions(allviews, filter_discipline=""):
     if not filtviews:
         alert('Unable to find views with discipline "'+str(filter_discipline)+'" in project!')
 
-    # Get filtered list of filled regions
+    # Get filtered list of filled regions (one collector, grouped by view)
+    allregions = list(FilteredElementCollector(doc).OfClass(FilledRegion))
     filledregions = []
     if filter_discipline == "":
-        filledregions = list(FilteredElementCollector(doc).OfClass(FilledRegion))
+        filledregions = allregions
     else:
+        viewregions = {}
+        for region in allregions:
+            viewregions.setdefault(region.OwnerViewId.IntegerValue, []).append(region)
         for view in filtviews:
-            regions = list(FilteredElementCollector(doc).OwnedByView(view.Id).OfClass(FilledRegion))
-            filledregions.append(regions)
+            filledregions.append(viewregions.get(view.Id.IntegerValue, []))
 
     if not filledregions:
         alert('Unable to find filled regions in views with discipline "'+str(filter_discipline)+'." Please ensure you have created filled regions.')
@@ -72,30 +80,41 @@ def get_filled_regions(allviews, filter_discipline=""):
     d = {"filtviews" : filtviews, "filledregions" : filledregions}
     return d
 
-#  _____        _    ______
-# |  __ \      | |   |  ___|
-# | |  \/  ___ | |_  | |_     __ _   ___   ___  ___
-# | | __  / _ \| __| |  _|   / _` | / __| / _ \/ __|
-# | |_\ \|  __/| |_  | |    | (_| || (__ |  __/\__ \
-#  \____/ \___| \__| \_|     \__,_| \___| \___||___/
-# This function will convert filled regions into faces
-
-def get_faces(filledregions):
-    normalfaces = []        # List of all faces, grouped by view they appear in
-    for view in filledregions:
-        normfaces = []      # List of normal faces in current view
-        for region in view:
-            boundaries = region.GetBoundaries()     # Get filled region boundary curves
-            geometry = GeometryCreationUtilities.CreateExtrusionGeometry(boundaries,XYZ(0,0,1),10)     # Extrude boundaries to get solid
-            faces = geometry.Faces      # Get faces of the solid
-            for i in range(faces.Size):
-                normal = faces[i].ComputeNormal(UV(0,0))    # Get surface normal of each face
-                if normal.Z == 1:
-                    normfaces.append(faces[i])              # Collect face with normal = (0,0,1)
+def get_view_disciplines(document=doc):
+    """Get {view id: DISCIPLINE parameter value} for every view (None for templates and views without one).
+    Kept for the Revit session, only changed views are read again (see Snippets._cache.ChangeTracker).
+    Everything is read again if a view template changed or the document version stamp differs."""
+    cache = get_session_cache("ViewDisciplines", dict)
+    key = document.PathName or document.Title
+    changed = get_change_tracker().pop(key, "ViewDisciplines")
+    stamp = get_document_stamp(document)
+    cached = cache.get(key)
+
+    if cached is not None and changed is not None and cached[0] == stamp:
+        disciplines = cached[1]
+        views = [document.GetElement(ElementId(element_id)) for element_id in changed]
+        if not any(isinstance(view, View) and view.IsTemplate for view in views):
+            for element_id, view in zip(changed, views):
+                if isinstance(view, View):
+                    disciplines[element_id] = get_view_discipline(view)
                 else:
-                    continue
-        normalfaces.append(normfaces)
-    return normalfaces
+                    disciplines.pop(element_id, None)
+            return disciplines
+
+    disciplines = {}
+    for view in FilteredElementCollector(document).OfClass(View):
+        disciplines[view.Id.IntegerValue] = get_view_discipline(view)
+    cache[key] = (stamp, disciplines)
+    return disciplines
+
+def get_view_discipline(view):
+    """Get a view's DISCIPLINE parameter value, or None for templates and views without one"""
+    if view.IsTemplate:
+        return None
+    disciplineparam = view.LookupParameter("DISCIPLINE")
+    if type(disciplineparam) is NoneType:
+        return None
+    return disciplineparam.AsString()
 
 #  _____        _    ______
 # |  __ \      | |   | ___ \
@@ -106,16 +125,11 @@ def get_faces(filledregions):
 # This function will get filled regions with room number parameter
 
 def get_rooms():
-    allfilledregions = list(FilteredElementCollector(doc).OfClass(FilledRegion))
+    """Get filled regions with a room number (from the zoning snapshot)"""
     filtregions = []
-    for region in allfilledregions:
-        paramexists = region.LookupParameter("MEPCE Room Number")
-        if paramexists:
-            roomnum = region.LookupParameter("MEPCE Room Number").AsString()
-            if type(roomnum) is NoneType:
-                continue
-            else:
-                filtregions.append(region)
+    for record, region in get_record_elements(get_zoning_records()):
+        if record["params"]["MEPCE Room Number"] is not None:
+            filtregions.append(region)
     return filtregions
 
 #  _____        _    ______                           ______         _
@@ -131,25 +145,14 @@ def get_room_data(rooms):
     paramslookup = ["MEPCE Room Number", "MEPCE Room Name", "MEPCE HVAC Zone", "Area", "MEPCE Room Airflow",
                     "MEPCE Room Ventilation"]
     paramsnames = ["Room Number", "Room Name", "HVAC Zone", "Area (ft^2)", "Supply Airflow (CFM)", "Ventilation (CFM)"]
-    for room in rooms:
-        roomparams = dict()
-        for i in range(len(paramslookup)):
-            param = paramslookup[i]
-            exists = room.LookupParameter(param)
-            if type(exists) is not NoneType:
-                paramtype = str(exists.StorageType)
-                if paramtype == "String":
-                    roomparams.update({paramsnames[i]: room.LookupParameter(param).AsString()})
-                if paramtype == "Double":
-                    if i == 4 or i == 5:
-                        roomparams.update({paramsnames[i]: room.LookupParameter(param).AsDouble() * 60})
-                    else:
-                        roomparams.update({paramsnames[i]: room.LookupParameter(param).AsDouble()})
-            else:
-                roomparams.update({paramsnames[i]: None})
+    columns = ParameterReader(paramslookup).read_columns(rooms)
+    for i in [4, 5]:                                                # Airflows are stored in ft^3/s
+        columns[paramslookup[i]] = [value * 60 if value is not None else None for value in columns[paramslookup[i]]]
+    for row in range(len(rooms)):
+        roomparams = dict((paramsnames[i], columns[param][row]) for i, param in enumerate(paramslookup))
 
         if roomparams['Area (ft^2)']:
-            areaflow = roomparams['Supply Airflow (CFM)'] / roomparams['Area (ft^2)']
+            areaflow = (roomparams['Supply Airflow (CFM)'] or 0) / roomparams['Area (ft^2)']
         else:
             areaflow = 0
         roomparams.update({'Supply / Area (CFM/ft^2)': areaflow})
@@ -245,4 +248,152 @@ def get_filled_region_corners(filled_region):
             seen.add(key)
             unique_corners.append(p)
 
-    return unique_corners
\ No newline at end of file
+    return unique_corners
+
+# ______               _                ______         _
+# | ___ \             (_)               | ___ \       | |
+# | |_/ /  ___   __ _  _   ___   _ __   | |_/ /  ___  | | _   _   __ _   ___   _ __   ___
+# |    /  / _ \ / _` || | / _ \ | '_ \  |  __/  / _ \ | || | | | / _` | / _ \ | '_ \ / __|
+# | |\ \ |  __/| (_| || || (_) || | | | | |    | (_) || || |_| || (_| || (_) || | | |\__ \
+# \_| \_| \___| \__, ||_| \___/ |_| |_| \_|     \___/ |_| \__, | \__, | \___/ |_| |_||___/
+#                __/ |                                     __/ |  __/ |
+#               |___/                                     |___/  |___/
+# Flatten filled region boundaries into 2D polygons for fast point in region checks
+
+def get_curve_description(curve):
+    """Describe a boundary curve in plan for Snippets._polygons.flatten_loop (lines, arcs, anything else as points)"""
+    start = curve.GetEndPoint(0)
+    end = curve.GetEndPoint(1)
+    if isinstance(curve, Line):
+        return {"type": "line", "start": (start.X, start.Y), "end": (end.X, end.Y)}
+    if isinstance(curve, Arc) and curve.IsBound:
+        center = curve.Center
+        start_angle = math.atan2(start.Y - center.Y, start.X - center.X)
+        sweep = math.atan2(end.Y - center.Y, end.X - center.X) - start_angle
+        if curve.Normal.Z >= 0:                                             # Counter-clockwise in plan
+            sweep = sweep % (2 * math.pi) or 2 * math.pi
+        else:
+            sweep = -((-sweep) % (2 * math.pi) or 2 * math.pi)
+        return {"type": "arc", "center": (center.X, center.Y), "radius": curve.Radius,
+                "start_angle": start_angle, "sweep": sweep}
+    return {"type": "points", "points": [(point.X, point.Y) for point in curve.Tessellate()]}
+
+def get_region_loops(region):
+    """Get a filled region's boundary loops (outer and holes) as lists of (x, y) points, arcs are tessellated"""
+    return [flatten_loop([get_curve_description(curve) for curve in loop]) for loop in region.GetBoundaries()]
+
+def get_region_polygon(region):
+    """Get a PolygonRegion for a filled region (key is the region id), to check which points are inside it.
+    eg:
+    polygon = get_region_polygon(region)
+    inside = [light for light in lights if polygon.contains(light.Location.Point.X, light.Location.Point.Y)]"""
+    return PolygonRegion(get_region_loops(region), key=region.Id.IntegerValue)
+
+def get_record_polygon(record):
+    """Get a PolygonRegion from a zoning snapshot record (no Revit calls)"""
+    return PolygonRegion(record["loops"], key=record["id"])
+
+#  ______               _                 _____                            _             _
+# |___  /              (_)               /  ___|                          | |           | |
+#    / /   ___   _ __   _  _ __    __ _  \ `--.  _ __    __ _  _ __   ___ | |__    ___  | |_
+#   / /   / _ \ | '_ \ | || '_ \  / _` |  `--. \| '_ \  / _` || '_ \ / __|| '_ \  / _ \ | __|
+# ./ /___| (_) || | | || || | | || (_| | /\__/ /| | | || (_| || |_) |\__ \| | | || (_) || |_
+# \_____/ \___/ |_| |_||_||_| |_| \__, | \____/ |_| |_| \__,_|| .__/ |___/|_| |_| \___/  \__|
+#                                  __/ |                      | |
+#                                 |___/                       |_|
+# Lightweight copy of the zoning filled regions, kept for the Revit session and updated from changed elements
+
+def get_region_record(region, view_levels, reader=None):
+    """Get a snapshot record of a zoning filled region:
+    {"id", "unique_id", "view", "level", "loops", "params"}
+    - loops : boundary loops as lists of (x, y) points (see get_region_loops)
+    - params : {name: value} for ZONING_PARAMS (None if the parameter is missing)
+    - view_levels : {view id: level name} shared between calls
+    - reader : ParameterReader for ZONING_PARAMS shared between calls"""
+    view_id = region.OwnerViewId.IntegerValue
+    if view_id not in view_levels:
+        view = region.Document.GetElement(region.OwnerViewId)
+        level = getattr(view, "GenLevel", None)
+        view_levels[view_id] = level.Name if level else None
+
+    loops = get_region_loops(region)
+
+    params = (reader or ParameterReader(ZONING_PARAMS, region.Document)).read_row(region)
+
+    return {"id": region.Id.IntegerValue, "unique_id": region.UniqueId, "view": view_id,
+            "level": view_levels[view_id], "loops": loops, "params": params}
+
+def get_zoning_snapshot(document=doc):
+    """Get {region id: record} for every filled region with the MEPCE Room Number parameter (see get_region_record).
+    The snapshot is kept for the Revit session. Later calls only re-read regions changed since the last call
+    (recorded by the doc-changed hook), or everything if a view or level the snapshot uses was changed.
+    Records are shared, do not edit them."""
+    snapshots = get_session_cache("ZoningSnapshot", dict)
+    key = document.PathName or document.Title
+    changed = get_change_tracker().pop(key, "ZoningSnapshot")
+    stamp = get_document_stamp(document)
+    snapshot = snapshots.get(key)
+
+    if snapshot is not None and changed is not None and snapshot["stamp"] == stamp:
+        used = set(record["view"] for record in snapshot["regions"].values())
+        used.update(snapshot["levels"])
+        if used.isdisjoint(changed):                                # Only regions changed, update them
+            view_levels = dict((record["view"], record["level"]) for record in snapshot["regions"].values())
+            reader = ParameterReader(ZONING_PARAMS, document)
+            for element_id in changed:
+                snapshot["regions"].pop(element_id, None)
+                region = document.GetElement(ElementId(element_id))
+                if isinstance(region, FilledRegion) and reader.get(region, "MEPCE Room Number"):
+                    snapshot["regions"][element_id] = get_region_record(region, view_levels, reader)
+            return snapshot["regions"]
+
+    # Read everything
+    regions = {}
+    view_levels = {}
+    reader = ParameterReader(ZONING_PARAMS, document)
+    for region in FilteredElementCollector(document).OfClass(FilledRegion):
+        if reader.get(region, "MEPCE Room Number"):
+            regions[region.Id.IntegerValue] = get_region_record(region, view_levels, reader)
+    levels = [level.Id.IntegerValue for level in FilteredElementCollector(document).OfClass(Level)]
+    snapshots[key] = {"regions": regions, "levels": levels, "stamp": stamp}
+    return regions
+
+def get_zoning_records(level=None, document=doc):
+    """Get zoning snapshot records sorted by region id, optionally only regions in views of a level (level name)"""
+    snapshot = get_zoning_snapshot(document)
+    return [snapshot[key] for key in sorted(snapshot) if level is None or snapshot[key]["level"] == level]
+
+#  _____        _    ______                               _   _____  _                                _
+# |  __ \      | |   | ___ \                             | | |  ___|| |                              | |
+# | |  \/  ___ | |_  | |_/ /  ___   ___   ___   _ __   __| | | |__  | |  ___  _ __ ___    ___  _ __  | |_  ___
+# | | __  / _ \| __| |    /  / _ \ / __| / _ \ | '__| / _` | |  __| | | / _ \| '_ ` _ \  / _ \| '_ \ | __|/ __|
+# | |_\ \|  __/| |_  | |\ \ |  __/| (__ | (_) || |   | (_| | | |___ | ||  __/| | | | | ||  __/| | | || |_ \__ \
+#  \____/ \___| \__| \_| \_| \___| \___| \___/ |_|    \__,_| \____/ |_| \___||_| |_| |_| \___||_| |_| \__||___/
+# Get the filled regions of zoning snapshot records
+
+def get_record_elements(records, document=doc):
+    """Get (record, filled region) pairs, records whose region no longer exists are skipped"""
+    pairs = []
+    for record in records:
+        region = document.GetElement(ElementId(record["id"]))
+        if region is not None:
+            pairs.append((record, region))
+    return pairs
+
+#  _____        _    ______                                              _     _____  _
+# |  __ \      | |   |  _  \                                            | |   /  ___|| |
+# | |  \/  ___ | |_  | | | |  ___    ___  _   _  _ __ ___    ___  _ __  | |_  \ `--. | |_   __ _  _ __ ___   _ __
+# | | __  / _ \| __| | | | | / _ \  / __|| | | || '_ ` _ \  / _ \| '_ \ | __|  `--. \| __| / _` || '_ ` _ \ | '_ \
+# | |_\ \|  __/| |_  | |/ / | (_) || (__ | |_| || | | | | ||  __/| | | || |_  /\__/ /| |_ | (_| || | | | | || |_) |
+#  \____/ \___| \__| |___/   \___/  \___| \__,_||_| |_| |_| \___||_| |_| \__| \____/  \__| \__,_||_| |_| |_|| .__/
+#                                                                                                           | |
+#                                                                                                           |_|
+# Get a stamp that changes when the document is saved or synchronized
+
+def get_document_stamp(document=doc):
+    """Get "version guid:number of saves" of a document, or None if Revit does not report it"""
+    try:
+        version = Document.GetDocumentVersion(document)
+        return "{}:{}".format(version.VersionGUID, version.NumberOfSaves)
+    except Exception:
+        return None
@@ -10,6 +10,9 @@ from types import NoneType
 
 from pyrevit.forms import alert
 
+from Snippets._cache import WeightedLRUCache, get_session_cache
+from Snippets._spatial import get_placement_key
+
 # ╦  ╦╔═╗╦═╗╦╔═╗╔╗ ╦  ╔═╗╔═╗
 # ╚╗╔╝╠═╣╠╦╝║╠═╣╠╩╗║  ║╣ ╚═╗
 #  ╚╝ ╩ ╩╩╚═╩╩ ╩╚═╝╩═╝╚═╝╚═╝ VARIABLES
@@ -18,6 +21,9 @@ doc   = __revit__.ActiveUIDocument.Document #type: Document
 uidoc = __revit__.ActiveUIDocument          #type: UIDocument
 app   = __revit__.Application               #type: Application
 
+MAX_CACHED_FACES = 1000000      # Geometry cache limit (total number of solid faces kept in memory)
+_geometry_options = None
+
 # ______                 _              _     _____                             _            ______
 # | ___ \               (_)            | |   /  __ \                           | |          |___  /
 # | |_/ / _ __   ___     _   ___   ___ | |_  | /  \/ _   _  _ __ __   __  ___  | |_   ___      / /
@@ -46,12 +52,20 @@ def project_to_level(curve, elev):
 #                                                                                                  __/ |
 #                                                                                                 |___/
 # Get solid geometry from an input element
+def get_geometry_options():
+    """Get the shared geometry Options (created once)"""
+    global _geometry_options
+    if _geometry_options is None:
+        _geometry_options = Options()
+        _geometry_options.ComputeReferences = True
+        _geometry_options.IncludeNonVisibleObjects = False
+    return _geometry_options
+
 def get_solid_geometry(element,transform=None):
     """Get solid geometry from an input element"""
-    opt = Options()
-    opt.ComputeReferences = True
-    opt.IncludeNonVisibleObjects = False
-    geo_elem = element.get_Geometry(opt)
+    geo_elem = element.get_Geometry(get_geometry_options())
+    if not geo_elem:
+        return []
 
     solids = []
 
@@ -69,6 +83,80 @@ def get_solid_geometry(element,transform=None):
 
     return solids
 
+#  _____        _     _____  _                                _     _   _                   _
+# |  __ \      | |   |  ___|| |                              | |   | | | |                 (_)
+# | |  \/  ___ | |_  | |__  | |  ___  _ __ ___    ___  _ __  | |_  | | | |  ___  _ __  ___  _   ___   _ __
+# | | __  / _ \| __| |  __| | | / _ \| '_ ` _ \  / _ \| '_ \ | __| | | | | / _ \| '__|/ __|| | / _ \ | '_ \
+# | |_\ \|  __/| |_  | |___ | ||  __/| | | | | ||  __/| | | || |_  \ \_/ /|  __/| |   \__ \| || (_) || | | |
+#  \____/ \___| \__| \____/ |_| \___||_| |_| |_| \___||_| |_| \__|  \___/  \___||_|   |___/|_| \___/ |_| |_|
+# Get a value which changes whenever the element's geometry is edited
+def get_element_version(element, transform=None):
+    """Get a string which changes whenever the element is edited.
+    Uses Element.VersionGuid where the Revit version has it. Otherwise:
+    - Linked elements can not be edited in this session, so the link document version is used
+    - Host elements fall back to their bounding box and location
+    - transform : the link instance transform for linked elements, added to the version so moving, rotating or
+      placing the link again gives a new version"""
+    version = getattr(element, "VersionGuid", None)
+    if version is not None:
+        version = str(version)
+    else:
+        version = get_edit_version(element)
+    if transform is not None:
+        version += "@" + get_placement_key(*[(point.X, point.Y, point.Z) for point in
+                                            (transform.Origin, transform.BasisX, transform.BasisY, transform.BasisZ)])
+    return version
+
+def get_edit_version(element):
+    """Get a version for an element on Revit versions without Element.VersionGuid (see get_element_version)"""
+    el_doc = element.Document
+    if el_doc.IsLinked:
+        try:
+            docversion = Document.GetDocumentVersion(el_doc)
+            return "link:{}:{}".format(docversion.VersionGUID, docversion.NumberOfSaves)
+        except:
+            pass
+
+    parts = []
+    bounding = element.get_BoundingBox(None)
+    if bounding:
+        parts.extend([bounding.Min.X, bounding.Min.Y, bounding.Min.Z, bounding.Max.X, bounding.Max.Y, bounding.Max.Z])
+    location = element.Location
+    if isinstance(location, LocationCurve):
+        for i in range(2):
+            point = location.Curve.GetEndPoint(i)
+            parts.extend([point.X, point.Y, point.Z])
+    elif isinstance(location, LocationPoint):
+        parts.extend([location.Point.X, location.Point.Y, location.Point.Z])
+    return "geo:" + ",".join("{:.6f}".format(part) for part in parts)
+
+#  _____        _     _____               _                _   _____         _  _      _   _____                                _
+# |  __ \      | |   /  __ \             | |              | | /  ___|       | |(_)    | | |  __ \                              | |
+# | |  \/  ___ | |_  | /  \/  __ _   ___ | |__    ___   __| | \ `--.   ___  | | _   __| | | |  \/  ___   ___   _ __ ___    ___ | |_  _ __  _   _
+# | | __  / _ \| __| | |     / _` | / __|| '_ \  / _ \ / _` |  `--. \ / _ \ | || | / _` | | | __  / _ \ / _ \ | '_ ` _ \  / _ \| __|| '__|| | | |
+# | |_\ \|  __/| |_  | \__/\| (_| || (__ | | | ||  __/| (_| | /\__/ /| (_) || || || (_| | | |_\ \|  __/| (_) || | | | | ||  __/| |_ | |   | |_| |
+#  \____/ \___| \__|  \____/ \__,_| \___||_| |_| \___| \__,_| \____/  \___/ |_||_| \__,_|  \____/ \___| \___/ |_| |_| |_| \___| \__||_|    \__, |
+#                                                                                                                                           __/ |
+#                                                                                                                                          |___/
+# Get solid geometry from an input element, reusing solids from earlier runs in this Revit session
+def get_cached_solid_geometry(element,transform=None):
+    """Get solid geometry from an input element (same as get_solid_geometry), cached for the Revit session.
+    Cache key is (document path, element id, element version) so edited elements are extracted again,
+    and unchanged elements (eg: linked structure) are not. Least recently used solids are dropped once the
+    cache holds more than MAX_CACHED_FACES faces."""
+    cache = get_session_cache("SolidGeometry", lambda: WeightedLRUCache(MAX_CACHED_FACES))
+    el_doc = element.Document
+    key = (el_doc.PathName or el_doc.Title, element.Id.IntegerValue, get_element_version(element))
+
+    solids = cache.get(key)
+    if solids is None:
+        solids = get_solid_geometry(element)
+        cache.put(key, solids, weight=max(1, sum(s.Faces.Size for s in solids)))
+
+    if transform:
+        solids = [SolidUtils.CreateTransformed(s, transform) for s in solids if s]
+    return list(solids)
+
 # ______                           _  _                ______                           _____         _                                 _
 # | ___ \                         | |(_)               | ___ \                         |_   _|       | |                               | |
 # | |_/ /  ___   _   _  _ __    __| | _  _ __    __ _  | |_/ /  ___  __  __  ___  ___    | |   _ __  | |_   ___  _ __  ___   ___   ___ | |_
@@ -86,6 +174,18 @@ def bounding_boxes_intersect(bb1, bb2):
             bb1.Max.Y >= bb2.Min.Y and bb1.Min.Y <= bb2.Max.Y and
             bb1.Max.Z >= bb2.Min.Z and bb1.Min.Z <= bb2.Max.Z)
 
+def get_transformed_box(bounding, transform=None):
+    """Get (minx, miny, minz, maxx, maxy, maxz) around a BoundingBoxXYZ after a transform (eg: a link's transform).
+    Returns None if there is no bounding box."""
+    if not bounding:
+        return None
+    if not transform:
+        return (bounding.Min.X, bounding.Min.Y, bounding.Min.Z, bounding.Max.X, bounding.Max.Y, bounding.Max.Z)
+    points = [transform.OfPoint(XYZ(x, y, z)) for x in (bounding.Min.X, bounding.Max.X)
+              for y in (bounding.Min.Y, bounding.Max.Y) for z in (bounding.Min.Z, bounding.Max.Z)]
+    return (min(p.X for p in points), min(p.Y for p in points), min(p.Z for p in points),
+            max(p.X for p in points), max(p.Y for p in points), max(p.Z for p in points))
+
 # ______  _         _    _                  _____         _  _      _
 # |  ___|| |       | |  | |                /  ___|       | |(_)    | |
 # | |_   | |  __ _ | |_ | |_   ___  _ __   \ `--.   ___  | | _   __| | ___
@@ -106,12 +106,14 @@ def color_picker(index):
 #  \___/ | .__/  \__,_| \__,_| \__| \___| \_____/ \___/ |_| |_| \___|  \____/ \___/ |_| \___/ |_|   |___/
 #        | |
 #        |_|
-def update_zone_colors(active_view,filledregions):
-    """Updates filled region colors based on zones"""
+def update_zone_colors(active_view,filledregions,zones=None):
+    """Updates filled region colors based on zones.
+    zones: MEPCE HVAC Zone value of each region (eg: from the zoning snapshot), read from the regions if None"""
+    if zones is None:
+        zones = [region.LookupParameter("MEPCE HVAC Zone").AsString() for region in filledregions]
     allexistingprefixes = []
     allexistingzones = {}
-    for region in filledregions:
-        regionzone = region.LookupParameter("MEPCE HVAC Zone").AsString()
+    for region,regionzone in zip(filledregions,zones):
         if regionzone:
             zoneparts = regionzone.split('-')
             del zoneparts[-1]
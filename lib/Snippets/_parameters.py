@@ -25,6 +25,10 @@ doc   = __revit__.ActiveUIDocument.Document #type: Document
 uidoc = __revit__.ActiveUIDocument          #type: UIDocument
 app   = __revit__.Application               #type: Application
 
+BUILTIN_PARAMETERS = {"Area": BuiltInParameter.HOST_AREA_COMPUTED,          # Names read with a built in parameter
+                      "Comments": BuiltInParameter.ALL_MODEL_INSTANCE_COMMENTS,
+                      "Mark": BuiltInParameter.ALL_MODEL_MARK}
+
 #  _____                                 _      ___   _  _  ______                                       _
 # |_   _|                               | |    / _ \ | || | | ___ \                                     | |
 #   | |   _ __ ___   _ __    ___   _ __ | |_  / /_\ \| || | | |_/ /  __ _  _ __   __ _  _ __ ___    ___ | |_   ___  _ __  ___
@@ -103,3 +107,83 @@ def import_all_shared_parameters(categories, pgroup, param_file_path, instance=T
     app.SharedParametersFilename = original_file
 
     return created_params
+
+# ______                                       _                ______                   _
+# | ___ \                                     | |               | ___ \                 | |
+# | |_/ /  __ _  _ __   __ _  _ __ ___    ___ | |_   ___  _ __  | |_/ /  ___   __ _   __| |  ___  _ __
+# |  __/  / _` || '__| / _` || '_ ` _ \  / _ \| __| / _ \| '__| |    /  / _ \ / _` | / _` | / _ \| '__|
+# | |    | (_| || |   | (_| || | | | | ||  __/| |_ |  __/| |    | |\ \ |  __/| (_| || (_| ||  __/| |
+# \_|     \__,_||_|    \__,_||_| |_| |_| \___| \__| \___||_|    \_| \_| \___| \__,_| \__,_| \___||_|
+# Read named parameters from many elements, resolving each name once
+
+def get_parameter_keys(names, document=doc):
+    """Get {name: key} where key can be passed to get_Parameter: the GUID of a shared parameter or a built in parameter.
+    Names which can not be resolved, or are used by more than one shared parameter, keep the name itself (read with LookupParameter)."""
+    keys = dict((name, BUILTIN_PARAMETERS[name]) for name in names if name in BUILTIN_PARAMETERS)
+    wanted = set(names) - set(keys)
+    if wanted:
+        shared_keys = {}
+        for shared in FilteredElementCollector(document).OfClass(SharedParameterElement):
+            name = shared.Name
+            if name in wanted:
+                shared_keys[name] = name if name in shared_keys else shared.GuidValue
+        keys.update(shared_keys)
+    for name in names:
+        keys.setdefault(name, name)
+    return keys
+
+class ParameterReader(object):
+    """Read typed parameter values by name from many elements.
+    Each name is resolved once per document (see get_parameter_keys) and its storage type is checked once,
+    instead of calling LookupParameter and checking StorageType for every value.
+
+    eg:
+    reader = ParameterReader(["MEPCE Room Number", "MEPCE Room Airflow", "Area"])
+    columns = reader.read_columns(regions)      # {"MEPCE Room Number": ["101", "102"], "Area": [250.0, 180.5], ...}"""
+
+    def __init__(self, names, document=doc):
+        self.names = list(names)
+        self.keys = get_parameter_keys(self.names, document)
+        self._readers = {}      # name: function to read the value from a parameter of that name
+
+    def get(self, element, name):
+        """Get an element's parameter by name, or None"""
+        key = self.keys.get(name, name)
+        if isinstance(key, str):
+            return element.LookupParameter(key)
+        return element.get_Parameter(key)
+
+    def read(self, element, name):
+        """Get an element's parameter value (str, float, int or element id integer), or None if it has no parameter"""
+        param = self.get(element, name)
+        if param is None:
+            return None
+        reader = self._readers.get(name)
+        if reader is None:
+            reader = self._readers[name] = get_value_reader(param.StorageType)
+        return reader(param)
+
+    def read_row(self, element):
+        """Get {name: value} for one element"""
+        return dict((name, self.read(element, name)) for name in self.names)
+
+    def read_columns(self, elements):
+        """Get {name: [value for each element]} for a list of elements"""
+        columns = dict((name, []) for name in self.names)
+        for element in elements:
+            for name in self.names:
+                columns[name].append(self.read(element, name))
+        return columns
+
+def get_value_reader(storage_type):
+    """Get a function which reads a parameter's value for a StorageType"""
+    if storage_type == StorageType.String:
+        return lambda param: param.AsString()
+    if storage_type == StorageType.Double:
+        return lambda param: param.AsDouble()
+    if storage_type == StorageType.Integer:
+        return lambda param: param.AsInteger()
+    if storage_type == StorageType.ElementId:
+        return lambda param: param.AsElementId().IntegerValue
+    return lambda param: param.AsValueString()
+
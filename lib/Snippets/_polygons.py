@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+# Pure python 2D polygon helpers. No Revit imports so it can be run and tested outside of Revit.
+# Points are (x, y) tuples, polygons are lists of points (not closed, the last point connects to the first).
+
+# ╦╔╦╗╔═╗╔═╗╦═╗╔╦╗╔═╗
+# ║║║║╠═╝║ ║╠╦╝ ║ ╚═╗
+# ╩╩ ╩╩  ╚═╝╩╚═ ╩ ╚═╝ IMPORTS
+#==================================================
+import math
+
+from Snippets._spatial import build_grid, get_cell_size, query_grid
+
+# ╦  ╦╔═╗╦═╗╦╔═╗╔╗ ╦  ╔═╗╔═╗
+# ╚╗╔╝╠═╣╠╦╝║╠═╣╠╩╗║  ║╣ ╚═╗
+#  ╚╝ ╩ ╩╩╚═╩╩ ╩╚═╝╩═╝╚═╝╚═╝ VARIABLES
+#==================================================
+PRECISION = 4       # Decimal places used to match points (ft)
+ARC_SEGMENT_ANGLE = math.radians(10)    # Largest angle an arc turns through per straight segment when flattened
+
+#  _____                                    _   _         _  _
+# /  __ \                                  | | | |       | || |
+# | /  \/  ___   _ __  __   __  ___ __  __ | |_| | _   _ | || |
+# | |     / _ \ | '_ \ \ \ / / / _ \\ \/ / |  _  || | | || || |
+# | \__/\| (_) || | | | \ V / |  __/ >  <  | | | || |_| || || |
+#  \____/ \___/ |_| |_|  \_/   \___|/_/\_\ \_| |_/ \__,_||_||_|
+# Smallest convex polygon around a set of points
+def convex_hull(points):
+    """Get the convex hull of 2D points, counter-clockwise (monotone chain).
+    Returns fewer than 3 points if all points are the same or in a line."""
+    points = sorted(set((float(x), float(y)) for x, y in points))
+    if len(points) <= 2:
+        return points
+
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    lower = []
+    for point in points:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], point) <= 0:
+            lower.pop()
+        lower.append(point)
+    upper = []
+    for point in reversed(points):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], point) <= 0:
+            upper.pop()
+        upper.append(point)
+    return lower[:-1] + upper[:-1]
+
+# ______                           _  _                ______              _                         _
+# | ___ \                         | |(_)               | ___ \            | |                       | |
+# | |_/ /  ___   _   _  _ __    __| | _  _ __    __ _  | |_/ /  ___   ___ | |_   __ _  _ __    __ _ | |  ___
+# | ___ \ / _ \ | | | || '_ \  / _` || || '_ \  / _` | |    /  / _ \ / __|| __| / _` || '_ \  / _` || | / _ \
+# | |_/ /| (_) || |_| || | | || (_| || || | | || (_| | | |\ \ |  __/| (__ | |_ | (_| || | | || (_| || ||  __/
+# \____/  \___/  \__,_||_| |_| \__,_||_||_| |_| \__, | \_| \_| \___| \___| \__| \__,_||_| |_| \__, ||_| \___|
+#                                                __/ |                                         __/ |
+#                                               |___/                                         |___/
+# Rectangle around a set of points
+def bounding_rectangle(points, padding=0.0):
+    """Get the axis aligned rectangle around 2D points grown by padding, as a counter-clockwise polygon"""
+    xs = [point[0] for point in points]
+    ys = [point[1] for point in points]
+    xmin, xmax = min(xs) - padding, max(xs) + padding
+    ymin, ymax = min(ys) - padding, max(ys) + padding
+    return [(xmin, ymin), (xmax, ymin), (xmax, ymax), (xmin, ymax)]
+
+#  _   _         _                       _____                                       _
+# | | | |       (_)                     /  ___|                                     | |
+# | | | | _ __   _   __ _  _   _   ___  \ `--.   ___   __ _  _ __ ___    ___  _ __  | |_  ___
+# | | | || '_ \ | | / _` || | | | / _ \  `--. \ / _ \ / _` || '_ ` _ \  / _ \| '_ \ | __|/ __|
+# | |_| || | | || || (_| || |_| ||  __/ /\__/ /|  __/| (_| || | | | | ||  __/| | | || |_ \__ \
+#  \___/ |_| |_||_| \__, | \__,_| \___| \____/  \___| \__, ||_| |_| |_| \___||_| |_| \__||___/
+#                      | |                             __/ |
+#                      |_|                            |___/
+# Edges of polygons with duplicates and very short edges removed
+def polygon_segments(polygon):
+    """Get the edges of a polygon as (start, end) pairs"""
+    return [(polygon[i], polygon[(i + 1) % len(polygon)]) for i in range(len(polygon))] if len(polygon) > 1 else []
+
+def unique_segments(segments, min_length=0.0, precision=PRECISION):
+    """Remove duplicate segments (either direction) and segments shorter than min_length, keeping the first one"""
+    seen = set()
+    unique = []
+    for start, end in segments:
+        dx = end[0] - start[0]
+        dy = end[1] - start[1]
+        if (dx * dx + dy * dy) ** 0.5 <= min_length:
+            continue
+        a = (round(start[0], precision), round(start[1], precision))
+        b = (round(end[0], precision), round(end[1], precision))
+        key = (a, b) if a <= b else (b, a)
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append((start, end))
+    return unique
+
+# ______  _         _    _                  _
+# |  ___|| |       | |  | |                | |
+# | |_   | |  __ _ | |_ | |_   ___  _ __   | |      ___    ___   _ __   ___
+# |  _|  | | / _` || __|| __| / _ \| '_ \  | |     / _ \  / _ \ | '_ \ / __|
+# | |    | || (_| || |_ | |_ |  __/| | | | | |____| (_) || (_) || |_) |\__ \
+# \_|    |_| \__,_| \__| \__| \___||_| |_| \_____/ \___/  \___/ | .__/ |___/
+#                                                               | |
+#                                                               |_|
+# Boundary loops of lines and arcs as lists of vertices
+def tessellate_arc(center, radius, start_angle, sweep, max_angle=ARC_SEGMENT_ANGLE):
+    """Get points along an arc, starting at start_angle and turning through sweep (radians, negative is clockwise).
+    Includes both end points."""
+    count = max(1, int(math.ceil(abs(sweep) / max_angle)))
+    points = []
+    for i in range(count + 1):
+        angle = start_angle + sweep * i / count
+        points.append((center[0] + radius * math.cos(angle), center[1] + radius * math.sin(angle)))
+    return points
+
+def flatten_loop(curves, max_angle=ARC_SEGMENT_ANGLE):
+    """Flatten a boundary loop into a polygon. Curves are in loop order, each a dictionary:
+    - {"type": "line", "start": (x, y), "end": (x, y)}
+    - {"type": "arc", "center": (x, y), "radius": r, "start_angle": a, "sweep": s}
+    - {"type": "points", "points": [(x, y), ...]}         eg: a spline tessellated by Revit"""
+    polygon = []
+    for curve in curves:
+        if curve["type"] == "line":
+            points = [curve["start"], curve["end"]]
+        elif curve["type"] == "arc":
+            points = tessellate_arc(curve["center"], curve["radius"], curve["start_angle"], curve["sweep"], max_angle)
+        else:
+            points = list(curve["points"])
+        polygon.extend(tuple(point) for point in points[:-1])  # The end point is the next curve's start point
+    return polygon
+
+# ______         _         _     _____         ______         _
+# | ___ \       (_)       | |   |_   _|        | ___ \       | |
+# | |_/ /  ___   _  _ __  | |_    | |   _ __   | |_/ /  ___  | | _   _   __ _   ___   _ __
+# |  __/  / _ \ | || '_ \ | __|   | |  | '_ \  |  __/  / _ \ | || | | | / _` | / _ \ | '_ \
+# | |    | (_) || || | | || |_   _| |_ | | | | | |    | (_) || || |_| || (_| || (_) || | | |
+# \_|     \___/ |_||_| |_| \__|  \___/ |_| |_| \_|     \___/ |_| \__, | \__, | \___/ |_| |_|
+#                                                                 __/ |  __/ |
+#                                                                |___/  |___/
+# Even-odd containment test for polygons with holes
+def point_in_loops(x, y, loops):
+    """Check if a point is inside a set of loops with the even-odd rule, so loops inside the outer loop are holes.
+    Points exactly on an edge may go either way."""
+    inside = False
+    for loop in loops:
+        j = len(loop) - 1
+        for i in range(len(loop)):
+            xi, yi = loop[i]
+            xj, yj = loop[j]
+            if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+                inside = not inside
+            j = i
+    return inside
+
+class PolygonRegion(object):
+    """A flattened region (outer loop and any holes) with its bounding box, for fast point tests.
+
+    eg:
+    region = PolygonRegion([[(0, 0), (10, 0), (10, 10), (0, 10)], [(4, 4), (6, 4), (6, 6), (4, 6)]], key=123)
+    region.contains(2, 2)       # True
+    region.contains(5, 5)       # False, in the hole"""
+
+    def __init__(self, loops, key=None):
+        self.key = key
+        self.loops = [[(float(x), float(y)) for x, y in loop] for loop in loops if len(loop) >= 3]
+        points = [point for loop in self.loops for point in loop]
+        if points:
+            self.box = (min(p[0] for p in points), min(p[1] for p in points),
+                        max(p[0] for p in points), max(p[1] for p in points))
+        else:
+            self.box = None
+
+    def contains(self, x, y):
+        """Check if the point (x, y) is inside the region, rejecting points outside the bounding box first"""
+        box = self.box
+        if box is None or x < box[0] or x > box[2] or y < box[1] or y > box[3]:
+            return False
+        return point_in_loops(x, y, self.loops)
+
+#  _____                             ______         _         _
+# |  __ \                            | ___ \       (_)       | |
+# | |  \/ _ __   ___   _   _  _ __   | |_/ /  ___   _  _ __  | |_  ___
+# | | __ | '__| / _ \ | | | || '_ \  |  __/  / _ \ | || '_ \ | __|/ __|
+# | |_\ \| |   | (_) || |_| || |_) | | |    | (_) || || | | || |_ \__ \
+#  \____/|_|    \___/  \__,_|| .__/  \_|     \___/ |_||_| |_| \__||___/
+#                            | |
+#                            |_|
+# Find the regions containing many points in one pass with a grid over the region boxes
+def _region_grid(regions, cell_size=None):
+    boxes = [(region.box[0], region.box[1], 0.0, region.box[2], region.box[3], 0.0) if region.box else None
+             for region in regions]
+    return build_grid(boxes, cell_size or get_cell_size(boxes))
+
+def _containing_regions(grid, regions, x, y):
+    return [index for index in sorted(query_grid(grid, (x, y, 0.0, x, y, 0.0))) if regions[index].contains(x, y)]
+
+def group_points(regions, points, cell_size=None):
+    """Group points by the regions they are inside, only testing regions whose box shares a grid cell with the point.
+    - regions : list of PolygonRegion
+    - points : list of (x, y)
+    Returns a list of point indices for each region (a point inside overlapping regions is in each of their lists).
+
+    eg:
+    groups = group_points(polygons, [(light.X, light.Y) for light in points])     # groups[i] are the lights in polygons[i]"""
+    groups = [[] for region in regions]
+    if not regions:
+        return groups
+    grid = _region_grid(regions, cell_size)
+    for p_idx, point in enumerate(points):
+        for index in _containing_regions(grid, regions, point[0], point[1]):
+            groups[index].append(p_idx)
+    return groups
+
+def assign_points(regions, points, cell_size=None):
+    """Get the index of the region each point is inside (the first one if regions overlap), or None if outside all"""
+    if not regions:
+        return [None for point in points]
+    grid = _region_grid(regions, cell_size)
+    assigned = []
+    for point in points:
+        found = _containing_regions(grid, regions, point[0], point[1])
+        assigned.append(found[0] if found else None)
+    return assigned
+
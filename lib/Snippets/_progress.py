@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+# Progress bars, stage timing and performance logs for long running buttons.
+
+# ╦╔╦╗╔═╗╔═╗╦═╗╔╦╗╔═╗
+# ║║║║╠═╝║ ║╠╦╝ ║ ╚═╗
+# ╩╩ ╩╩  ╚═╝╩╚═ ╩ ╚═╝ IMPORTS
+#==================================================
+import time
+import json
+from datetime import datetime
+
+from pyrevit import script
+from pyrevit.forms import ProgressBar
+
+# ╦  ╦╔═╗╦═╗╦╔═╗╔╗ ╦  ╔═╗╔═╗
+# ╚╗╔╝╠═╣╠╦╝║╠═╣╠╩╗║  ║╣ ╚═╗
+#  ╚╝ ╩ ╩╩╚═╩╩ ╩╚═╝╩═╝╚═╝╚═╝ VARIABLES
+#==================================================
+PROGRESS_UPDATES = 200      # Number of times a progress bar is redrawn per stage (redrawing every item is slow)
+
+def format_duration(seconds):
+    """Format seconds as h:mm:ss"""
+    seconds = int(round(seconds))
+    return "{}:{:02d}:{:02d}".format(seconds // 3600, (seconds % 3600) // 60, seconds % 60)
+
+# ______                 _____  _
+# | ___ \               |_   _|(_)
+# | |_/ / _   _  _ __     | |   _  _ __ ___    ___  _ __
+# |    / | | | || '_ \    | |  | || '_ ` _ \  / _ \| '__|
+# | |\ \ | |_| || | | |   | |  | || | | | | ||  __/| |
+# \_| \_| \__,_||_| |_|   \_/  |_||_| |_| |_| \___||_|
+# Time each stage of a run and log it
+class RunTimer(object):
+    """Records how long each stage of a run takes and how many items it handled.
+    cancelled is set by StageProgress when the user cancels a stage, later stages can check it to skip work.
+
+    eg:
+    timer = RunTimer("Clash Detection")
+    with StageProgress(timer, "Narrow Phase", len(pairs), "pairs") as stage:
+        for pair in stage.iterate(pairs):
+            ...
+    timer.write_log({"model": doc.Title})"""
+
+    def __init__(self, name):
+        self.name = name
+        self.stages = []
+        self.cancelled = False
+        self.started = time.time()
+        self._stage = None
+
+    def start(self, stage):
+        """Start timing a stage"""
+        self._stage = {"name": stage, "start": time.time()}
+
+    def stop(self, count=None):
+        """Stop timing the current stage, with the number of items it handled"""
+        if self._stage is None:
+            return
+        seconds = time.time() - self._stage["start"]
+        self.stages.append({"name": self._stage["name"], "seconds": round(seconds, 3), "count": count})
+        self._stage = None
+
+    def get_report(self):
+        """Get report lines with the time of each stage"""
+        lines = []
+        for stage in self.stages:
+            rate = ""
+            if stage["count"] and stage["seconds"] > 0:
+                rate = " ({:.0f}/s)".format(stage["count"] / stage["seconds"])
+            lines.append("{}: {}{}".format(stage["name"], format_duration(stage["seconds"]), rate))
+        lines.append("Total: {}{}".format(format_duration(time.time() - self.started),
+                                          " (cancelled, partial results)" if self.cancelled else ""))
+        return lines
+
+    def write_log(self, info=None):
+        """Add this run to the performance log (one json line per run, shared by all models).
+        - info : extra values to save with the run, eg: model name and element counts
+        Returns the log file path."""
+        entry = {"tool": self.name, "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                 "seconds": round(time.time() - self.started, 3), "cancelled": self.cancelled, "stages": self.stages}
+        entry.update(info or {})
+        path = script.get_universal_data_file("{}Performance".format(self.name.replace(" ", "")), "jsonl")
+        try:
+            with open(path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+        except Exception as e:
+            print "Could not write performance log: {}".format(e)
+        return path
+
+#  _____  _                        ______
+# /  ___|| |                       | ___ \
+# \ `--. | |_   __ _   __ _   ___  | |_/ / _ __   ___    __ _  _ __   ___  ___  ___
+#  `--. \| __| / _` | / _` | / _ \ |  __/ | '__| / _ \  / _` || '__| / _ \/ __|/ __|
+# /\__/ /| |_ | (_| || (_| ||  __/ | |    | |   | (_) || (_| || |   |  __/\__ \\__ \
+# \____/  \__| \__,_| \__, | \___| \_|    |_|    \___/  \__, ||_|    \___||___/|___/
+#                      __/ |                             __/ |
+#                     |___/                             |___/
+# Cancellable progress bar for one stage with throughput and time left
+class StageProgress(object):
+    """pyRevit progress bar for one stage of a RunTimer. The title shows items per second and the time left.
+    Cancelling stops the stage (iterate stops early and update returns True) and sets timer.cancelled."""
+
+    def __init__(self, timer, name, total, unit="items"):
+        self.timer = timer
+        self.name = name
+        self.total = max(total, 1)
+        self.unit = unit
+        self.done = 0
+        self._step = max(1, self.total // PROGRESS_UPDATES)
+        self._bar = None
+        self._start = None
+
+    def __enter__(self):
+        self.timer.start(self.name)
+        self._start = time.time()
+        self._bar = ProgressBar(title=self.name, cancellable=True)
+        self._bar.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._bar.__exit__(exc_type, exc_value, traceback)
+        self.timer.stop(self.done)
+
+    def update(self, done, total=None):
+        """Set the number of items done. Returns True if the user cancelled (usable as a progress callback)."""
+        if total:
+            self.total = max(total, 1)
+        self.done = done
+        if self._bar.cancelled:
+            self.timer.cancelled = True
+            return True
+        if done % self._step == 0:
+            elapsed = time.time() - self._start
+            rate = done / elapsed if elapsed > 0 else 0
+            left = format_duration((self.total - done) / rate) if rate else "-"
+            self._bar.title = "{} - {} of {} {} ({:.0f}/s, {} left)".format(
+                self.name, done, self.total, self.unit, rate, left)
+            self._bar.update_progress(done, self.total)
+        return False
+
+    def iterate(self, items):
+        """Yield items while updating the progress bar, stopping early if cancelled"""
+        for item in items:
+            if self.update(self.done):
+                return
+            yield item
+            self.done += 1
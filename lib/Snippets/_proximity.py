@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+# Pure python distance and overlap checks between segments (pipe/duct/conduit centerlines) and boxes.
+# No Revit imports so it can be run and tested outside of Revit. Points are (x, y, z) tuples,
+# boxes are (minx, miny, minz, maxx, maxy, maxz) tuples.
+
+# ╦╔╦╗╔═╗╔═╗╦═╗╔╦╗╔═╗
+# ║║║║╠═╝║ ║╠╦╝ ║ ╚═╗
+# ╩╩ ╩╩  ╚═╝╩╚═ ╩ ╚═╝ IMPORTS
+#==================================================
+from math import sqrt
+
+# ╦  ╦╔═╗╦═╗╦╔═╗╔╗ ╦  ╔═╗╔═╗
+# ╚╗╔╝╠═╣╠╦╝║╠═╣╠╩╗║  ║╣ ╚═╗
+#  ╚╝ ╩ ╩╩╚═╩╩ ╩╚═╝╩═╝╚═╝╚═╝ VARIABLES
+#==================================================
+TOLERANCE = 1.0 / 256       # Pairs closer than this to touching are left to the solid check (ft)
+EPSILON = 1e-12
+
+def _sub(a, b):
+    return (a[0] - b[0], a[1] - b[1], a[2] - b[2])
+
+def _dot(a, b):
+    return a[0] * b[0] + a[1] * b[1] + a[2] * b[2]
+
+def _at(p, d, t):
+    return (p[0] + d[0] * t, p[1] + d[1] * t, p[2] + d[2] * t)
+
+def _clamp(value, low=0.0, high=1.0):
+    return max(low, min(high, value))
+
+#  _____                                       _    ______  _       _
+# /  ___|                                     | |   |  _  \(_)     | |
+# \ `--.   ___   __ _  _ __ ___    ___  _ __  | |_  | | | | _  ___ | |_   __ _  _ __    ___   ___
+#  `--. \ / _ \ / _` || '_ ` _ \  / _ \| '_ \ | __| | | | || |/ __|| __| / _` || '_ \  / __| / _ \
+# /\__/ /|  __/| (_| || | | | | ||  __/| | | || |_  | |/ / | |\__ \| |_ | (_| || | | || (__ |  __/
+# \____/  \___| \__, ||_| |_| |_| \___||_| |_| \__| |___/  |_||___/ \__| \__,_||_| |_| \___| \___|
+#                __/ |
+#               |___/
+# Closest points between two segments
+def closest_points_segments(p1, q1, p2, q2):
+    """Get the closest points between segment p1-q1 and segment p2-q2.
+    Returns (s, t, c1, c2, distance) where c1 = p1 + s*(q1-p1) and c2 = p2 + t*(q2-p2)."""
+    d1 = _sub(q1, p1)
+    d2 = _sub(q2, p2)
+    r = _sub(p1, p2)
+    a = _dot(d1, d1)
+    e = _dot(d2, d2)
+    f = _dot(d2, r)
+
+    if a <= EPSILON and e <= EPSILON:                  # Both segments are points
+        s = t = 0.0
+    elif a <= EPSILON:                                  # First segment is a point
+        s = 0.0
+        t = _clamp(f / e)
+    else:
+        c = _dot(d1, r)
+        if e <= EPSILON:                                # Second segment is a point
+            t = 0.0
+            s = _clamp(-c / a)
+        else:
+            b = _dot(d1, d2)
+            denom = a * e - b * b
+            if denom > EPSILON:
+                s = _clamp((b * f - c * e) / denom)
+            else:                                       # Parallel segments
+                s = 0.0
+            t = (b * s + f) / e
+            if t < 0.0:
+                t = 0.0
+                s = _clamp(-c / a)
+            elif t > 1.0:
+                t = 1.0
+                s = _clamp((b - c) / a)
+
+    c1 = _at(p1, d1, s)
+    c2 = _at(p2, d2, t)
+    diff = _sub(c1, c2)
+    return s, t, c1, c2, sqrt(_dot(diff, diff))
+
+# ______         _         _    ______               ______  _       _
+# | ___ \       (_)       | |   | ___ \              |  _  \(_)     | |
+# | |_/ /  ___   _  _ __  | |_  | |_/ /  ___  __  __ | | | | _  ___ | |_   __ _  _ __    ___   ___
+# |  __/  / _ \ | || '_ \ | __| | ___ \ / _ \ \ \/ / | | | || |/ __|| __| / _` || '_ \  / __| / _ \
+# | |    | (_) || || | | || |_  | |_/ /| (_) | >  <  | |/ / | |\__ \| |_ | (_| || | | || (__ |  __/
+# \_|     \___/ |_||_| |_| \__| \____/  \___/ /_/\_\ |___/  |_||___/ \__| \__,_||_| |_| \___| \___|
+# Distance from a point to a box
+def point_box_distance(point, box):
+    """Distance from a point to a box (0 if the point is inside)"""
+    dx = max(box[0] - point[0], 0.0, point[0] - box[3])
+    dy = max(box[1] - point[1], 0.0, point[1] - box[4])
+    dz = max(box[2] - point[2], 0.0, point[2] - box[5])
+    return sqrt(dx * dx + dy * dy + dz * dz)
+
+def closest_point_box(point, box):
+    """Get the point in a box closest to point"""
+    return tuple(_clamp(point[axis], box[axis], box[axis + 3]) for axis in range(3))
+
+# ______               ______  _       _
+# | ___ \              |  _  \(_)     | |
+# | |_/ /  ___  __  __ | | | | _  ___ | |_   __ _  _ __    ___   ___
+# | ___ \ / _ \ \ \/ / | | | || |/ __|| __| / _` || '_ \  / __| / _ \
+# | |_/ /| (_) | >  <  | |/ / | |\__ \| |_ | (_| || | | || (__ |  __/
+# \____/  \___/ /_/\_\ |___/  |_||___/ \__| \__,_||_| |_| \___| \___|
+# Closest points between two boxes
+def closest_points_boxes(box1, box2):
+    """Get (distance, point1, point2) between two boxes. Overlapping boxes have distance 0 and both points are
+    in the middle of the overlap."""
+    point1 = []
+    point2 = []
+    total = 0.0
+    for axis in range(3):
+        gap1 = box2[axis] - box1[axis + 3]          # box2 is above box1 on this axis
+        gap2 = box1[axis] - box2[axis + 3]          # box1 is above box2 on this axis
+        if gap1 > 0:
+            point1.append(box1[axis + 3])
+            point2.append(box2[axis])
+            total += gap1 * gap1
+        elif gap2 > 0:
+            point1.append(box1[axis])
+            point2.append(box2[axis + 3])
+            total += gap2 * gap2
+        else:
+            middle = (max(box1[axis], box2[axis]) + min(box1[axis + 3], box2[axis + 3])) / 2
+            point1.append(middle)
+            point2.append(middle)
+    return sqrt(total), tuple(point1), tuple(point2)
+
+#  _____                                       _    ______
+# /  ___|                                     | |   | ___ \
+# \ `--.   ___   __ _  _ __ ___    ___  _ __  | |_  | |_/ /  ___  __  __
+#  `--. \ / _ \ / _` || '_ ` _ \  / _ \| '_ \ | __| | ___ \ / _ \ \ \/ /
+# /\__/ /|  __/| (_| || | | | | ||  __/| | | || |_  | |_/ /| (_) | >  <
+# \____/  \___| \__, ||_| |_| |_| \___||_| |_| \__| \____/  \___/ /_/\_\
+#                __/ |
+#               |___/
+# Check if a segment passes through a box, and get the distance between them
+def _slab_entry(p, q, box, padding=0.0):
+    """Get the first parameter t along segment p-q inside a box grown by padding, or None if it misses (slab test)"""
+    t0 = 0.0
+    t1 = 1.0
+    for axis in range(3):
+        start = p[axis]
+        delta = q[axis] - start
+        low = box[axis] - padding
+        high = box[axis + 3] + padding
+        if abs(delta) <= EPSILON:
+            if start < low or start > high:
+                return None
+            continue
+        ta = (low - start) / delta
+        tb = (high - start) / delta
+        if ta > tb:
+            ta, tb = tb, ta
+        t0 = max(t0, ta)
+        t1 = min(t1, tb)
+        if t0 > t1:
+            return None
+    return t0
+
+def segment_intersects_box(p, q, box, padding=0.0):
+    """Check if segment p-q passes through a box grown by padding on every side"""
+    return _slab_entry(p, q, box, padding) is not None
+
+def closest_point_segment_box(p, q, box, iterations=60):
+    """Get (distance, point on segment) for the closest approach of segment p-q to a box.
+    The distance along the segment is convex, so the minimum is found with a golden section search."""
+    d = _sub(q, p)
+    entry = _slab_entry(p, q, box)
+    if entry is not None:
+        return 0.0, _at(p, d, entry)
+    ratio = (sqrt(5.0) - 1.0) / 2.0
+    low = 0.0
+    high = 1.0
+    x1 = high - ratio * (high - low)
+    x2 = low + ratio * (high - low)
+    f1 = point_box_distance(_at(p, d, x1), box)
+    f2 = point_box_distance(_at(p, d, x2), box)
+    for i in range(iterations):
+        if f1 <= f2:
+            high = x2
+            x2, f2 = x1, f1
+            x1 = high - ratio * (high - low)
+            f1 = point_box_distance(_at(p, d, x1), box)
+        else:
+            low = x1
+            x1, f1 = x2, f2
+            x2 = low + ratio * (high - low)
+            f2 = point_box_distance(_at(p, d, x2), box)
+    candidates = [(f1, x1), (f2, x2), (point_box_distance(p, box), 0.0), (point_box_distance(q, box), 1.0)]
+    distance, t = min(candidates)
+    return distance, _at(p, d, t)
+
+def segment_box_distance(p, q, box, iterations=60):
+    """Distance between segment p-q and a box (0 if they touch)"""
+    return closest_point_segment_box(p, q, box, iterations)[0]
+
+# ______               __  _  _  _                ______         _
+# | ___ \             / _|(_)| || |               | ___ \       (_)
+# | |_/ / _ __   ___ | |_  _ | || |_   ___  _ __  | |_/ /  __ _  _  _ __
+# |  __/ | '__| / _ \|  _|| || || __| / _ \| '__| |  __/  / _` || || '__|
+# | |    | |   |  __/| |  | || || |_ |  __/| |    | |    | (_| || || |
+# \_|    |_|    \___||_|  |_||_| \__| \___||_|    \_|     \__,_||_||_|
+# Decide a clash between two proxies without a solid check, if possible
+def prefilter_pair(proxy1, proxy2, tolerance=TOLERANCE):
+    """Cheap clash check between two element proxies, run before the solid intersect.
+    A proxy is a dictionary, either:
+    - {"type": "segment", "start": (x,y,z), "end": (x,y,z), "outer": radius, "inner": radius}
+      for straight pipe / duct / conduit. outer is the radius of a cylinder containing the element,
+      inner is the radius of a cylinder inside it (same as outer for round elements).
+      It can also have a "box" with its bounding box
+    - {"type": "box", "box": (minx, miny, minz, maxx, maxy, maxz)} for anything else
+
+    Returns False if the pair can not clash, True if it must clash, or None if the solid check is needed."""
+    if not proxy1 or not proxy2:
+        return None
+    type1 = proxy1["type"]
+    type2 = proxy2["type"]
+
+    if type1 == "segment" and type2 == "segment":
+        s, t, c1, c2, distance = closest_points_segments(proxy1["start"], proxy1["end"],
+                                                         proxy2["start"], proxy2["end"])
+        if distance > proxy1["outer"] + proxy2["outer"] + tolerance:
+            return False
+        # Closest points inside both segments means the connecting line is square to both centerlines,
+        # so the inner cylinders overlap around it
+        if 0.0 < s < 1.0 and 0.0 < t < 1.0 and distance < proxy1["inner"] + proxy2["inner"] - tolerance:
+            return True
+        return None
+
+    if type1 == "segment" and type2 == "box":
+        segment, box = proxy1, proxy2["box"]
+    elif type1 == "box" and type2 == "segment":
+        segment, box = proxy2, proxy1["box"]
+    else:
+        return None
+    if not segment_intersects_box(segment["start"], segment["end"], box, segment["outer"] + tolerance):
+        return False
+    return None
+
+# ______                            ______  _       _
+# | ___ \                           |  _  \(_)     | |
+# | |_/ / _ __   ___  __  __ _   _  | | | | _  ___ | |_   __ _  _ __    ___   ___
+# |  __/ | '__| / _ \ \ \/ /| | | | | | | || |/ __|| __| / _` || '_ \  / __| / _ \
+# | |    | |   | (_) | >  < | |_| | | |/ / | |\__ \| |_ | (_| || | | || (__ |  __/
+# \_|    |_|    \___/ /_/\_\ \__, | |___/  |_||___/ \__| \__,_||_| |_| \___| \___|
+#                             __/ |
+#                            |___/
+# Get the separation between two proxies
+def proxy_distance(proxy1, proxy2):
+    """Get (distance, point1, point2) between the surfaces of two proxies (see prefilter_pair), where point1 and point2
+    are the closest points on the centerlines / boxes. Distance is 0 if they touch.
+    The distance never overestimates: segments are treated as round with their outer radius, and when a segment
+    proxy also has a "box" the larger of the two estimates is used (tighter for rectangular duct)."""
+    type1 = proxy1["type"]
+    type2 = proxy2["type"]
+    estimates = []
+    if type1 == "segment" and type2 == "segment":
+        s, t, c1, c2, distance = closest_points_segments(proxy1["start"], proxy1["end"],
+                                                         proxy2["start"], proxy2["end"])
+        estimates.append((distance - proxy1["outer"] - proxy2["outer"], c1, c2))
+    elif type1 == "segment" and proxy2.get("box"):
+        distance, c1 = closest_point_segment_box(proxy1["start"], proxy1["end"], proxy2["box"])
+        estimates.append((distance - proxy1["outer"], c1, closest_point_box(c1, proxy2["box"])))
+    elif type2 == "segment" and proxy1.get("box"):
+        distance, c2 = closest_point_segment_box(proxy2["start"], proxy2["end"], proxy1["box"])
+        estimates.append((distance - proxy2["outer"], closest_point_box(c2, proxy1["box"]), c2))
+    if proxy1.get("box") and proxy2.get("box"):
+        estimates.append(closest_points_boxes(proxy1["box"], proxy2["box"]))
+    distance, point1, point2 = max(estimates, key=lambda estimate: estimate[0])
+    return max(distance, 0.0), point1, point2
+
+# ______  _             _   _____  _
+# |  ___|(_)           | | /  __ \| |
+# | |_    _  _ __    __| | | /  \/| |  ___   __ _  _ __   __ _  _ __    ___   ___  ___
+# |  _|  | || '_ \  / _` | | |    | | / _ \ / _` || '__| / _` || '_ \  / __| / _ \/ __|
+# | |    | || | | || (_| | | \__/\| ||  __/| (_| || |   | (_| || | | || (__ |  __/\__ \
+# \_|    |_||_| |_| \__,_|  \____/|_| \___| \__,_||_|    \__,_||_| |_| \___| \___||___/
+# Narrow phase for clearance checks: find pairs closer than a distance without any solid operations
+def find_clearances(candidate_pairs, proxies1, proxies2, clearance):
+    """Check candidate pairs for elements closer than clearance (touching and clashing pairs are included).
+    Candidate pairs should come from a broad phase padded by clearance.
+
+    - candidate_pairs : list of (id1, id2) pairs
+    - proxies1, proxies2 : {id: proxy} for each element set. Pairs missing a proxy are skipped
+    - clearance : minimum allowed distance between elements (ft)
+
+    Returns a dictionary with:
+    - "intersection_results" : {id1: [id2, ...]}
+    - "distances" : {id1: [distance, ...]} matching intersection_results
+    - "points" : {id1: [(point1, point2), ...]} closest points matching intersection_results"""
+    intersection_results = {}
+    distances = {}
+    points = {}
+    for id1, id2 in candidate_pairs:
+        proxy1 = proxies1.get(id1)
+        proxy2 = proxies2.get(id2)
+        if not proxy1 or not proxy2:
+            continue
+        distance, point1, point2 = proxy_distance(proxy1, proxy2)
+        if distance >= clearance:
+            continue
+        if id1 not in intersection_results:
+            intersection_results[id1] = []
+            distances[id1] = []
+            points[id1] = []
+        intersection_results[id1].append(id2)
+        distances[id1].append(distance)
+        points[id1].append((point1, point2))
+    return {"intersection_results": intersection_results, "distances": distances, "points": points}
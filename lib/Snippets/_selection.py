@@ -10,10 +10,15 @@ from Autodesk.Revit.UI.Selection import *
 from Autodesk.Revit.DB.Mechanical import MechanicalSystemType, DuctSystemType
 from Autodesk.Revit.DB.Plumbing import PipingSystemType
 from types import NoneType
+from array import array
+from collections import namedtuple
+from System.Collections.Generic import List
 
 from pyrevit import revit, forms, script
 from pyrevit.forms import alert
 
+from Snippets._cache import get_session_cache, get_change_tracker
+
 # ╦  ╦╔═╗╦═╗╦╔═╗╔╗ ╦  ╔═╗╔═╗
 # ╚╗╔╝╠═╣╠╦╝║╠═╣╠╩╗║  ║╣ ╚═╗
 #  ╚╝ ╩ ╩╩╚═╩╩ ╩╚═╝╩═╝╚═╝╚═╝ VARIABLES
@@ -22,6 +27,9 @@ doc   = __revit__.ActiveUIDocument.Document #type: Document
 uidoc = __revit__.ActiveUIDocument          #type: UIDocument
 app   = __revit__.Application               #type: Application
 
+LinkedElement = namedtuple("LinkedElement", ["element", "link", "transform"])      # link and transform are None for model elements
+SYSTEM_TYPE_PARAMS = [BuiltInParameter.RBS_PIPING_SYSTEM_TYPE_PARAM, BuiltInParameter.RBS_DUCT_SYSTEM_TYPE_PARAM]
+
 #  _____        _     _____        _              _              _   _____  _                                _
 # |  __ \      | |   /  ___|      | |            | |            | | |  ___|| |                              | |
 # | |  \/  ___ | |_  \ `--.   ___ | |  ___   ___ | |_   ___   __| | | |__  | |  ___  _ __ ___    ___  _ __  | |_  ___
@@ -54,16 +62,18 @@ def get_selected_elements(filter_types=None):
 #                                                                                                              |___/
 # Get elements of input categories, optionally filtered by SystemType and Level!
 
-def get_elements_of_categories(categories=[],systemtypes=None,view=None,linked=False,readout=False):
+def get_elements_of_categories(categories=[],systemtypes=None,view=None,linked=False,readout=False,tagged=False):
     """Get elements of input categories, optionally filtered by SystemType and View!
-    Currently only for Ducts and Pipes.
-    Use separately for elements from links vs from the model!
+    System types are only for Ducts and Pipes (and their fittings).
+    Use separately for elements from links vs from the model! The view filter (level and visibility) only applies to the model.
 
     - Input "categories" should be list of desired builtin categories, eg: BuiltInCategory.OST_DuctCurves
     - Input "systemtypes" should be a dictionary with keys which are selected categories and types which are associated system types, eg: {BuiltInCategory.OST_DuctCurves: 'Outside Air'}
-    - Input "view" should be a view element. Leave empty to search all views
+    - Input "view" should be a plan view. Only elements visible in it and on its level are kept. Leave empty to search all views
     - Input "linked" should be a boolean which will determine whether to look in linked docs. Default is False
     - Input "readout" should be a boolean which will determine if a readout is printed. Default is False
+    - Input "tagged" should be a boolean, if True each result is a LinkedElement(element, link, transform) so linked
+      elements can be moved into model coordinates. Default is False
 
     eg:
     graded_pipes = get_elements_of_categories([BuiltInCategory.OST_PipeCurves],['PW-Grease Waste Pipe','PW-Waste Pipe','PW-Roof Drain'],view)"""
@@ -95,108 +105,120 @@ def get_elements_of_categories(categories=[],systemtypes=None,view=None,linked=F
                 print "No system filters applied to category {}".format(category)
 
 
-    # Get linked docs
-    link_instances = FilteredElementCollector(doc).OfClass(RevitLinkInstance).ToElements()
-    link_docs = [link.GetLinkDocument() for link in link_instances]
-
-    # Get view level
-    if view:
-        view_level_id = view.GenLevel.Id
-    else:
-        view_level_id = None
-
-    collector = {}
     if not categories:                                                      # Check if any categories have been added
         alert("Categories list is empty!",title = "Selection",exitscript = True)
-    else:
-        try:
-            if linked is True:                                              # Get linked elements
-                for link in link_docs:
-                    if link:
-                        if view:
-                            for category in categories:
-                                cat_elements = []
-                                elements = FilteredElementCollector(link,view.Id).OfCategory(
-                                    category).WhereElementIsNotElementType().ToElements()
-                                for el in elements:
-                                    try:
-                                        viewfilter = VisibleInViewFilter(link,view.Id)
-                                        if viewfilter.PassesFilter(el):
-                                            cat_elements.append(el)
-                                    except:
-                                        continue
-                                collector[category] = cat_elements
-                        else:
-                            for category in categories:
-                                cat_elements = []
-                                elements = FilteredElementCollector(link).OfCategory(
-                                category).WhereElementIsNotElementType().ToElements()
-                                for el in elements:
-                                    cat_elements.append(el)
-                                collector[category] = cat_elements
-                    else:
-                        continue
-            else:
-                if view:                                                        # Get all elements of categories in view
-                    for category in categories:
-                        cat_elements = []
-                        elements = FilteredElementCollector(doc,view.Id).OfCategory(
-                            category).WhereElementIsNotElementType().ToElements()
-                        for el in elements:
-                            try:
-                                viewfilter = VisibleInViewFilter(doc, view.Id)
-                                if viewfilter.PassesFilter(el):
-                                    cat_elements.append(el)
-                            except:
-                                continue
-                        collector[category] = cat_elements
-                else:                                                           # Get all elements of categories
-                    for category in categories:
-                        cat_elements = []
-                        elements = FilteredElementCollector(doc).OfCategory(
-                            category).WhereElementIsNotElementType().ToElements()
-                        for el in elements:
-                            cat_elements.append(el)
-                        collector[category] = cat_elements
-        except Exception as e:
-            alert(msg="Could not collect elements!", sub_msg="Error: {}".format(e),title="Selection", exitscript=True)
-
-    allelements = {}
-    if view:                                                                # Check if elements are on correct level
-        for category in categories:
-            elements = collector[category]
-            allelements[category] = [el for el in elements if hasattr(el,'LevelId') and el.LevelId == view_level_id]
-    else:
-        for category in categories:
-            elements = collector[category]
-            allelements[category] = elements
 
     filtered_elements = []
-    for category in categories:
-        types = systemtypes[category]
-        typfilter = []
-        if types:                                                         # Check if system types have been added
-            elements = allelements[category]
-            for el in elements:                                              # Filter by system type
-                try:
-                    mep = el.MEPSystem.LookupParameter("Type").AsValueString()
-                    if mep in types:
-                        typfilter.append(el)
-                    else:
-                        continue
-                except:
-                    continue
-            for el in typfilter:
-                filtered_elements.append(el)
-        else:
-            for el in allelements[category]:
-                filtered_elements.append(el)
+    try:
+        filtered_elements = list(iter_elements_of_categories(categories, systemtypes, view, linked, tagged))
+    except Exception as e:
+        alert(msg="Could not collect elements!", sub_msg="Error: {}".format(e),title="Selection", exitscript=True)
 
     if readout is True:
         print "\n# Filtered Elements: {}".format(len(filtered_elements))+"\n"+"~"*100
 
     return filtered_elements
 
+#  _____  _                 _____  _                                _
+# |_   _|| |               |  ___|| |                              | |
+#   | |  | |_   ___  _ __  | |__  | |  ___  _ __ ___    ___  _ __  | |_  ___
+#   | |  | __| / _ \| '__| |  __| | | / _ \| '_ ` _ \  / _ \| '_ \ | __|/ __|
+#  _| |_ | |_ |  __/| |    | |___ | ||  __/| | | | | ||  __/| | | || |_ \__ \
+#  \___/  \__| \___||_|    \____/ |_| \___||_| |_| |_| \___||_| |_| \__||___/
+# Yield elements of input categories one at a time, without building lists
+
+def iter_elements_of_categories(categories, systemtypes=None, view=None, linked=False, tagged=False):
+    """Yield elements of input categories one at a time (same inputs as get_elements_of_categories, no readout).
+    Each filter is a generator stage, so callers which only add up values never hold every element in a list.
+
+    eg:
+    total = sum(pipe.get_Parameter(BuiltInParameter.CURVE_ELEM_LENGTH).AsDouble()
+                for pipe in iter_elements_of_categories([BuiltInCategory.OST_PipeCurves]))"""
+    if not categories:
+        return
+
+    # System type names to keep, by category id
+    type_filters = {}
+    for category, types in (systemtypes or {}).items():
+        if types:
+            type_filters[ElementId(category).IntegerValue] = types
+
+    # Get docs to search (with their link instance)
+    if linked is True:
+        documents = [(link_doc, link) for link, link_doc in get_loaded_links(doc)]
+    else:
+        documents = [(doc, None)]
+
+    for document, link in documents:
+        elements = collect_elements(document, categories, view if linked is not True else None)  # Views only apply to the model
+        if type_filters:
+            elements = filter_system_types(elements, type_filters, get_system_type_names(document))
+        if tagged is True:
+            elements = tag_elements(elements, link)
+        for el in elements:
+            yield el
+
+def collect_elements(document, categories, view=None):
+    """Yield elements of categories from one collector, categories (and the view's level and visibility) are
+    filtered by Revit"""
+    filters = [ElementMulticategoryFilter(List[BuiltInCategory](categories))]
+    if view:
+        filters.append(ElementLevelFilter(view.GenLevel.Id))
+        filters.append(VisibleInViewFilter(document, view.Id))
+    if len(filters) > 1:
+        element_filter = LogicalAndFilter(List[ElementFilter](filters))
+    else:
+        element_filter = filters[0]
+    for el in FilteredElementCollector(document).WherePasses(element_filter).WhereElementIsNotElementType():
+        yield el
+
+def filter_system_types(elements, type_filters, system_type_names):
+    """Yield elements whose system type name is in type_filters (by category id), categories without types all pass.
+    - system_type_names : {system type id: name} from get_system_type_names for the elements' doc"""
+    for el in elements:
+        types = type_filters.get(el.Category.Id.IntegerValue)
+        if not types or system_type_names.get(get_system_type_id(el)) in types:
+            yield el
+
+def get_linked_key(element, link=None):
+    """Get (link instance id, element id) integers for an element, link instance id is None for model elements.
+    Unique across the model, its links and each placement of a link, unlike Id or UniqueId."""
+    return (link.Id.IntegerValue if link else None, element.Id.IntegerValue)
+
+def tag_elements(elements, link=None):
+    """Yield LinkedElement(element, link, transform), link and transform are None for model elements"""
+    transform = link.GetTotalTransform() if link else None
+    for el in elements:
+        yield LinkedElement(el, link, transform)
+
+#  _____              _                      _____
+# /  ___|            | |                    |_   _|
+# \ `--.  _   _  ___ | |_   ___  _ __ ___     | |   _   _  _ __    ___  ___
+#  `--. \| | | |/ __|| __| / _ \| '_ ` _ \    | |  | | | || '_ \  / _ \/ __|
+# /\__/ /| |_| |\__ \| |_ |  __/| | | | | |   | |  | |_| || |_) ||  __/\__ \
+# \____/  \__, ||___/ \__| \___||_| |_| |_|   \_/   \__, || .__/  \___||___/
+#          __/ |                                     __/ || |
+#         |___/                                     |___/ |_|
+# Read system types by id instead of looking up each element's system
+
+def get_system_type_names(document=doc):
+    """Get {system type id: name} for every piping and duct system type in a document (usually a few dozen)"""
+    names = {}
+    for systype in FilteredElementCollector(document).OfClass(MEPSystemType):
+        param = systype.get_Parameter(BuiltInParameter.SYMBOL_NAME_PARAM)
+        if param:
+            names[systype.Id.IntegerValue] = param.AsString()
+    return names
+
+def get_system_type_id(element):
+    """Get the system type id (integer) of a pipe, duct or fitting from its own parameter, or None.
+    Look the name up in get_system_type_names."""
+    for bip in SYSTEM_TYPE_PARAMS:
+        param = element.get_Parameter(bip)
+        if param and param.HasValue:
+            return param.AsElementId().IntegerValue
+    return None
+
 #  _____        _     _      _         _               _  ______
 # |  __ \      | |   | |    (_)       | |             | | |  _  \
 # | |  \/  ___ | |_  | |     _  _ __  | | __  ___   __| | | | | |  ___    ___  ___
@@ -206,13 +228,41 @@ def get_elements_of_categories(categories=[],systemtypes=None,view=None,linked=F
 
 def get_linked_docs(current_doc):
     """Returns a list of linked docs"""
-    linked_docs = []
-    collector = FilteredElementCollector(current_doc).OfClass(RevitLinkInstance)
-    for link_inst in collector:
-        link_doc = link_inst.GetLinkDocument()
+    return [link_doc for link, link_doc in get_loaded_links(current_doc)]
+
+def get_loaded_links(document=doc):
+    """Get (link instance, link doc) for every loaded link, cached for the Revit session.
+    Links are found again when a link instance or link type was added, changed or deleted since the last call
+    (see Snippets._cache.ChangeTracker), a cached link is no longer valid, or any link was not loaded last time."""
+    cache = get_session_cache("LinkDocuments", dict)
+    key = document.PathName or document.Title
+    changed = get_change_tracker().pop(key, "LinkDocuments")
+    cached = cache.get(key)
+    if cached and cached[0] and changed is not None and not has_link_changes(document, changed, cached[1]) and \
+            all(link.IsValidObject and link_doc.IsValidObject for link, link_doc in cached[1]):
+        return list(cached[1])
+
+    links = []
+    all_loaded = True
+    for link in FilteredElementCollector(document).OfClass(RevitLinkInstance):
+        link_doc = link.GetLinkDocument()
         if link_doc:  # only if loaded
-            linked_docs.append(link_doc)
-    return linked_docs
+            links.append((link, link_doc))
+        else:
+            all_loaded = False
+    cache[key] = (all_loaded, links)        # Look again next time if a link is unloaded
+    return list(links)
+
+def has_link_changes(document, changed, links):
+    """Check if any changed element id (integers) is a cached link instance, a link instance or a link type"""
+    cached_ids = set(link.Id.IntegerValue for link, link_doc in links if link.IsValidObject)
+    for element_id in changed:
+        if element_id in cached_ids:
+            return True
+        element = document.GetElement(ElementId(element_id))
+        if isinstance(element, (RevitLinkInstance, RevitLinkType)):
+            return True
+    return False
 
 #  _____        _              _    ___  ___        _  _    _         _
 # /  ___|      | |            | |   |  \/  |       | || |  (_)       | |
@@ -241,4 +291,62 @@ def select_multiple(catfilter=[],string=None):
             for filt in catfilter:
                 if el.Category.BuiltInCategory == filt:
                     filtered_elements.append(el)
-    return filtered_elements
\ No newline at end of file
+    return filtered_elements
+
+#  _____                                   _                  _____  _              _____             _
+# /  __ \                                 | |                /  ___|(_)            |_   _|           | |
+# | /  \/  ___   _ __   _ __    ___   ___ | |_   ___   _ __  \ `--.  _  ____  ___    | |   _ __    __| |  ___ __  __
+# | |     / _ \ | '_ \ | '_ \  / _ \ / __|| __| / _ \ | '__|  `--. \| ||_  / / _ \   | |  | '_ \  / _` | / _ \\ \/ /
+# | \__/\| (_) || | | || | | ||  __/| (__ | |_ | (_) || |    /\__/ /| | / / |  __/  _| |_ | | | || (_| ||  __/ >  <
+#  \____/ \___/ |_| |_||_| |_| \___| \___| \__| \___/ |_|    \____/ |_|/___| \___|  \___/ |_| |_| \__,_| \___|/_/\_\
+# Min and max connector diameters of MEP fittings, read once per run
+
+class ConnectorSizeIndex(object):
+    """Min and max round connector diameter (ft) for pipes, fittings and accessories, stored in flat arrays.
+    Connectors are only read the first time an element is seen, so one index can be shared by every filter in a run.
+    Reducers and tees have different sizes on each end, filter by the min or max to decide how they count.
+
+    eg:
+    sizes = ConnectorSizeIndex()
+    big_fittings = sizes.filter(fittings, 2.0 / 12)      # fittings with any connection of 2" or more"""
+
+    def __init__(self):
+        self.index = {}                                 # element id: position in arrays
+        self.min = array('d')
+        self.max = array('d')
+
+    def __len__(self):
+        return len(self.index)
+
+    def add(self, element):
+        """Read an element's connector sizes (once). Returns its position in the arrays."""
+        key = element.Id.IntegerValue
+        if key in self.index:
+            return self.index[key]
+        diameters = []
+        try:
+            if isinstance(element, MEPCurve):
+                diameters.append(element.Diameter)
+            else:
+                for conn in element.MEPModel.ConnectorManager.Connectors:
+                    if conn.ConnectorType == ConnectorType.End and conn.Shape == ConnectorProfileType.Round:
+                        diameters.append(conn.Radius * 2)
+        except:
+            pass
+        self.index[key] = len(self.min)
+        self.min.append(min(diameters) if diameters else 0.0)
+        self.max.append(max(diameters) if diameters else 0.0)
+        return self.index[key]
+
+    def get(self, element):
+        """Get (min, max) connector diameter of an element (0 if it has no round connectors)"""
+        i = self.add(element)
+        return self.min[i], self.max[i]
+
+    def filter(self, elements, mindiam, use="max"):
+        """Keep elements with a connector diameter >= mindiam (ft).
+        use="max" keeps fittings with any connection that size or larger, use="min" needs every connection to be."""
+        positions = [self.add(element) for element in elements]
+        sizes = self.max if use == "max" else self.min
+        return [element for element, i in zip(elements, positions) if sizes[i] >= mindiam]
+
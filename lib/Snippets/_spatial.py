@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+# Pure python spatial indexing. No Revit imports so it can be run and tested outside of Revit
+# on plain (minx, miny, minz, maxx, maxy, maxz) tuples.
+
+# ╦╔╦╗╔═╗╔═╗╦═╗╔╦╗╔═╗
+# ║║║║╠═╝║ ║╠╦╝ ║ ╚═╗
+# ╩╩ ╩╩  ╚═╝╩╚═ ╩ ╚═╝ IMPORTS
+#==================================================
+from math import floor
+from array import array
+
+# ╦  ╦╔═╗╦═╗╦╔═╗╔╗ ╦  ╔═╗╔═╗
+# ╚╗╔╝╠═╣╠╦╝║╠═╣╠╩╗║  ║╣ ╚═╗
+#  ╚╝ ╩ ╩╩╚═╩╩ ╩╚═╝╩═╝╚═╝╚═╝ VARIABLES
+#==================================================
+MIN_CELL_SIZE = 0.5         # Smallest grid cell allowed (ft)
+MAX_CELLS_PER_BOX = 4096    # Boxes covering more cells than this are checked by brute force instead
+PLACEMENT_DIGITS = 6        # Decimal places kept in placement keys
+
+# ______                _____                _
+# | ___ \              |_   _|              | |
+# | |_/ /  ___  __  __   | |   _   _  _ __  | |  ___
+# | ___ \ / _ \ \ \/ /   | |  | | | || '_ \ | | / _ \
+# | |_/ /| (_) | >  <    | |  | |_| || |_) || ||  __/
+# \____/  \___/ /_/\_\   \_/   \__,_|| .__/ |_| \___|
+#                                    | |
+#                                    |_|
+# Convert a bounding box to a plain tuple
+def bbox_to_tuple(bounding):
+    """Convert a BoundingBoxXYZ (or anything with .Min/.Max points) to a (minx, miny, minz, maxx, maxy, maxz) tuple.
+    Returns None if there is no bounding box."""
+    if not bounding:
+        return None
+    MIN = bounding.Min
+    MAX = bounding.Max
+    return (MIN.X, MIN.Y, MIN.Z, MAX.X, MAX.Y, MAX.Z)
+
+#  _____                     _
+# |  _  |                   | |
+# | | | |__   __  ___  _ __ | |  __ _  _ __
+# | | | |\ \ / / / _ \| '__|| | / _` || '_ \
+# \ \_/ / \ V / |  __/| |   | || (_| || |_) |
+#  \___/   \_/   \___||_|   |_| \__,_|| .__/
+#                                     | |
+#                                     |_|
+# Check if two box tuples overlap (touching counts as overlapping, same as bounding_boxes_intersect)
+def boxes_overlap(box1, box2, padding=0.0):
+    """Check if two box tuples overlap. Optional padding grows the check distance on every side."""
+    if not box1 or not box2:
+        return False
+    return (box1[3] + padding >= box2[0] and box1[0] - padding <= box2[3] and
+            box1[4] + padding >= box2[1] and box1[1] - padding <= box2[4] and
+            box1[5] + padding >= box2[2] and box1[2] - padding <= box2[5])
+
+def box_overlap(box1, box2):
+    """Get the overlap of two box tuples. If they do not overlap on an axis, the gap between them is used instead."""
+    low = [max(box1[axis], box2[axis]) for axis in range(3)]
+    high = [min(box1[axis + 3], box2[axis + 3]) for axis in range(3)]
+    return tuple(min(low[axis], high[axis]) for axis in range(3)) + tuple(max(low[axis], high[axis]) for axis in range(3))
+
+def box_center(box):
+    """Get the center (x, y, z) of a box tuple"""
+    return tuple((box[axis] + box[axis + 3]) / 2.0 for axis in range(3))
+
+# ______  _                                             _     _   __
+# | ___ \| |                                           | |   | | / /
+# | |_/ /| |  __ _   ___   ___  _ __ ___    ___  _ __  | |_  | |/ /   ___  _   _
+# |  __/ | | / _` | / __| / _ \| '_ ` _ \  / _ \| '_ \ | __| |    \  / _ \| | | |
+# | |    | || (_| || (__ |  __/| | | | | ||  __/| | | || |_  | |\  \|  __/| |_| |
+# \_|    |_| \__,_| \___| \___||_| |_| |_| \___||_| |_| \__| \_| \_/ \___| \__, |
+#                                                                           __/ |
+#                                                                          |___/
+# Round a placement (origin and axes) to a string, so a moved or rotated copy gets a new key
+def get_placement_key(origin, basis_x, basis_y, basis_z, digits=PLACEMENT_DIGITS):
+    """Get a string for a placement (eg: a link instance's transform) from its origin and axes as (x, y, z) tuples.
+    Values are rounded so the same placement always gives the same key."""
+    values = []
+    for point in (origin, basis_x, basis_y, basis_z):
+        values.extend(round(value, digits) + 0.0 for value in point)
+    return ",".join("{:.{}f}".format(value, digits) for value in values)
+
+#  _____        _     _____        _  _   _____  _
+# |  __ \      | |   /  __ \      | || | /  ___|(_)
+# | |  \/  ___ | |_  | /  \/  ___ | || | \ `--.  _  ____  ___
+# | | __  / _ \| __| | |     / _ \| || |  `--. \| ||_  / / _ \
+# | |_\ \|  __/| |_  | \__/\|  __/| || | /\__/ /| | / / |  __/
+#  \____/ \___| \__|  \____/ \___||_||_| \____/ |_|/___| \___|
+# Pick a grid cell size from the median box size
+def get_cell_size(boxes):
+    """Get a grid cell size for a list of box tuples (median of the largest box dimension)"""
+    extents = sorted(max(b[3] - b[0], b[4] - b[1], b[5] - b[2]) for b in boxes if b)
+    if not extents:
+        return 1.0
+    return max(extents[len(extents) // 2], MIN_CELL_SIZE)
+
+def _cell_range(box, cell_size, padding=0.0):
+    return (int(floor((box[0] - padding) / cell_size)),
+            int(floor((box[1] - padding) / cell_size)),
+            int(floor((box[2] - padding) / cell_size)),
+            int(floor((box[3] + padding) / cell_size)),
+            int(floor((box[4] + padding) / cell_size)),
+            int(floor((box[5] + padding) / cell_size)))
+
+def _cell_count(cells):
+    return (cells[3] - cells[0] + 1) * (cells[4] - cells[1] + 1) * (cells[5] - cells[2] + 1)
+
+# ______         _  _      _   _____        _      _
+# | ___ \       (_)| |    | | |  __ \      (_)    | |
+# | |_/ / _   _  _ | |  __| | | |  \/ _ __  _   __| |
+# | ___ \| | | || || | / _` | | | __ | '__|| | / _` |
+# | |_/ /| |_| || || || (_| | | |_\ \| |   | || (_| |
+# \____/  \__,_||_||_| \__,_|  \____/|_|   |_| \__,_|
+# Hash box tuples into a uniform 3D grid
+def build_grid(boxes, cell_size):
+    """Hash a list of box tuples into a uniform 3D grid.
+    Returns a dictionary with:
+    - "cells" : {(i,j,k): [box indices]}
+    - "oversized" : list of box indices too large to hash (checked against every query)
+    - "cell_size" : the cell size used
+    Boxes that are None are skipped."""
+    cells = {}
+    oversized = []
+    for index, box in enumerate(boxes):
+        if not box:
+            continue
+        cr = _cell_range(box, cell_size)
+        if _cell_count(cr) > MAX_CELLS_PER_BOX:
+            oversized.append(index)
+            continue
+        for i in range(cr[0], cr[3] + 1):
+            for j in range(cr[1], cr[4] + 1):
+                for k in range(cr[2], cr[5] + 1):
+                    key = (i, j, k)
+                    if key in cells:
+                        cells[key].append(index)
+                    else:
+                        cells[key] = [index]
+    return {"cells": cells, "oversized": oversized, "cell_size": cell_size, "count": len(boxes)}
+
+#  _____                             _____        _      _
+# |  _  |                           |  __ \      (_)    | |
+# | | | | _   _   ___  _ __  _   _  | |  \/ _ __  _   __| |
+# | | | || | | | / _ \| '__|| | | | | | __ | '__|| | / _` |
+# \ \/' /| |_| ||  __/| |   | |_| | | |_\ \| |   | || (_| |
+#  \_/\_\ \__,_| \___||_|    \__, |  \____/|_|   |_| \__,_|
+#                             __/ |
+#                            |___/
+# Get indices of grid boxes which may overlap the input box
+def query_grid(grid, box, padding=0.0):
+    """Get a set of box indices from the grid which share a cell with the input box (grown by padding).
+    These are only candidates, use boxes_overlap for the exact check."""
+    cr = _cell_range(box, grid["cell_size"], padding)
+    if _cell_count(cr) > MAX_CELLS_PER_BOX:
+        return set(range(grid["count"]))           # Query box is huge, everything is a candidate
+    found = set(grid["oversized"])
+    cells = grid["cells"]
+    for i in range(cr[0], cr[3] + 1):
+        for j in range(cr[1], cr[4] + 1):
+            for k in range(cr[2], cr[5] + 1):
+                indices = cells.get((i, j, k))
+                if indices:
+                    found.update(indices)
+    return found
+
+#  _____                    _  _      _         _          ______         _
+# /  __ \                  | |(_)    | |       | |         | ___ \       (_)
+# | /  \/  __ _  _ __    __| | _   __| |  __ _ | |_   ___  | |_/ /  __ _  _  _ __  ___
+# | |     / _` || '_ \  / _` || | / _` | / _` || __| / _ \ |  __/  / _` || || '__|/ __|
+# | \__/\| (_| || | | || (_| || || (_| || (_| || |_ |  __/ | |    | (_| || || |   \__ \
+#  \____/ \__,_||_| |_| \__,_||_| \__,_| \__,_| \__| \___| \_|     \__,_||_||_|   |___/
+# Broad phase: find all pairs of boxes between two sets which overlap
+def find_candidate_pairs(ids1, boxes1, ids2, boxes2, padding=0.0, cell_size=None, skip_same=True):
+    """Broad phase check between two sets of boxes using a uniform 3D grid.
+    Returns a list of (id1, id2) pairs whose boxes overlap, in the same order a nested loop over ids1 then ids2
+    would give. Pairs where id1 == id2 are skipped if skip_same is True (an element checked against itself), so ids
+    must be unique across both sets, eg: linked elements keyed with their link instance (see format_element_key).
+
+    - ids1, ids2 : lists of element ids (or any keys)
+    - boxes1, boxes2 : lists of (minx, miny, minz, maxx, maxy, maxz) tuples matching the id lists (None is skipped)
+    - padding : extra distance to grow each check by (for clearance checks)
+    - cell_size : grid cell size. Default is picked from the size of boxes2"""
+    if cell_size is None:
+        cell_size = get_cell_size(boxes2)
+    grid = build_grid(boxes2, cell_size)
+    return _pairs_from_grid(ids1, boxes1, ids2, boxes2, grid, padding, skip_same=skip_same)
+
+def _pairs_from_grid(ids1, boxes1, ids2, boxes2, grid, padding=0.0, progress=None, skip_same=True):
+    pairs = []
+    for index1, id1 in enumerate(ids1):
+        if progress and progress(index1, len(ids1)):
+            break
+        box1 = boxes1[index1]
+        if not box1:
+            continue
+        for index2 in sorted(query_grid(grid, box1, padding)):
+            id2 = ids2[index2]
+            if skip_same and id1 == id2:
+                continue
+            if boxes_overlap(box1, boxes2[index2], padding):
+                pairs.append((id1, id2))
+    return pairs
+
+# ______                           _  _                ______                _____  _
+# | ___ \                         | |(_)               | ___ \              /  ___|| |
+# | |_/ /  ___   _   _  _ __    __| | _  _ __    __ _  | |_/ /  ___  __  __ \ `--. | |_   ___   _ __   ___
+# | ___ \ / _ \ | | | || '_ \  / _` || || '_ \  / _` | | ___ \ / _ \ \ \/ /  `--. \| __| / _ \ | '__| / _ \
+# | |_/ /| (_) || |_| || | | || (_| || || | | || (_| | | |_/ /| (_) | >  <  /\__/ /| |_ | (_) || |   |  __/
+# \____/  \___/  \__,_||_| |_| \__,_||_||_| |_| \__, | \____/  \___/ /_/\_\ \____/  \__| \___/ |_|    \___|
+#                                                __/ |
+#                                               |___/
+# Array backed store of bounding boxes keyed by element id
+class BoundingBoxStore(object):
+    """Stores bounding boxes as flat arrays (one array per coordinate) keyed by element id.
+    Coordinates are read out of Revit once when a box is added, all overlap checks after that are pure python.
+
+    eg:
+    store1 = BoundingBoxStore.from_elements(ducts)
+    store2 = BoundingBoxStore.from_elements(beams)
+    pairs = store1.overlapping_pairs(store2)     # [(duct id, beam id), ...]"""
+
+    def __init__(self):
+        self.ids = []
+        self.index = {}
+        self.minx = array('d')
+        self.miny = array('d')
+        self.minz = array('d')
+        self.maxx = array('d')
+        self.maxy = array('d')
+        self.maxz = array('d')
+        self._grid = None
+
+    @classmethod
+    def from_elements(cls, elements, key=None):
+        """Create a store from a list of elements using get_BoundingBox(None).
+        - key : optional function to get the store key from an element. Default is element.Id"""
+        store = cls()
+        for el in elements:
+            store.add(key(el) if key else el.Id, el.get_BoundingBox(None))
+        return store
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def add(self, key, bounding):
+        """Add a BoundingBoxXYZ (or box tuple) under key. Returns False if there is no bounding box."""
+        box = bounding if isinstance(bounding, tuple) else bbox_to_tuple(bounding)
+        if not box:
+            return False
+        if key in self.index:
+            i = self.index[key]
+            self.minx[i], self.miny[i], self.minz[i], self.maxx[i], self.maxy[i], self.maxz[i] = box
+        else:
+            self.index[key] = len(self.ids)
+            self.ids.append(key)
+            self.minx.append(box[0])
+            self.miny.append(box[1])
+            self.minz.append(box[2])
+            self.maxx.append(box[3])
+            self.maxy.append(box[4])
+            self.maxz.append(box[5])
+        self._grid = None
+        return True
+
+    def box_at(self, i):
+        """Get the box tuple at an array index"""
+        return (self.minx[i], self.miny[i], self.minz[i], self.maxx[i], self.maxy[i], self.maxz[i])
+
+    def get_box(self, key):
+        """Get the box tuple for a key, or None if the key is not in the store"""
+        i = self.index.get(key)
+        if i is None:
+            return None
+        return self.box_at(i)
+
+    def center(self, key):
+        """Get the (x, y, z) center of the box for a key"""
+        i = self.index[key]
+        return ((self.minx[i] + self.maxx[i]) / 2.0,
+                (self.miny[i] + self.maxy[i]) / 2.0,
+                (self.minz[i] + self.maxz[i]) / 2.0)
+
+    def boxes(self):
+        """Get a list of all box tuples, in the same order as self.ids"""
+        return [self.box_at(i) for i in range(len(self.ids))]
+
+    def grid(self, cell_size=None):
+        """Get the uniform grid for this store. Built on first use and reused until a box is added."""
+        if self._grid is None or (cell_size is not None and cell_size != self._grid["cell_size"]):
+            boxes = self.boxes()
+            self._grid = build_grid(boxes, cell_size or get_cell_size(boxes))
+        return self._grid
+
+    def _overlaps_at(self, i, box, padding):
+        return (self.maxx[i] + padding >= box[0] and self.minx[i] - padding <= box[3] and
+                self.maxy[i] + padding >= box[1] and self.miny[i] - padding <= box[4] and
+                self.maxz[i] + padding >= box[2] and self.minz[i] - padding <= box[5])
+
+    def query(self, box, padding=0.0):
+        """Get ids of all boxes which overlap the input box tuple (grown by padding)"""
+        if not box:
+            return []
+        return [self.ids[i] for i in sorted(query_grid(self.grid(), box, padding))
+                if self._overlaps_at(i, box, padding)]
+
+    def query_many(self, boxes, padding=0.0):
+        """Run query for a list of box tuples. Returns a list of id lists, one per input box."""
+        return [self.query(box, padding) for box in boxes]
+
+    def overlapping_pairs(self, other, padding=0.0, progress=None, skip_same=True):
+        """Get all (id in self, id in other) pairs whose boxes overlap, in the same order as a nested loop over
+        self.ids then other.ids. Pairs with the same id are skipped if skip_same is True (see find_candidate_pairs).
+        progress is called as progress(done, total) before each box in self, returning True stops early."""
+        return _pairs_from_grid(self.ids, self.boxes(), other.ids, other.boxes(), other.grid(), padding, progress,
+                                skip_same)
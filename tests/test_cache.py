@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# Session caches and the change tracker. Run with: python -m pytest tests
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+from Snippets._cache import ChangeTracker, get_session_cache, get_change_tracker, forget_document
+
+
+class ChangeTrackerTest(unittest.TestCase):
+
+    def test_first_pop_asks_for_everything(self):
+        tracker = ChangeTracker()
+        self.assertIsNone(tracker.pop("Model", "ZoningSnapshot"))
+        tracker.add("Model", [1, 2])
+        self.assertEqual(tracker.pop("Model", "ZoningSnapshot"), set([1, 2]))
+
+    def test_forgotten_document_is_read_again(self):
+        tracker = ChangeTracker()
+        tracker.pop("Model", "ZoningSnapshot")
+        tracker.forget("Model")
+        self.assertFalse(tracker.is_tracking("Model"))
+        self.assertIsNone(tracker.pop("Model", "ZoningSnapshot"))
+
+
+class ForgetDocumentTest(unittest.TestCase):
+
+    def test_reopened_document_drops_its_caches(self):
+        snapshots = get_session_cache("ZoningSnapshot", dict)
+        snapshots["Model.rvt"] = {"regions": {}, "levels": [], "stamp": "a:1"}
+        snapshots["Other.rvt"] = {"regions": {}, "levels": [], "stamp": "b:1"}
+        get_change_tracker().pop("Model.rvt", "ZoningSnapshot")
+
+        forget_document("Model.rvt")
+        self.assertNotIn("Model.rvt", snapshots)
+        self.assertIn("Other.rvt", snapshots)
+        self.assertIsNone(get_change_tracker().pop("Model.rvt", "ZoningSnapshot"))
+
+
+if __name__ == "__main__":
+    unittest.main()
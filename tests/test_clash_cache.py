@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# Clash cache reuse for linked elements. Run with: python -m pytest tests
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+from Snippets._spatial import get_placement_key
+from Snippets._clashengine import (get_changed_keys, get_kept_elements, get_valid_pairs, get_saved_pairs,
+                                   can_reuse_pair)
+
+IDENTITY = ((0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (0.0, 1.0, 0.0), (0.0, 0.0, 1.0))
+
+
+def linked_version(placement, element_version="guid-1"):
+    """Version of a linked element as get_element_version builds it with a link transform"""
+    return element_version + "@" + get_placement_key(*placement)
+
+
+class PlacementKeyTest(unittest.TestCase):
+
+    def test_same_placement_same_key(self):
+        nearly = ((1e-9, -1e-9, 0.0), (1.0, 0.0, 0.0), (0.0, 1.0, 0.0), (0.0, 0.0, 1.0))
+        self.assertEqual(get_placement_key(*IDENTITY), get_placement_key(*nearly))
+
+    def test_moved_or_rotated_placement_new_key(self):
+        moved = ((10.0, 0.0, 0.0),) + IDENTITY[1:]
+        rotated = (IDENTITY[0], (0.0, 1.0, 0.0), (-1.0, 0.0, 0.0), (0.0, 0.0, 1.0))
+        keys = set(get_placement_key(*placement) for placement in (IDENTITY, moved, rotated))
+        self.assertEqual(len(keys), 3)
+
+
+class PairCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.host = "Model:101"
+        self.linked = "Model:7:55"
+        self.cache_versions = {self.host: "guid-h", self.linked: linked_version(IDENTITY)}
+        self.cache_pairs = {self.host + "|" + self.linked: {"clash": False, "volumes": [], "bbox": None}}
+
+    def test_unchanged_pair_is_reused(self):
+        versions = {self.host: "guid-h", self.linked: linked_version(IDENTITY)}
+        changed = get_changed_keys(self.cache_versions, versions)
+        self.assertEqual(changed, set())
+        self.assertTrue(can_reuse_pair(self.cache_pairs, self.host, self.linked, changed))
+
+    def test_moved_link_pair_is_checked_again(self):
+        moved = ((0.0, 2.5, 0.0),) + IDENTITY[1:]
+        versions = {self.host: "guid-h", self.linked: linked_version(moved)}
+        changed = get_changed_keys(self.cache_versions, versions)
+        self.assertEqual(changed, set([self.linked]))
+        self.assertFalse(can_reuse_pair(self.cache_pairs, self.host, self.linked, changed))
+        self.assertEqual(get_valid_pairs(self.cache_pairs, changed), {})
+
+    def test_clashing_pair_is_checked_again(self):
+        self.cache_pairs[self.host + "|" + self.linked]["clash"] = True
+        self.assertFalse(can_reuse_pair(self.cache_pairs, self.host, self.linked, set()))
+
+
+class PruneCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_versions = {"Model:1": "a", "Model:2": "b", "Model:3": "c", "Other:9": "d"}
+        self.cache_pairs = {"Model:1|Model:2": {"clash": False, "volumes": [], "bbox": None},
+                            "Model:1|Model:3": {"clash": False, "volumes": [], "bbox": None},
+                            "Other:9|Model:2": {"clash": False, "volumes": [], "bbox": None}}
+
+    def prune(self, versions, run_pairs):
+        changed = get_changed_keys(self.cache_versions, versions)
+        elements = get_kept_elements(self.cache_versions, versions)
+        pairs = get_valid_pairs(self.cache_pairs, changed, elements)
+        return elements, get_saved_pairs(pairs, set(run_pairs), versions)
+
+    def test_deleted_element_pairs_are_dropped(self):
+        versions = {"Model:1": "a", "Model:2": "b"}                     # Model:3 was deleted
+        elements, pairs = self.prune(versions, ["Model:1|Model:2"])
+        self.assertNotIn("Model:3", elements)
+        self.assertNotIn("Model:1|Model:3", pairs)
+        self.assertIn("Model:1|Model:2", pairs)
+
+    def test_other_documents_are_kept(self):
+        versions = {"Model:1": "a", "Model:2": "b"}
+        elements, pairs = self.prune(versions, ["Model:1|Model:2"])
+        self.assertIn("Other:9", elements)
+        self.assertIn("Other:9|Model:2", pairs)
+
+    def test_pairs_which_no_longer_overlap_are_dropped(self):
+        versions = {"Model:1": "a", "Model:2": "b", "Model:3": "c"}
+        elements, pairs = self.prune(versions, ["Model:1|Model:2"])
+        self.assertNotIn("Model:1|Model:3", pairs)
+
+    def test_cache_size_is_capped(self):
+        pairs = {"Other:9|Model:2": {}, "Model:1|Model:2": {}}
+        saved = get_saved_pairs(pairs, set(["Model:1|Model:2"]), {"Model:1": "a", "Model:2": "b"}, max_pairs=1)
+        self.assertEqual(list(saved.keys()), ["Model:1|Model:2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
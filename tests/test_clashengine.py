@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# Headless clash engine narrow phase. Run with: python -m pytest tests
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+from Snippets._clashengine import ClashMesh, segment_mesh_clash, _init_worker, _check_chunk
+
+
+def box_mesh(box):
+    """Closed triangle mesh of a (minx, miny, minz, maxx, maxy, maxz) box, in the snapshot mesh layout"""
+    x = (box[0], box[3])
+    y = (box[1], box[4])
+    z = (box[2], box[5])
+    vertices = [[x[i], y[j], z[k]] for i in range(2) for j in range(2) for k in range(2)]
+    quads = [(0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1), (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)]
+    triangles = []
+    for a, b, c, d in quads:
+        triangles.append([a, b, c])
+        triangles.append([a, c, d])
+    return {"vertices": vertices, "triangles": triangles}
+
+
+# 2' x 2' duct along X, its outer (circumscribed) radius is sqrt(2)
+DUCT_BOX = (-5.0, -1.0, -1.0, 5.0, 1.0, 1.0)
+DUCT = {"type": "segment", "start": (-5.0, 0.0, 0.0), "end": (5.0, 0.0, 0.0),
+        "outer": 2 ** 0.5, "inner": 1.0, "box": DUCT_BOX}
+CORNER_BOX = (-0.5, 1.2, 0.3, 0.5, 2.0, 0.7)       # Inside the outer radius, outside the duct
+CROSSING_BOX = (-0.5, 0.8, 0.3, 0.5, 2.0, 0.7)     # Cuts into the duct
+
+
+class RectangularDuctTest(unittest.TestCase):
+
+    def check(self, box, duct_mesh):
+        meshes = {"obstacle": box_mesh(box)}
+        if duct_mesh:
+            meshes["duct"] = box_mesh(DUCT_BOX)
+        _init_worker({"duct": DUCT}, {"obstacle": {"type": "box", "box": box}}, meshes, 0.0)
+        pairs = _check_chunk([("duct", "obstacle")])[0]
+        return bool(pairs)
+
+    def test_corner_band_without_duct_mesh_is_conservative(self):
+        # Regression: without a mesh for the duct the outer radius is used, so the corner band counts as a clash
+        self.assertTrue(segment_mesh_clash(DUCT, ClashMesh(box_mesh(CORNER_BOX))))
+        self.assertTrue(self.check(CORNER_BOX, duct_mesh=False))
+
+    def test_corner_band_with_duct_mesh_is_exact(self):
+        self.assertFalse(self.check(CORNER_BOX, duct_mesh=True))
+
+    def test_crossing_box_clashes(self):
+        self.assertTrue(self.check(CROSSING_BOX, duct_mesh=True))
+        self.assertTrue(self.check(CROSSING_BOX, duct_mesh=False))
+
+    def test_far_box_does_not_clash(self):
+        far = (-0.5, 3.0, 3.0, 0.5, 4.0, 4.0)
+        self.assertFalse(segment_mesh_clash(DUCT, ClashMesh(box_mesh(far))))
+
+
+if __name__ == "__main__":
+    unittest.main()
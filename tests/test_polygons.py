@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# 2D polygon engine used for filled regions. Run with: python -m pytest tests
+import math
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+from Snippets._polygons import PolygonRegion, flatten_loop, group_points, assign_points
+
+SQUARE = [(0.0, 0.0), (10.0, 0.0), (10.0, 10.0), (0.0, 10.0)]
+HOLE = [(4.0, 4.0), (6.0, 4.0), (6.0, 6.0), (4.0, 6.0)]
+
+
+class PolygonRegionTest(unittest.TestCase):
+
+    def test_hole_is_outside(self):
+        region = PolygonRegion([SQUARE, HOLE])
+        self.assertTrue(region.contains(2.0, 2.0))
+        self.assertFalse(region.contains(5.0, 5.0))
+        self.assertFalse(region.contains(12.0, 5.0))
+
+    def test_region_without_loops(self):
+        region = PolygonRegion([[(0.0, 0.0), (1.0, 1.0)]])
+        self.assertIsNone(region.box)
+        self.assertFalse(region.contains(0.5, 0.5))
+
+
+class FlattenLoopTest(unittest.TestCase):
+
+    def half_disc(self, sweep):
+        # Line along the x axis closed by a half circle above (counter-clockwise) or below (clockwise) it
+        arc = {"type": "arc", "center": (0.0, 0.0), "radius": 5.0, "start_angle": 0.0, "sweep": sweep}
+        line = {"type": "line", "start": (-5.0, 0.0), "end": (5.0, 0.0)}
+        return flatten_loop([arc, line], max_angle=math.radians(10))
+
+    def test_counter_clockwise_arc(self):
+        polygon = self.half_disc(math.pi)
+        self.assertEqual(len(polygon), 19)                  # 18 arc segments, the line end is the arc start
+        self.assertAlmostEqual(polygon[0][0], 5.0)
+        self.assertTrue(all(y >= -1e-9 for x, y in polygon))
+        self.assertTrue(PolygonRegion([polygon]).contains(0.0, 2.5))
+        self.assertFalse(PolygonRegion([polygon]).contains(0.0, -2.5))
+
+    def test_clockwise_arc(self):
+        polygon = self.half_disc(-math.pi)
+        self.assertEqual(len(polygon), 19)
+        self.assertTrue(all(y <= 1e-9 for x, y in polygon))
+        self.assertTrue(PolygonRegion([polygon]).contains(0.0, -2.5))
+        self.assertFalse(PolygonRegion([polygon]).contains(0.0, 2.5))
+
+    def test_points_curve(self):
+        curves = [{"type": "points", "points": [(0.0, 0.0), (1.0, 0.0), (1.0, 1.0)]},
+                  {"type": "line", "start": (1.0, 1.0), "end": (0.0, 0.0)}]
+        self.assertEqual(flatten_loop(curves), [(0.0, 0.0), (1.0, 0.0), (1.0, 1.0)])
+
+
+class GroupPointsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.regions = [PolygonRegion([SQUARE], key="a"),
+                        PolygonRegion([[(5.0, 0.0), (15.0, 0.0), (15.0, 10.0), (5.0, 10.0)]], key="b"),
+                        PolygonRegion([], key="empty")]
+        self.points = [(2.0, 2.0), (7.0, 2.0), (12.0, 2.0), (50.0, 50.0)]
+
+    def test_point_in_overlapping_regions(self):
+        groups = group_points(self.regions, self.points)
+        self.assertEqual(groups[0], [0, 1])
+        self.assertEqual(groups[1], [1, 2])
+
+    def test_region_without_loops_is_skipped(self):
+        self.assertIsNone(self.regions[2].box)
+        self.assertEqual(group_points(self.regions, self.points)[2], [])
+
+    def test_assign_points_picks_first_region(self):
+        self.assertEqual(assign_points(self.regions, self.points), [0, 0, 1, None])
+
+    def test_no_regions(self):
+        self.assertEqual(group_points([], self.points), [])
+        self.assertEqual(assign_points([], self.points), [None, None, None, None])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+# Broad phase pairs for model and linked elements. Run with: python -m pytest tests
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+from Snippets._spatial import BoundingBoxStore, find_candidate_pairs
+from Snippets._clashengine import format_element_key
+
+BOX = (0.0, 0.0, 0.0, 1.0, 1.0, 1.0)
+
+
+class LinkedKeyTest(unittest.TestCase):
+
+    def test_model_and_linked_keys_differ(self):
+        model = format_element_key("Model", 5)
+        linked = format_element_key("Model", 5, 12)
+        other_instance = format_element_key("Model", 5, 13)
+        self.assertEqual(len(set([model, linked, other_instance])), 3)
+
+    def test_model_element_checked_against_linked_element_with_same_id(self):
+        model = format_element_key("Model", 5)
+        linked = format_element_key("Structure", 5, 12)
+        store1 = BoundingBoxStore()
+        store1.add(model, BOX)
+        store2 = BoundingBoxStore()
+        store2.add(model, BOX)                      # Same model element in both sets
+        store2.add(linked, BOX)
+        self.assertEqual(store1.overlapping_pairs(store2), [(model, linked)])
+
+    def test_two_link_instances_are_kept_apart(self):
+        model = format_element_key("Model", 5)
+        first = format_element_key("Structure", 7, 12)
+        second = format_element_key("Structure", 7, 13)
+        store1 = BoundingBoxStore()
+        store1.add(model, BOX)
+        store2 = BoundingBoxStore()
+        store2.add(first, BOX)
+        store2.add(second, (100.0, 0.0, 0.0, 101.0, 1.0, 1.0))
+        self.assertEqual(len(store2), 2)
+        self.assertEqual(store1.overlapping_pairs(store2), [(model, first)])
+
+    def test_skip_same_only_when_asked(self):
+        pairs = find_candidate_pairs([5], [BOX], [5], [BOX])
+        self.assertEqual(pairs, [])
+        pairs = find_candidate_pairs([5], [BOX], [5], [BOX], skip_same=False)
+        self.assertEqual(pairs, [(5, 5)])
+
+
+if __name__ == "__main__":
+    unittest.main()